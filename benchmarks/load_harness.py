@@ -0,0 +1,139 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+from benchmarks.synthetic_ticks import create_synthetic_ticks
+from domains.tick import TickBlock
+from services.fake_client import FakeAsyncClient, create_fake_instruments, get_blocks_start_time
+from services.instrument_worker import LatencyStats
+from services.market_data_log import MarketDataRecorder, ReplayAsyncClient, get_market_data_log_instruments, \
+    get_market_data_log_start_time
+from services.order_service import OrderService
+from services.tick_storage import read_csv_ticks
+from trading_robot import TradingRobot
+from utils.clock import EventClock
+
+# интервал проверки задержки цикла событий в секундах
+LOOP_LAG_INTERVAL = 0.01
+
+
+# задержка цикла событий: насколько позже запланированного просыпается задача с коротким sleep
+async def monitor_loop_lag(stats: LatencyStats, interval: float = LOOP_LAG_INTERVAL):
+    loop = asyncio.get_running_loop()
+    while True:
+        started = loop.time()
+        await asyncio.sleep(interval)
+        stats.add("loop_lag", max(loop.time() - started - interval, 0.0))
+
+
+# прогон полного пути TradingRobot.trades_stream на локальном клиенте:
+# устойчивая скорость обработки, задержка цикла событий и задержка решения по каждому инструменту
+# (worker "total" - от постановки сделки в очередь до завершения анализа и проверки позиций)
+async def run_load_test(robot: TradingRobot, client) -> Dict:
+    loop_stats = LatencyStats()
+    monitor = asyncio.ensure_future(monitor_loop_lag(loop_stats))
+    started = time.perf_counter()
+    try:
+        await robot.run(client)
+    finally:
+        monitor.cancel()
+    seconds = time.perf_counter() - started
+
+    stream = client.market_data_stream
+    ticks = stream.sent_count
+    return {
+        "instruments": len(robot.instruments),
+        "ticks": ticks,
+        "seconds": seconds,
+        "ticks_per_second": ticks / seconds if seconds > 0 else 0.0,
+        "stream_seconds": (stream.finished_time or started) - (stream.started_time or started),
+        "loop_lag": loop_stats.get().get("loop_lag", {}),
+        "workers": {
+            robot.instrument_by_figi[figi]["name"]: worker.get_stats() for figi, worker in robot.workers.items()
+        },
+    }
+
+
+def load_blocks(file_paths: List[str]) -> List[TickBlock]:
+    return [read_csv_ticks(file_path) for file_path in file_paths]
+
+
+def create_instruments(blocks: List[TickBlock]) -> List[Dict]:
+    return [{"name": block.figi, "figi": block.figi, "future": block.figi} for block in blocks]
+
+
+# робот пишет сделки и статистику относительно рабочего каталога, поэтому прогон выполняется во временном
+# record_path - запись полученных роботом сообщений, replay_path - воспроизведение записи вместо blocks
+# время робота - время сделок потока, поэтому результат не зависит от того, когда запущен прогон
+def run_in_directory(instruments: List[Dict], blocks: List[TickBlock], speed: float,
+                     directory: Optional[str] = None, record_path: Optional[str] = None,
+                     replay_path: Optional[str] = None) -> Dict:
+    current_directory = os.getcwd()
+    recorder = MarketDataRecorder(os.path.abspath(record_path)) if record_path else None
+    if replay_path:
+        replay_path = os.path.abspath(replay_path)
+        clock = EventClock(get_market_data_log_start_time(replay_path))
+        client = ReplayAsyncClient(replay_path, speed, clock)
+    else:
+        clock = EventClock(get_blocks_start_time(blocks))
+        client = FakeAsyncClient(blocks, speed, clock)
+    with tempfile.TemporaryDirectory(dir=directory) as root:
+        work_directory = os.path.join(root, "work")
+        for path in [os.path.join(work_directory, "data"), os.path.join(root, "logs")]:
+            os.makedirs(path)
+
+        os.chdir(work_directory)
+        try:
+            robot = TradingRobot(instruments, order_service=OrderService(file_path=None, clock=clock),
+                                 recorder=recorder, clock=clock)
+            return asyncio.run(run_load_test(robot, client))
+        finally:
+            os.chdir(current_directory)
+
+
+def main(arguments: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="пропускная способность TradingRobot на локальном потоке сделок")
+    parser.add_argument("--instruments", type=int, default=3)
+    parser.add_argument("--ticks", type=int, default=100000, help="количество сделок на инструмент")
+    parser.add_argument("--ticks-per-second", type=float, help="частота синтетических сделок инструмента")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--speed", type=float, default=0.0, help="множитель скорости, 0 - без пауз")
+    parser.add_argument("--files", nargs="+", help="файлы истории вместо синтетических сделок")
+    parser.add_argument("--record", help="запись полученных роботом сообщений потока")
+    parser.add_argument("--replay", help="воспроизведение записи потока вместо сделок")
+    parser.add_argument("--log-level", default="WARNING")
+    parser.add_argument("--output")
+    options = parser.parse_args(arguments)
+
+    # вывод каждого сообщения в лог при максимальной скорости замеряет лог, а не обработку
+    logging.getLogger().setLevel(options.log_level)
+
+    if options.replay:
+        blocks = []
+        instruments = get_market_data_log_instruments(options.replay, [])
+    elif options.files:
+        blocks = load_blocks(options.files)
+        instruments = create_instruments(blocks)
+    else:
+        blocks = create_synthetic_ticks(options.ticks, options.seed, options.instruments, options.ticks_per_second)
+        instruments = create_fake_instruments(options.instruments)
+
+    report = run_in_directory(instruments, blocks, options.speed, record_path=options.record,
+                              replay_path=options.replay)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if options.output:
+        with open(options.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2, ensure_ascii=False)
+    return 0
+
+
+# из корня проекта: python -m benchmarks.load_harness --instruments 10 --ticks 100000 [--speed 100]
+# python -m benchmarks.load_harness --replay ./data/marketdata-20220506.bin [--speed 10]
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
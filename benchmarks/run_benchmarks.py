@@ -0,0 +1,310 @@
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from tinkoff.invest import OrderDirection, Trade, TradeDirection
+
+from benchmarks.synthetic_ticks import create_synthetic_ticks
+from domains.order import Order
+from domains.tick import TickBlock
+from services.order_service import OrderService
+from strategies.profile_touch_strategy import ProfileTouchStrategy
+from utils.format_util import float_to_quotation
+from utils.parse_util import processed_data
+from utils.strategy_util import calculate_ratio, merge_two_frames, ticks_to_cluster
+
+# размеры дня по умолчанию, количество сделок на инструмент
+BENCHMARK_SIZES = [100000, 1000000]
+
+# ограничение количества сделок для проверок, выполняемых по одной сделке в цикле python
+PER_TICK_LIMIT = 100000
+
+# количество закрытых сделок в истории OrderService при проверке processed_orders
+CLOSED_ORDERS_COUNT = 1000
+
+# пиковая память меньше порога в мегабайтах не сравнивается, т.к. зависит от случайных временных объектов
+MIN_COMPARED_MEMORY_MB = 1.0
+
+
+# замер одной операции: prepare готовит данные и не входит в замер,
+# run выполняет операцию и возвращает количество обработанных элементов
+class Benchmark(object):
+    def __init__(self, name: str, prepare: Callable, run: Callable):
+        self.name = name
+        self.prepare = prepare
+        self.run = run
+
+
+def prepare_df(block: TickBlock, limit: Optional[int] = None) -> pd.DataFrame:
+    df = block.to_df()
+    return df if limit is None else df.iloc[:limit]
+
+
+def run_ticks_to_cluster(df: pd.DataFrame, period: str) -> int:
+    ticks_to_cluster(df, period)
+    return len(df)
+
+
+def prepare_ratio(block: TickBlock) -> pd.DataFrame:
+    return ticks_to_cluster(block.to_df(), "1min")
+
+
+def run_ratio(candles: pd.DataFrame) -> int:
+    calculate_ratio(candles)
+    return len(candles)
+
+
+def prepare_merge(block: TickBlock):
+    df = block.to_df()
+    # новые сделки перекрывают последние 10% накопленных, как при восстановлении промежутка
+    return df, df.iloc[len(df) - len(df) // 10:].copy()
+
+
+def run_merge(frames) -> int:
+    source_df, new_df = frames
+    merge_two_frames(source_df, new_df)
+    return len(source_df) + len(new_df)
+
+
+def prepare_analyze(block: TickBlock, limit: int):
+    strategy = ProfileTouchStrategy("SBER")
+    df = prepare_df(block, limit)
+    return strategy, df
+
+
+def run_analyze(state) -> int:
+    strategy, df = state
+    for index in range(len(df)):
+        strategy.analyze(df.iloc[index:index + 1])
+    return len(df)
+
+
+def prepare_analyze_batch(block: TickBlock):
+    return ProfileTouchStrategy("SBER"), block
+
+
+def run_analyze_batch(state) -> int:
+    strategy, block = state
+    strategy.analyze_batch(block.prices, block.quantities, block.directions, block.times)
+    return block.size
+
+
+def create_order(index: int, price: float, direction: int, status: str) -> Order:
+    if direction == OrderDirection.ORDER_DIRECTION_BUY.value:
+        stop, take = price * 0.5, price * 2
+    else:
+        stop, take = price * 2, price * 0.5
+    return Order(id=str(index), group_id=str(index // 2), instrument="SBER", open=price, stop=stop, take=take,
+                 quantity=1, direction=direction, time=datetime(2022, 5, 6, 7, tzinfo=timezone.utc), status=status)
+
+
+# OrderService с историей закрытых сделок и активными сделками, которые не закрываются по цене
+def prepare_orders(block: TickBlock, limit: int):
+    order_service = OrderService(file_path=None)
+    price = float(block.prices[0])
+    for index in range(CLOSED_ORDERS_COUNT):
+        order_service.add_order(create_order(index, price, OrderDirection.ORDER_DIRECTION_BUY.value, "close"))
+    order_service.add_order(create_order(CLOSED_ORDERS_COUNT, price, OrderDirection.ORDER_DIRECTION_BUY.value,
+                                         "active"))
+    order_service.add_order(create_order(CLOSED_ORDERS_COUNT + 1, price,
+                                         OrderDirection.ORDER_DIRECTION_SELL.value, "active"))
+
+    times = [pd.Timestamp(tick_time, tz="UTC") for tick_time in block.times[:limit].tolist()]
+    return order_service, block.prices[:limit].tolist(), times
+
+
+def run_orders(state) -> int:
+    order_service, prices, times = state
+    for price, tick_time in zip(prices, times):
+        order_service.processed_orders("SBER", price, tick_time)
+    return len(prices)
+
+
+# сделки в формате api
+def prepare_trades(block: TickBlock, limit: int) -> List[Trade]:
+    trades = []
+    for direction, price, quantity, tick_time in zip(block.directions[:limit].tolist(),
+                                                     block.prices[:limit].tolist(),
+                                                     block.quantities[:limit].tolist(),
+                                                     block.times[:limit].tolist()):
+        trades.append(Trade(
+            figi=block.figi,
+            direction=TradeDirection(direction),
+            price=float_to_quotation(price),
+            quantity=quantity,
+            time=pd.Timestamp(tick_time, tz="UTC").to_pydatetime(warn=False)
+        ))
+    return trades
+
+
+def run_trades(trades: List[Trade]) -> int:
+    for trade in trades:
+        processed_data(trade)
+    return len(trades)
+
+
+def create_benchmarks(per_tick_limit: int) -> List[Benchmark]:
+    return [
+        Benchmark("ticks_to_cluster_1h", prepare_df, lambda df: run_ticks_to_cluster(df, "1h")),
+        Benchmark("ticks_to_cluster_5min", prepare_df, lambda df: run_ticks_to_cluster(df, "5min")),
+        Benchmark("calculate_ratio", prepare_ratio, run_ratio),
+        Benchmark("merge_two_frames", prepare_merge, run_merge),
+        Benchmark("analyze", lambda block: prepare_analyze(block, per_tick_limit), run_analyze),
+        Benchmark("analyze_batch", prepare_analyze_batch, run_analyze_batch),
+        Benchmark("processed_orders", lambda block: prepare_orders(block, per_tick_limit), run_orders),
+        Benchmark("processed_data", lambda block: prepare_trades(block, per_tick_limit), run_trades),
+    ]
+
+
+# лучшее время из repeat запусков и пиковая память отдельного запуска под tracemalloc
+def measure(benchmark: Benchmark, blocks: List[TickBlock], repeat: int) -> Dict:
+    best_seconds = None
+    items = 0
+    for _ in range(repeat):
+        states = [benchmark.prepare(block) for block in blocks]
+        started = time.perf_counter()
+        items = sum(benchmark.run(state) for state in states)
+        seconds = time.perf_counter() - started
+        best_seconds = seconds if best_seconds is None else min(best_seconds, seconds)
+
+    states = [benchmark.prepare(block) for block in blocks]
+    tracemalloc.start()
+    try:
+        for state in states:
+            benchmark.run(state)
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "items": items,
+        "seconds": best_seconds,
+        "items_per_second": items / best_seconds if best_seconds > 0 else 0.0,
+        "peak_memory_mb": peak_memory / 1024 / 1024,
+    }
+
+
+def run_benchmarks(
+        sizes: List[int],
+        seed: int = 0,
+        instruments: int = 1,
+        ticks_per_second: Optional[float] = None,
+        volatility: float = 0.01,
+        repeat: int = 3,
+        per_tick_limit: int = PER_TICK_LIMIT,
+        names: Optional[List[str]] = None
+) -> Dict:
+    results = {}
+    for size in sizes:
+        blocks = create_synthetic_ticks(size, seed, instruments, ticks_per_second, volatility)
+        for benchmark in create_benchmarks(per_tick_limit):
+            if names is not None and benchmark.name not in names:
+                continue
+            key = f"{benchmark.name}[{size}]"
+            results[key] = measure(benchmark, blocks, repeat)
+            print(f"{key}: {results[key]['items_per_second']:.0f} эл./сек., "
+                  f"{results[key]['peak_memory_mb']:.3f} МБ", flush=True)
+
+    return {
+        "meta": {
+            "created": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "seed": seed,
+            "instruments": instruments,
+            "ticks_per_second": ticks_per_second,
+            "volatility": volatility,
+            "repeat": repeat,
+            "per_tick_limit": per_tick_limit,
+        },
+        "results": results,
+    }
+
+
+# сравнение с базовыми результатами: регрессия - падение скорости или рост памяти больше порога
+def compare_results(base: Dict, current: Dict, threshold: float = 0.1,
+                    memory_threshold: float = 0.2) -> List[Dict]:
+    comparisons = []
+    for key, base_result in base["results"].items():
+        current_result = current["results"].get(key)
+        if current_result is None:
+            continue
+
+        speed_ratio = current_result["items_per_second"] / base_result["items_per_second"] \
+            if base_result["items_per_second"] > 0 else 1.0
+        memory_ratio = current_result["peak_memory_mb"] / base_result["peak_memory_mb"] \
+            if base_result["peak_memory_mb"] > 0 else 1.0
+        comparisons.append({
+            "name": key,
+            "speed_ratio": speed_ratio,
+            "memory_ratio": memory_ratio,
+            "is_regression": speed_ratio < 1 - threshold or (
+                    memory_ratio > 1 + memory_threshold and current_result["peak_memory_mb"] > MIN_COMPARED_MEMORY_MB
+            ),
+        })
+    return comparisons
+
+
+def main(arguments: List[str]) -> int:
+    parser = argparse.ArgumentParser(description="замеры производительности основных операций")
+    subparsers = parser.add_subparsers(dest="command")
+
+    run_parser = subparsers.add_parser("run")
+    run_parser.add_argument("--sizes", type=int, nargs="+", default=BENCHMARK_SIZES)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--instruments", type=int, default=1)
+    run_parser.add_argument("--ticks-per-second", type=float)
+    run_parser.add_argument("--volatility", type=float, default=0.01)
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--per-tick-limit", type=int, default=PER_TICK_LIMIT)
+    run_parser.add_argument("--names", nargs="+")
+    run_parser.add_argument("--output", default="./logs/benchmarks.json")
+
+    compare_parser = subparsers.add_parser("compare")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1)
+    compare_parser.add_argument("--memory-threshold", type=float, default=0.2)
+
+    options = parser.parse_args(arguments)
+    if options.command == "run":
+        # логи стратегии и сделок не должны влиять на замеры
+        logging.disable(logging.CRITICAL)
+        results = run_benchmarks(options.sizes, options.seed, options.instruments, options.ticks_per_second,
+                                 options.volatility, options.repeat, options.per_tick_limit, options.names)
+        with open(options.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+        return 0
+
+    if options.command == "compare":
+        with open(options.base, encoding="utf-8") as file:
+            base = json.load(file)
+        with open(options.current, encoding="utf-8") as file:
+            current = json.load(file)
+
+        comparisons = compare_results(base, current, options.threshold, options.memory_threshold)
+        for comparison in comparisons:
+            mark = "РЕГРЕССИЯ" if comparison["is_regression"] else "ok"
+            print(f"{comparison['name']}: скорость x{comparison['speed_ratio']:.2f}, "
+                  f"память x{comparison['memory_ratio']:.2f} {mark}")
+        return 1 if any(comparison["is_regression"] for comparison in comparisons) else 0
+
+    parser.print_help()
+    return 2
+
+
+# из корня проекта:
+# python -m benchmarks.run_benchmarks run --sizes 100000 1000000 --output ./logs/benchmarks.json
+# python -m benchmarks.run_benchmarks compare ./logs/benchmarks-base.json ./logs/benchmarks.json
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
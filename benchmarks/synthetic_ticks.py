@@ -0,0 +1,54 @@
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+from tinkoff.invest import TradeDirection
+
+from domains.tick import TickBlock
+
+# начало синтетической сессии, совпадает с открытием основной сессии
+SYNTHETIC_START_TIME = "2022-05-06 07:00:00+00:00"
+
+# длительность синтетической сессии в секундах: с 07:00 до 16:00 UTC
+SYNTHETIC_SESSION_SECONDS = 9 * 60 * 60
+
+# шаг цены синтетических инструментов
+SYNTHETIC_PRICE_STEP = 0.01
+
+
+# синтетические сделки инструментов, одинаковые при одном seed
+# ticks_per_second - средняя частота сделок (интервалы распределены экспоненциально),
+# по умолчанию сделки распределяются по всей сессии
+# volatility - стандартное отклонение изменения цены на одной сделке в процентах
+def create_synthetic_ticks(
+        count: int,
+        seed: int = 0,
+        instruments: int = 1,
+        ticks_per_second: Optional[float] = None,
+        volatility: float = 0.01,
+        price: float = 100.0
+) -> List[TickBlock]:
+    rng = np.random.default_rng(seed)
+    start_time = pd.Timestamp(SYNTHETIC_START_TIME).value
+    if ticks_per_second is None:
+        ticks_per_second = count / SYNTHETIC_SESSION_SECONDS
+
+    blocks = []
+    for index in range(instruments):
+        intervals = rng.exponential(10 ** 9 / ticks_per_second, count).astype(np.int64)
+        times = start_time + np.cumsum(intervals)
+
+        returns = rng.normal(0, volatility / 100, count)
+        prices = np.round(price * np.exp(np.cumsum(returns)) / SYNTHETIC_PRICE_STEP) * SYNTHETIC_PRICE_STEP
+        prices = np.round(prices, 2)
+
+        blocks.append(TickBlock(
+            figi=f"SYNTHETIC{index:04d}",
+            directions=rng.choice(
+                [TradeDirection.TRADE_DIRECTION_BUY.value, TradeDirection.TRADE_DIRECTION_SELL.value], count
+            ).astype(np.int64),
+            prices=prices,
+            quantities=rng.integers(1, 50, count, dtype=np.int64),
+            times=times
+        ))
+    return blocks
@@ -3,3 +3,9 @@ APP_NAME = "tromario/tinkoff-invest-volume-analysis-robot"
 ONE_MINUTE_TO_SECONDS = 60
 FIVE_MINUTES_TO_SECONDS = 5 * ONE_MINUTE_TO_SECONDS
 ONE_HOUR_TO_MINUTES = 60
+
+ONE_SECOND_TO_NANOSECONDS = 1_000_000_000
+ONE_MINUTE_TO_NANOSECONDS = ONE_MINUTE_TO_SECONDS * ONE_SECOND_TO_NANOSECONDS
+FIVE_MINUTES_TO_NANOSECONDS = FIVE_MINUTES_TO_SECONDS * ONE_SECOND_TO_NANOSECONDS
+ONE_HOUR_TO_NANOSECONDS = ONE_HOUR_TO_MINUTES * ONE_MINUTE_TO_NANOSECONDS
+ONE_DAY_TO_NANOSECONDS = 24 * ONE_HOUR_TO_NANOSECONDS
@@ -0,0 +1,112 @@
+import json
+import logging
+from os.path import exists
+from typing import List, Optional, Tuple
+
+from utils.parse_util import datetime_to_ns
+
+logger = logging.getLogger(__name__)
+
+# как часто сохранять на диск расширение покрытия потоком real-time данных
+SAVE_INTERVAL_NS = 10 * 1_000_000_000
+
+
+# индекс покрытия: промежутки времени (в наносекундах UTC), сделки за которые уже сохранены на диск
+# при повторном запуске запрашиваются только непокрытые промежутки
+# real-time данные продлевают покрытие только от начала потока (live_start), а не от последнего промежутка:
+# не загруженный перед ним промежуток истории остается непокрытым и будет запрошен при следующей синхронизации
+class CoverageIndex(object):
+    def __init__(self, file_path: str = None):
+        self.file_path = file_path
+        self.ranges: List[List[int]] = []
+        # время первой записанной сделки потока real-time данных
+        self.live_start: Optional[int] = None
+        self.saved_time = 0
+        self.is_changed = False
+
+    def add(self, start, end):
+        start, end = datetime_to_ns(start), datetime_to_ns(end)
+        if start > end:
+            return
+
+        ranges = []
+        for range_start, range_end in self.ranges:
+            if range_end < start or range_start > end:
+                ranges.append([range_start, range_end])
+            else:
+                # пересекающиеся и соседние промежутки объединяю
+                start = min(start, range_start)
+                end = max(end, range_end)
+        ranges.append([start, end])
+        ranges.sort()
+
+        self.ranges = ranges
+        self.is_changed = True
+
+    # начало потока real-time данных, повторные вызовы не меняют его
+    def start_live(self, time):
+        if self.live_start is None:
+            self.live_start = datetime_to_ns(time)
+            self.is_changed = True
+
+    # продление промежутка потока поступившими real-time данными
+    def extend(self, time):
+        if self.live_start is None:
+            return
+        time = datetime_to_ns(time)
+        if len(self.ranges) > 0 and self.ranges[-1][0] <= self.live_start and time <= self.ranges[-1][1]:
+            return
+        self.add(self.live_start, time)
+
+    # непокрытые промежутки внутри [start, end]
+    def get_missing(self, start, end) -> List[Tuple[int, int]]:
+        start, end = datetime_to_ns(start), datetime_to_ns(end)
+        missing = []
+        for range_start, range_end in self.ranges:
+            if range_end < start:
+                continue
+            if range_start > end:
+                break
+            if range_start > start:
+                missing.append((start, range_start))
+            start = max(start, range_end)
+        if start < end:
+            missing.append((start, end))
+        return missing
+
+    def load(self) -> "CoverageIndex":
+        if self.file_path is None or not exists(self.file_path):
+            return self
+
+        try:
+            with open(self.file_path, encoding="utf-8") as file:
+                data = json.load(file)
+            self.ranges = [[int(start), int(end)] for start, end in data["ranges"]]
+            live_start = data.get("live_start")
+            self.live_start = int(live_start) if live_start is not None else None
+            self.is_changed = False
+        except Exception as ex:
+            # поврежденный индекс равносилен его отсутствию: данные будут запрошены заново
+            logger.error(ex)
+            self.ranges = []
+            self.live_start = None
+        return self
+
+    def save(self, time=None):
+        if self.file_path is None:
+            return
+
+        try:
+            with open(self.file_path, "w", encoding="utf-8") as file:
+                json.dump({"ranges": self.ranges, "live_start": self.live_start}, file)
+            self.is_changed = False
+            if time is not None:
+                self.saved_time = datetime_to_ns(time)
+        except Exception as ex:
+            logger.error(ex)
+
+    # сохранение не чаще SAVE_INTERVAL_NS, чтобы не писать файл на каждую сделку
+    def save_if_needed(self, time):
+        time = datetime_to_ns(time)
+        if self.is_changed and time - self.saved_time >= SAVE_INTERVAL_NS:
+            self.save(time)
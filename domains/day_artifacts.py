@@ -0,0 +1,103 @@
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from constants import ONE_HOUR_TO_NANOSECONDS
+from domains.signal_candles import SignalCandles
+from domains.tick import TickBlock
+from domains.volume_profile import VolumeProfile
+from utils.exchange_util import is_premarket_time_ns
+
+
+# артефакты дня, не зависящие от параметров касания уровней и сопровождения сделок:
+# снимки профиля на границах часов и последние закрытые сигнальные свечи после каждой сделки
+# рассчитываются один раз и используются всеми вариантами параметров при подборе
+# позиция (cursor) - количество сделок дня без премаркета, переданных в стратегию
+class DayArtifacts(object):
+    def __init__(self, block: TickBlock, profile_period: str, signal_cluster_period: str):
+        self.block = block
+        self.profile_period = profile_period
+        self.signal_cluster_period = signal_cluster_period
+
+        # стратегия не анализирует премаркет
+        indexes = np.flatnonzero(~is_premarket_time_ns(block.times))
+        self.prices = block.prices[indexes]
+        self.quantities = block.quantities[indexes]
+        self.times = block.times[indexes]
+
+        self.clusters: Dict[int, pd.DataFrame] = {}
+        self.calculate_clusters()
+
+        self.last_candles: List[Tuple[Optional[Dict], Optional[Dict]]] = [(None, None)]
+        self.candle_versions = np.zeros(len(self.times), dtype=np.int64)
+        self.calculate_candles()
+
+    # кластера пересчитываются стратегией при смене часа по всем сделкам до текущей
+    def calculate_clusters(self):
+        hours = self.times - self.times % ONE_HOUR_TO_NANOSECONDS
+        boundaries = np.flatnonzero(hours[1:] > hours[:-1]) + 1
+
+        profile = VolumeProfile(self.profile_period)
+        start = 0
+        for end in boundaries.tolist():
+            profile.update_batch(self.prices[start:end], self.quantities[start:end], self.times[start:end])
+            self.clusters[end] = profile.to_df()
+            start = end
+
+    # пара последних закрытых свечей после каждой сделки, одинаковые пары хранятся один раз
+    def calculate_candles(self):
+        signal_candles = SignalCandles(self.signal_cluster_period)
+        last_candles = self.last_candles[0]
+        for index, (price, quantity, time) in enumerate(
+                zip(self.prices.tolist(), self.quantities.tolist(), self.times.tolist())
+        ):
+            signal_candles.update(price, quantity, time)
+            candles = signal_candles.get_last_candles()
+            if candles[0] is not last_candles[0] or candles[1] is not last_candles[1]:
+                self.last_candles.append(candles)
+                last_candles = candles
+            self.candle_versions[index] = len(self.last_candles) - 1
+
+    def get_clusters(self, cursor: int) -> pd.DataFrame:
+        if cursor not in self.clusters:
+            # пересчет вне границ часа выполняется по сделкам до позиции
+            profile = VolumeProfile.from_ticks(self.profile_period, self.prices[:cursor],
+                                               self.quantities[:cursor], self.times[:cursor])
+            return profile.to_df()
+        return self.clusters[cursor]
+
+    def get_last_candles(self, cursor: int) -> Tuple[Optional[Dict], Optional[Dict]]:
+        if cursor == 0:
+            return self.last_candles[0]
+        return self.last_candles[self.candle_versions[cursor - 1]]
+
+
+# профиль, который возвращает заранее рассчитанные кластера дня вместо обновления по сделкам
+class PrecomputedProfile(object):
+    def __init__(self, artifacts: DayArtifacts):
+        self.artifacts = artifacts
+        self.cursor = 0
+
+    def update_batch(self, prices, quantities, times):
+        self.cursor += len(times)
+
+    def to_df(self) -> pd.DataFrame:
+        return self.artifacts.get_clusters(self.cursor)
+
+    # артефакты рассчитываются по одному дню, который короче глубины профиля
+    def trim(self, time) -> int:
+        return 0
+
+
+# сигнальные свечи, которые возвращают заранее рассчитанные свечи дня вместо обновления по сделкам
+class PrecomputedSignalCandles(object):
+    def __init__(self, artifacts: DayArtifacts):
+        self.artifacts = artifacts
+        self.cursor = 0
+
+    def update_batch(self, prices, quantities, times):
+        self.cursor += len(times)
+
+    def get_last_candles(self) -> Tuple[Optional[Dict], Optional[Dict]]:
+        return self.artifacts.get_last_candles(self.cursor)
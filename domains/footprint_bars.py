@@ -0,0 +1,106 @@
+import numpy as np
+import pandas as pd
+from tinkoff.invest import TradeDirection
+
+from domains.tick import TickBlock
+
+# период баров быстрого анализа истории по умолчанию
+FOOTPRINT_BAR_PERIOD = "1min"
+
+# шаг времени между ценами внутри бара при обратном развертывании в сделки
+LEVEL_TIME_STEP_NANOSECONDS = 1000
+
+
+# футпринт-бары: OHLC, объем и объем покупок/продаж, а также объем по каждой цене внутри бара
+# bars - по строке на бар, levels - по строке на пару (бар, цена)
+class FootprintBars(object):
+    def __init__(self, figi, period: str, bars: pd.DataFrame, levels: pd.DataFrame):
+        self.figi = figi
+        self.period = period
+        self.bars = bars
+        self.levels = levels
+
+    def __len__(self) -> int:
+        return len(self.bars)
+
+    @staticmethod
+    def from_ticks(block: TickBlock, period: str = FOOTPRINT_BAR_PERIOD) -> "FootprintBars":
+        period_ns = pd.Timedelta(period).value
+        quantities = block.quantities.astype(np.int64)
+        is_buy = block.directions == TradeDirection.TRADE_DIRECTION_BUY.value
+        is_sell = block.directions == TradeDirection.TRADE_DIRECTION_SELL.value
+        df = pd.DataFrame({
+            "time": block.times - block.times % period_ns,
+            "price": block.prices,
+            "volume": quantities,
+            "buy_volume": np.where(is_buy, quantities, 0),
+            "sell_volume": np.where(is_sell, quantities, 0),
+        })
+
+        # сделки упорядочены по времени, поэтому первая и последняя в группе - открытие и закрытие бара
+        groups = df.groupby("time", sort=True)
+        bars = groups["price"].agg(["first", "max", "min", "last"])
+        bars.columns = ["open", "high", "low", "close"]
+        bars = bars.join(groups[["volume", "buy_volume", "sell_volume"]].sum()).reset_index()
+
+        levels = df.groupby(["time", "price"], sort=True)[["volume", "buy_volume", "sell_volume"]].sum()
+        return FootprintBars(block.figi, period, bars, levels.reset_index())
+
+    # развертывание баров в сделки: по одной сделке на цену бара с ее объемом
+    # цены проходятся по пути открытие -> минимум -> максимум -> закрытие для растущего бара
+    # и открытие -> максимум -> минимум -> закрытие для падающего,
+    # поэтому OHLC, объем по ценам и кластера профиля совпадают с исходными сделками,
+    # а приблизительными остаются только порядок и время сделок внутри бара
+    def to_tick_block(self) -> TickBlock:
+        if len(self.bars) == 0:
+            empty = np.empty(0, dtype=np.int64)
+            return TickBlock(self.figi, empty, np.empty(0, dtype=np.float64), empty, empty)
+
+        bars = self.bars.set_index("time")
+        levels = self.levels
+        bar_open = bars["open"].reindex(levels["time"]).to_numpy()
+        bar_close = bars["close"].reindex(levels["time"]).to_numpy()
+        prices = levels["price"].to_numpy()
+        is_rising = bar_close >= bar_open
+
+        # порядок цены внутри бара: открытие, первое плечо, второе плечо, закрытие
+        order = np.where(
+            prices == bar_open, 0,
+            np.where(prices == bar_close, 3, np.where((prices < bar_open) == is_rising, 1, 2))
+        )
+        # к минимуму цены идут по убыванию, к максимуму - по возрастанию
+        is_descending = ((order == 1) & is_rising) | ((order == 2) & ~is_rising)
+        sort_price = np.where(is_descending, -prices, prices)
+
+        # бар, закрывшийся на цене открытия, завершается сделкой без объема по цене закрытия
+        counts = levels.groupby("time", sort=True).size().reindex(bars.index).to_numpy()
+        is_flat = (bars["open"].to_numpy() == bars["close"].to_numpy()) & (counts > 1)
+        flat_times = bars.index.to_numpy()[is_flat]
+        flat_prices = bars["close"].to_numpy()[is_flat]
+
+        df = pd.DataFrame({
+            "time": np.concatenate([levels["time"].to_numpy(), flat_times]),
+            "order": np.concatenate([order, np.full(len(flat_times), 4)]),
+            "sort_price": np.concatenate([sort_price, flat_prices]),
+            "price": np.concatenate([prices, flat_prices]),
+            "volume": np.concatenate([levels["volume"].to_numpy(), np.zeros(len(flat_times), dtype=np.int64)]),
+            "direction": np.concatenate([
+                np.where(
+                    levels["buy_volume"].to_numpy() >= levels["sell_volume"].to_numpy(),
+                    TradeDirection.TRADE_DIRECTION_BUY.value,
+                    TradeDirection.TRADE_DIRECTION_SELL.value
+                ),
+                np.full(len(flat_times), TradeDirection.TRADE_DIRECTION_UNSPECIFIED.value)
+            ]),
+        }).sort_values(["time", "order", "sort_price"], kind="mergesort")
+
+        # сделки бара разносятся на микросекунды от его начала, чтобы сохранить порядок по времени
+        times = df["time"].to_numpy(dtype=np.int64)
+        positions = df.groupby("time", sort=False).cumcount().to_numpy(dtype=np.int64)
+        return TickBlock(
+            self.figi,
+            df["direction"].to_numpy(dtype=np.int64),
+            df["price"].to_numpy(dtype=np.float64),
+            df["volume"].to_numpy(dtype=np.int64),
+            times + positions * LEVEL_TIME_STEP_NANOSECONDS
+        )
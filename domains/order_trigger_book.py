@@ -0,0 +1,126 @@
+import heapq
+from itertools import count
+from typing import Callable, Dict, List, Set, Tuple
+
+from tinkoff.invest import OrderDirection
+
+from domains.order import Order
+
+# записи закрытых сделок в кучах инструмента перестраиваются, когда всех записей больше указанного количества
+# и больше, чем вдвое превышающее количество записей активных сделок
+MIN_REBUILD_ENTRIES = 64
+
+
+# уровни срабатывания активных сделок одного инструмента
+# в каждой куче на вершине уровень, который цена пересечет первым:
+# long_stops - buy закрывается при цене ниже стопа, вершина - максимальный стоп
+# long_takes - buy закрывается при цене выше тейка, вершина - минимальный тейк
+# short_stops - sell закрывается при цене выше стопа, вершина - минимальный стоп
+# short_takes - sell закрывается при цене ниже тейка, вершина - максимальный тейк
+class InstrumentTriggers(object):
+    def __init__(self):
+        self.long_stops: List[Tuple[float, int]] = []
+        self.long_takes: List[Tuple[float, int]] = []
+        self.short_stops: List[Tuple[float, int]] = []
+        self.short_takes: List[Tuple[float, int]] = []
+        # активные сделки инструмента в порядке добавления
+        self.sequences: Dict[int, Order] = {}
+        self.entries_count = 0
+
+    def push(self, order: Order, sequence: int):
+        if order.direction == OrderDirection.ORDER_DIRECTION_BUY.value:
+            heapq.heappush(self.long_stops, (-order.stop, sequence))
+            heapq.heappush(self.long_takes, (order.take, sequence))
+        else:
+            heapq.heappush(self.short_stops, (order.stop, sequence))
+            heapq.heappush(self.short_takes, (-order.take, sequence))
+        self.entries_count += 2
+
+    # извлечение пересеченных ценой уровней, записи уже удаленных сделок отбрасываются
+    def pop_crossed(self, heap: List[Tuple[float, int]], is_crossed: Callable[[float], bool], crossed: Set[int]):
+        while len(heap) > 0:
+            level, sequence = heap[0]
+            if sequence in self.sequences and not is_crossed(level):
+                return
+            heapq.heappop(heap)
+            self.entries_count -= 1
+            if sequence in self.sequences:
+                crossed.add(sequence)
+
+    def get_crossed(self, price: float) -> Set[int]:
+        crossed = set()
+        self.pop_crossed(self.long_stops, lambda level: -level > price, crossed)
+        self.pop_crossed(self.long_takes, lambda level: level < price, crossed)
+        self.pop_crossed(self.short_stops, lambda level: level < price, crossed)
+        self.pop_crossed(self.short_takes, lambda level: -level > price, crossed)
+        return crossed
+
+    # перестроение куч только по активным сделкам
+    def rebuild(self):
+        self.long_stops.clear()
+        self.long_takes.clear()
+        self.short_stops.clear()
+        self.short_takes.clear()
+        self.entries_count = 0
+        for sequence, order in self.sequences.items():
+            self.push(order, sequence)
+
+
+# индекс активных сделок для проверки закрытия по стопу/тейку:
+# на каждой сделке извлекаются только пересеченные ценой уровни, поэтому стоимость проверки
+# не зависит от количества закрытых сделок в истории
+# закрытые сделки удаляются из индекса сразу, их оставшиеся записи в кучах - при извлечении или перестроении
+class OrderTriggerBook(object):
+    def __init__(self):
+        self.sequence = count()
+        # активные сделки всех инструментов в порядке добавления
+        self.orders: Dict[int, Order] = {}
+        self.sequence_by_order: Dict[int, int] = {}
+        self.triggers: Dict[str, InstrumentTriggers] = {}
+
+    def __len__(self) -> int:
+        return len(self.orders)
+
+    def __contains__(self, order: Order) -> bool:
+        return id(order) in self.sequence_by_order
+
+    def add(self, order: Order):
+        if order in self:
+            return
+
+        sequence = next(self.sequence)
+        self.orders[sequence] = order
+        self.sequence_by_order[id(order)] = sequence
+        triggers = self.triggers.setdefault(order.instrument, InstrumentTriggers())
+        triggers.sequences[sequence] = order
+        triggers.push(order, sequence)
+
+    def remove(self, order: Order):
+        sequence = self.sequence_by_order.pop(id(order), None)
+        if sequence is None:
+            return
+
+        del self.orders[sequence]
+        triggers = self.triggers[order.instrument]
+        del triggers.sequences[sequence]
+        if triggers.entries_count > max(MIN_REBUILD_ENTRIES, 4 * len(triggers.sequences)):
+            triggers.rebuild()
+
+    # активные сделки в порядке добавления, всех инструментов или одного
+    def get_active_orders(self, instrument: str = None) -> List[Order]:
+        if instrument is None:
+            return list(self.orders.values())
+        triggers = self.triggers.get(instrument)
+        return list(triggers.sequences.values()) if triggers is not None else []
+
+    # активные сделки инструмента, которые закрываются по цене, в порядке добавления
+    # сделки удаляются из индекса
+    def pop_triggered(self, instrument: str, price: float) -> List[Order]:
+        triggers = self.triggers.get(instrument)
+        if triggers is None or len(triggers.sequences) == 0:
+            return []
+
+        orders = [self.orders[sequence] for sequence in sorted(triggers.get_crossed(price))]
+        for order in orders:
+            self.remove(order)
+        return orders
@@ -0,0 +1,86 @@
+from collections import deque
+from typing import Deque, Dict, Optional, Tuple
+
+import pandas as pd
+from tinkoff.invest import TradeDirection
+
+from domains.volume_profile import ProfileCluster
+from utils.parse_util import datetime_to_ns
+from utils.strategy_util import calculate_candle_ratio
+
+# количество хранимых закрытых свечей, для поиска ТВ достаточно двух последних
+CLOSED_CANDLES_SIZE = 3
+
+
+# построение сигнальных свечей по мере поступления сделок
+# свеча рассчитывается один раз в момент закрытия, а не пересчитывается по всем сделкам дня
+class SignalCandles(object):
+    def __init__(self, period: str, size: int = CLOSED_CANDLES_SIZE):
+        self.period = period
+        self.period_ns = pd.Timedelta(period).value
+        self.current: Optional[ProfileCluster] = None
+        self.closed_candles: Deque[Dict] = deque(maxlen=size)
+
+    def update(self, price: float, quantity: int, time):
+        time = datetime_to_ns(time)
+        candle_time = time - time % self.period_ns
+
+        if self.current is None:
+            self.current = ProfileCluster(candle_time, price)
+        elif candle_time > self.current.time:
+            self.close_candle(candle_time)
+            self.current = ProfileCluster(candle_time, price)
+        # сделки с опозданием относятся к текущей свече
+
+        self.current.update(price, int(quantity))
+
+    def update_batch(self, prices, quantities, times):
+        for price, quantity, time in zip(prices.tolist(), quantities.tolist(), times.tolist()):
+            self.update(price, quantity, time)
+
+    def close_candle(self, next_candle_time: int):
+        candle = calculate_candle_ratio({
+            "time": pd.Timestamp(self.current.time, tz="UTC"),
+            "open": self.current.open,
+            "close": self.current.close,
+            "high": self.current.high,
+            "low": self.current.low,
+            "total_volume": self.current.total_volume,
+            "direction": get_candle_direction(self.current.open, self.current.close),
+            "max_volume_price": self.current.max_volume_price,
+        })
+        self.closed_candles.append(candle)
+
+        # периоды без сделок заполняются значениями предыдущей свечи, как в ticks_to_cluster
+        # хранить больше размера буфера нет смысла
+        candle_time = self.current.time + self.period_ns
+        count = min((next_candle_time - candle_time) // self.period_ns, self.closed_candles.maxlen)
+        candle_time = max(candle_time, next_candle_time - count * self.period_ns)
+        for _ in range(count):
+            empty_candle = dict(candle)
+            empty_candle["time"] = pd.Timestamp(candle_time, tz="UTC")
+            self.closed_candles.append(empty_candle)
+            candle_time += self.period_ns
+
+    # предыдущая и последняя закрытые свечи
+    def get_last_candles(self) -> Tuple[Optional[Dict], Optional[Dict]]:
+        if len(self.closed_candles) < 2:
+            return None, None
+        return self.closed_candles[-2], self.closed_candles[-1]
+
+    @staticmethod
+    def from_ticks(period: str, prices, quantities, times) -> "SignalCandles":
+        signal_candles = SignalCandles(period)
+        signal_candles.update_batch(prices, quantities, times)
+        return signal_candles
+
+
+def get_candle_direction(open_price: float, close_price: float) -> TradeDirection:
+    if close_price > open_price:
+        # бычья свеча
+        return TradeDirection.TRADE_DIRECTION_BUY
+    if open_price > close_price:
+        # медвежья свеча
+        return TradeDirection.TRADE_DIRECTION_SELL
+    # свеча доджи
+    return TradeDirection.TRADE_DIRECTION_UNSPECIFIED
@@ -0,0 +1,64 @@
+from typing import Dict, Optional
+
+from settings import PROFILE_PERIOD, PROFILE_LOOKBACK, SIGNAL_CLUSTER_PERIOD, FIRST_TOUCH_VOLUME_LEVEL, SECOND_TOUCH_VOLUME_LEVEL, \
+    PERCENTAGE_VOLUME_LEVEL_RANGE, PERCENTAGE_STOP_LOSS, FIRST_GOAL, GOAL_STEP, COUNT_LOTS, COUNT_GOALS, \
+    CAN_REVERSE_ORDER
+
+
+# параметры стратегии и сопровождения сделок, по умолчанию берутся из settings.py
+# передаются в стратегию и OrderService явно, чтобы при подборе параметров запускать варианты параллельно
+class StrategySettings(object):
+    def __init__(
+            self,
+            profile_period: str = PROFILE_PERIOD,
+            profile_lookback: Optional[str] = PROFILE_LOOKBACK,
+            signal_cluster_period: str = SIGNAL_CLUSTER_PERIOD,
+            first_touch_volume_level: int = FIRST_TOUCH_VOLUME_LEVEL,
+            second_touch_volume_level: int = SECOND_TOUCH_VOLUME_LEVEL,
+            percentage_volume_level_range: float = PERCENTAGE_VOLUME_LEVEL_RANGE,
+            percentage_stop_loss: float = PERCENTAGE_STOP_LOSS,
+            first_goal: float = FIRST_GOAL,
+            goal_step: float = GOAL_STEP,
+            count_lots: int = COUNT_LOTS,
+            count_goals: int = COUNT_GOALS,
+            can_reverse_order: bool = CAN_REVERSE_ORDER
+    ):
+        self.profile_period = profile_period
+        self.profile_lookback = profile_lookback
+        self.signal_cluster_period = signal_cluster_period
+        self.first_touch_volume_level = first_touch_volume_level
+        self.second_touch_volume_level = second_touch_volume_level
+        self.percentage_volume_level_range = percentage_volume_level_range
+        self.percentage_stop_loss = percentage_stop_loss
+        self.first_goal = first_goal
+        self.goal_step = goal_step
+        self.count_lots = count_lots
+        self.count_goals = count_goals
+        self.can_reverse_order = can_reverse_order
+
+    def __iter__(self) -> Dict:
+        yield "profile_period", self.profile_period
+        yield "profile_lookback", self.profile_lookback
+        yield "signal_cluster_period", self.signal_cluster_period
+        yield "first_touch_volume_level", self.first_touch_volume_level
+        yield "second_touch_volume_level", self.second_touch_volume_level
+        yield "percentage_volume_level_range", self.percentage_volume_level_range
+        yield "percentage_stop_loss", self.percentage_stop_loss
+        yield "first_goal", self.first_goal
+        yield "goal_step", self.goal_step
+        yield "count_lots", self.count_lots
+        yield "count_goals", self.count_goals
+        yield "can_reverse_order", self.can_reverse_order
+
+    def __repr__(self) -> str:
+        return "StrategySettings{%s}" % ", ".join(f"{key}={value}" for key, value in self)
+
+    # копия с измененными параметрами, имена принимаются как в settings.py, так и в нижнем регистре
+    def replace(self, **parameters) -> "StrategySettings":
+        values = dict(self)
+        for key, value in parameters.items():
+            key = key.lower()
+            if key not in values:
+                raise ValueError(f"неизвестный параметр стратегии: {key}")
+            values[key] = value
+        return StrategySettings(**values)
@@ -0,0 +1,65 @@
+from typing import List, NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+
+# обезличенная сделка: цена уже переведена из Quotation, время в наносекундах UTC
+class Tick(NamedTuple):
+    figi: str
+    direction: int
+    price: float
+    quantity: int
+    time: int
+
+    @property
+    def datetime(self) -> pd.Timestamp:
+        return pd.Timestamp(self.time, tz="UTC")
+
+
+# пачка обезличенных сделок одного инструмента в виде колонок numpy
+class TickBlock(NamedTuple):
+    figi: Optional[str]
+    directions: np.ndarray
+    prices: np.ndarray
+    quantities: np.ndarray
+    times: np.ndarray
+
+    @property
+    def size(self) -> int:
+        return len(self.times)
+
+    # DataFrame в формате create_empty_df, колонки ссылаются на массивы пачки без копирования
+    def to_df(self) -> pd.DataFrame:
+        times = pd.arrays.DatetimeArray(self.times.view("datetime64[ns]"), dtype=pd.DatetimeTZDtype(tz="UTC"))
+        return pd.DataFrame({
+            "figi": self.figi,
+            "direction": self.directions,
+            "price": self.prices,
+            "quantity": self.quantities,
+            "time": times
+        }, columns=["figi", "direction", "price", "quantity", "time"], copy=False)
+
+    @staticmethod
+    def from_ticks(ticks: List[Tick]) -> "TickBlock":
+        if len(ticks) == 0:
+            return TickBlock(
+                figi=None,
+                directions=np.empty(0, dtype=np.int64),
+                prices=np.empty(0, dtype=np.float64),
+                quantities=np.empty(0, dtype=np.int64),
+                times=np.empty(0, dtype=np.int64)
+            )
+
+        figis, directions, prices, quantities, times = zip(*ticks)
+        return TickBlock(
+            figi=figis[0],
+            directions=np.array(directions, dtype=np.int64),
+            prices=np.array(prices, dtype=np.float64),
+            quantities=np.array(quantities, dtype=np.int64),
+            times=np.array(times, dtype=np.int64)
+        )
+
+
+def ticks_to_df(ticks: List[Tick]) -> pd.DataFrame:
+    return TickBlock.from_ticks(ticks).to_df()
@@ -0,0 +1,145 @@
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from domains.tick import Tick, TickBlock
+from utils.parse_util import datetime_to_ns
+
+# начальная емкость буфера, при заполнении емкость удваивается
+INITIAL_CAPACITY = 1 << 14
+
+
+# хранилище обезличенных сделок инструмента в виде колонок numpy
+# добавление сделки выполняется за амортизированное O(1) вместо копирования всего DataFrame на каждый тик
+class TickBuffer(object):
+    def __init__(self, figi: Optional[str] = None, capacity: int = INITIAL_CAPACITY):
+        self.figi = figi
+        self.size = 0
+        self._allocate(max(capacity, 1))
+
+    def __len__(self) -> int:
+        return self.size
+
+    def _allocate(self, capacity: int):
+        self._directions = np.empty(capacity, dtype=np.int64)
+        self._prices = np.empty(capacity, dtype=np.float64)
+        self._quantities = np.empty(capacity, dtype=np.int64)
+        # время хранится в наносекундах UTC
+        self._times = np.empty(capacity, dtype=np.int64)
+
+    def _reserve(self, count: int):
+        required = self.size + count
+        capacity = len(self._times)
+        if required <= capacity:
+            return
+
+        while capacity < required:
+            capacity *= 2
+
+        # выданные ранее представления продолжают ссылаться на старые массивы и остаются корректными
+        directions, prices, quantities, times = self._directions, self._prices, self._quantities, self._times
+        self._allocate(capacity)
+        self._directions[:self.size] = directions[:self.size]
+        self._prices[:self.size] = prices[:self.size]
+        self._quantities[:self.size] = quantities[:self.size]
+        self._times[:self.size] = times[:self.size]
+
+    def append(self, direction: int, price: float, quantity: int, time):
+        if self.size == len(self._times):
+            self._reserve(1)
+
+        index = self.size
+        self._directions[index] = direction
+        self._prices[index] = price
+        self._quantities[index] = quantity
+        self._times[index] = datetime_to_ns(time)
+        self.size += 1
+
+    def extend(self, directions, prices, quantities, times):
+        count = len(times)
+        if count == 0:
+            return
+
+        self._reserve(count)
+        start, end = self.size, self.size + count
+        self._directions[start:end] = directions
+        self._prices[start:end] = prices
+        self._quantities[start:end] = quantities
+        self._times[start:end] = times
+        self.size = end
+
+    def extend_buffer(self, buffer: "TickBuffer"):
+        self.extend(buffer.directions, buffer.prices, buffer.quantities, buffer.times)
+
+    def extend_block(self, block: TickBlock):
+        if self.figi is None:
+            self.figi = block.figi
+        self.extend(block.directions, block.prices, block.quantities, block.times)
+
+    def append_tick(self, tick: Tick):
+        self.append(tick.direction, tick.price, tick.quantity, tick.time)
+
+    def extend_df(self, df: pd.DataFrame):
+        if df is None or len(df) == 0:
+            return
+
+        if self.figi is None:
+            self.figi = df["figi"].iloc[0]
+
+        times = pd.to_datetime(df["time"], utc=True).values.astype("datetime64[ns]").view(np.int64)
+        self.extend(
+            df["direction"].to_numpy(dtype=np.int64),
+            df["price"].to_numpy(dtype=np.float64),
+            df["quantity"].to_numpy(dtype=np.int64),
+            times
+        )
+
+    # очистка буфера: выделяю новые массивы, т.к. выданные представления не должны перезаписываться
+    def clear(self):
+        self.size = 0
+        self._allocate(len(self._times))
+
+    # удаление сделок раньше указанного времени, сделки в буфере упорядочены по времени
+    # оставшиеся сделки копируются в новые массивы, т.к. выданные представления не должны перезаписываться
+    def trim(self, time) -> int:
+        count = int(np.searchsorted(self.times, datetime_to_ns(time), side="left"))
+        if count == 0:
+            return 0
+
+        directions, prices, quantities, times = self.directions, self.prices, self.quantities, self.times
+        self.size = 0
+        self._allocate(len(self._times))
+        self.extend(directions[count:], prices[count:], quantities[count:], times[count:])
+        return count
+
+    # представления данных без копирования; действительны до следующего изменения буфера
+    @property
+    def directions(self) -> np.ndarray:
+        return self._directions[:self.size]
+
+    @property
+    def prices(self) -> np.ndarray:
+        return self._prices[:self.size]
+
+    @property
+    def quantities(self) -> np.ndarray:
+        return self._quantities[:self.size]
+
+    @property
+    def times(self) -> np.ndarray:
+        return self._times[:self.size]
+
+    def block(self) -> TickBlock:
+        return TickBlock(self.figi, self.directions, self.prices, self.quantities, self.times)
+
+    # DataFrame в формате create_empty_df, колонки ссылаются на массивы буфера без копирования
+    def to_df(self) -> pd.DataFrame:
+        return self.block().to_df()
+
+    @staticmethod
+    def from_df(df: pd.DataFrame, figi: Optional[str] = None) -> "TickBuffer":
+        size = 0 if df is None else len(df)
+        buffer = TickBuffer(figi, capacity=max(INITIAL_CAPACITY, size * 2))
+        buffer.extend_df(df)
+        return buffer
@@ -0,0 +1,49 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from settings import PERCENTAGE_VOLUME_LEVEL_RANGE
+from utils.strategy_util import calculate_level_range
+
+
+# объемные уровни, отсортированные по цене, с заранее рассчитанными границами диапазона
+# поиск уровней, которых коснулась цена, выполняется бинарным поиском за O(log L)
+class VolumeLevels(object):
+    def __init__(
+            self,
+            clusters: Optional[pd.DataFrame] = None,
+            percentage: float = PERCENTAGE_VOLUME_LEVEL_RANGE
+    ):
+        if clusters is None or len(clusters) == 0:
+            prices = np.empty(0, dtype=np.float64)
+            times = []
+        else:
+            prices = clusters["max_volume_price"].to_numpy(dtype=np.float64)
+            times = list(clusters["time"])
+
+        # сохраняю исходный порядок кластеров (по времени), т.к. касание обрабатывается для первого подходящего
+        self.order = np.argsort(prices, kind="stable")
+        self.prices = prices[self.order]
+        self.times = [times[index] for index in self.order]
+        self.reduced_levels, self.increased_levels = calculate_level_range(self.prices, percentage)
+
+        # нижние границы могут нарушать сортировку из-за округления, для поиска использую нижнюю огибающую
+        self.search_reduced_levels = np.minimum.accumulate(self.reduced_levels[::-1])[::-1]
+
+    def __len__(self) -> int:
+        return len(self.prices)
+
+    # уровни, в диапазон которых попадает цена, в порядке формирования уровней
+    def find(self, current_price: float) -> List[Tuple[pd.Timestamp, float]]:
+        start = np.searchsorted(self.increased_levels, current_price, side="left")
+        end = np.searchsorted(self.search_reduced_levels, current_price, side="right")
+        if start >= end:
+            return []
+
+        indexes = [
+            index for index in range(start, end)
+            if self.reduced_levels[index] <= current_price <= self.increased_levels[index]
+        ]
+        indexes.sort(key=lambda index: self.order[index])
+        return [(self.times[index], float(self.prices[index])) for index in indexes]
@@ -0,0 +1,125 @@
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+from tinkoff.invest import TradeDirection
+
+from utils.parse_util import datetime_to_ns
+
+
+# кластер профиля за один период: OHLC и распределение объема по ценам
+class ProfileCluster(object):
+    __slots__ = ("time", "open", "close", "high", "low", "total_volume", "volumes", "max_volume_price", "max_volume")
+
+    def __init__(self, time: int, price: float):
+        self.time = time
+        self.open = price
+        self.close = price
+        self.high = price
+        self.low = price
+        self.total_volume = 0
+        self.volumes: Dict[float, int] = {}
+        self.max_volume_price = price
+        self.max_volume = 0
+
+    def update(self, price: float, quantity: int):
+        self.close = price
+        if price > self.high:
+            self.high = price
+        if price < self.low:
+            self.low = price
+        self.total_volume += quantity
+
+        volume = self.volumes.get(price, 0) + quantity
+        self.volumes[price] = volume
+        # при равных объемах приоритет у меньшей цены, как у groupby(["price"]).idxmax()
+        if volume > self.max_volume or (volume == self.max_volume and price < self.max_volume_price):
+            self.max_volume = volume
+            self.max_volume_price = price
+
+
+# профиль рынка, который обновляется на каждой сделке
+# вместо пересчета ticks_to_cluster по всем сделкам с начала дня
+class VolumeProfile(object):
+    def __init__(self, period: str):
+        self.period = period
+        self.period_ns = pd.Timedelta(period).value
+        self.clusters: Dict[int, ProfileCluster] = {}
+        self.current: Optional[ProfileCluster] = None
+
+    def __len__(self) -> int:
+        return len(self.clusters)
+
+    def get_cluster_time(self, time) -> int:
+        time = datetime_to_ns(time)
+        return time - time % self.period_ns
+
+    def update(self, price: float, quantity: int, time):
+        cluster_time = self.get_cluster_time(time)
+        cluster = self.current
+        if cluster is None or cluster.time != cluster_time:
+            cluster = self.clusters.get(cluster_time)
+            if cluster is None:
+                cluster = ProfileCluster(cluster_time, price)
+                self.clusters[cluster_time] = cluster
+            self.current = cluster
+        cluster.update(price, int(quantity))
+
+    def update_batch(self, prices, quantities, times):
+        for price, quantity, time in zip(prices.tolist(), quantities.tolist(), times.tolist()):
+            self.update(price, quantity, time)
+
+    # удаление кластеров периодов, начавшихся раньше указанного времени
+    def trim(self, time) -> int:
+        time = datetime_to_ns(time)
+        cluster_times = [cluster_time for cluster_time in self.clusters if cluster_time < time]
+        for cluster_time in cluster_times:
+            del self.clusters[cluster_time]
+        if self.current is not None and self.current.time < time:
+            self.current = None
+        return len(cluster_times)
+
+    def get_cluster(self, time) -> Optional[ProfileCluster]:
+        return self.clusters.get(self.get_cluster_time(time))
+
+    # цена с максимальным объемом (POC) за период, в который входит указанное время
+    def get_max_volume_price(self, time) -> Optional[float]:
+        cluster = self.get_cluster(time)
+        if cluster is None:
+            return None
+        return cluster.max_volume_price
+
+    # кластерные свечи в формате ticks_to_cluster, включая незавершенный период
+    def to_df(self) -> pd.DataFrame:
+        columns = ["time", "open", "close", "high", "low", "total_volume", "direction", "max_volume_price"]
+        if not self.clusters:
+            return pd.DataFrame(columns=columns)
+
+        first_time = min(self.clusters)
+        last_time = max(self.clusters)
+        count = (last_time - first_time) // self.period_ns + 1
+
+        values = np.full((count, 6), np.nan)
+        for cluster in self.clusters.values():
+            index = (cluster.time - first_time) // self.period_ns
+            values[index] = (cluster.open, cluster.close, cluster.high, cluster.low,
+                             cluster.total_volume, cluster.max_volume_price)
+
+        candles = pd.DataFrame(values, columns=["open", "close", "high", "low", "total_volume", "max_volume_price"])
+        # периоды без сделок заполняю значениями предыдущего периода, как в ticks_to_cluster
+        candles = candles.ffill()
+
+        times = first_time + np.arange(count, dtype=np.int64) * self.period_ns
+        candles["time"] = pd.to_datetime(times, utc=True)
+        candles["direction"] = np.select(
+            [candles["close"] > candles["open"], candles["open"] > candles["close"]],
+            [TradeDirection.TRADE_DIRECTION_BUY, TradeDirection.TRADE_DIRECTION_SELL],
+            TradeDirection.TRADE_DIRECTION_UNSPECIFIED
+        )
+        return candles[columns]
+
+    @staticmethod
+    def from_ticks(period: str, prices, quantities, times) -> "VolumeProfile":
+        profile = VolumeProfile(period)
+        profile.update_batch(prices, quantities, times)
+        return profile
@@ -0,0 +1,264 @@
+import logging
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from tinkoff.invest import OrderDirection
+
+from domains.footprint_bars import FOOTPRINT_BAR_PERIOD, FootprintBars
+from domains.order import Order
+from domains.strategy_settings import StrategySettings
+from domains.tick import TickBlock
+from services.cache_service import CacheService
+from services.history_source import HistorySource
+from services.order_service import OrderService
+from services.tick_storage import TickStorage, read_csv_ticks
+from strategies.base_strategy import BaseStrategy
+from strategies.profile_touch_strategy import ProfileTouchStrategy
+from utils.clock import EventClock
+from utils.exchange_util import is_open_orders_ns
+from utils.order_util import calculate_statistics
+from utils.parse_util import datetime_to_ns
+
+logger = logging.getLogger(__name__)
+
+
+# индекс первой сделки, на которой processed_orders закроет позицию, или len(prices)
+def find_close_index(order: Order, instrument: str, prices: np.ndarray, is_closed_time: np.ndarray) -> int:
+    if order.instrument != instrument:
+        # позиции других инструментов закрываются только по времени
+        condition = is_closed_time
+    elif order.direction == OrderDirection.ORDER_DIRECTION_BUY.value:
+        condition = is_closed_time | (prices < order.stop) | (prices > order.take)
+    else:
+        condition = is_closed_time | (prices > order.stop) | (prices < order.take)
+
+    index = int(np.argmax(condition)) if len(condition) > 0 else 0
+    if len(condition) == 0 or not condition[index]:
+        return len(prices)
+    return index
+
+
+# анализ истории: сделки дня загружаются в массивы одним чтением и передаются в стратегию одной пачкой
+# позиции проверяются OrderService.processed_orders только на сделках, на которых они закрываются,
+# поэтому результат совпадает с поочередной обработкой каждой сделки
+# время OrderService по умолчанию - время последней проанализированной сделки
+class BacktestService(object):
+    def __init__(
+            self,
+            instrument_name: str,
+            strategy: Optional[BaseStrategy] = None,
+            order_service: Optional[OrderService] = None
+    ):
+        self.instrument_name = instrument_name
+        self.strategy = strategy if strategy is not None else ProfileTouchStrategy(instrument_name)
+        self.clock = EventClock()
+        self.order_service = order_service if order_service is not None \
+            else OrderService(file_path=None, clock=self.clock)
+
+        self.ticks_count = 0
+        self.seconds = 0.0
+
+    def run_file(self, file_path: str) -> List[Order]:
+        logger.info("анализ истории: %s", file_path)
+        started = time.perf_counter()
+        block = read_csv_ticks(file_path)
+        self.seconds += time.perf_counter() - started
+        return self.run(block)
+
+    def run(self, block: TickBlock) -> List[Order]:
+        started = time.perf_counter()
+        if block.figi is not None and self.strategy.ticks.figi is None:
+            self.strategy.ticks.figi = block.figi
+
+        prices, times = block.prices, block.times
+        is_closed_time = ~is_open_orders_ns(times)
+
+        results = self.strategy.analyze_batch(prices, block.quantities, block.directions, times)
+        position = 0
+        for index, orders in results:
+            self.processed_orders(prices, times, is_closed_time, position, index + 1)
+            position = index + 1
+            for order in orders:
+                self.order_service.create_order(order)
+        self.processed_orders(prices, times, is_closed_time, position, len(times))
+        if block.size > 0:
+            self.clock.advance(int(times[-1]))
+
+        self.ticks_count += block.size
+        self.seconds += time.perf_counter() - started
+        return self.order_service.orders
+
+    # непрерывный анализ потока пачек, например HistorySource за несколько дней:
+    # стратегия и позиции не пересоздаются, поэтому уровни и открытые позиции переходят между днями
+    def run_stream(self, blocks: Iterable[TickBlock]) -> List[Order]:
+        for block in blocks:
+            self.run(block)
+        return self.order_service.orders
+
+    # быстрый анализ по футпринт-барам: в стратегию передается по одной сделке на цену бара,
+    # поэтому касания уровней и закрытие позиций определяются с точностью до бара
+    def run_bars(self, block: TickBlock, period: str = FOOTPRINT_BAR_PERIOD) -> List[Order]:
+        return self.run(FootprintBars.from_ticks(block, period).to_tick_block())
+
+    # проверка позиций на сделках [start, end): processed_orders вызывается только там, где позиции закрываются
+    def processed_orders(self, prices: np.ndarray, times: np.ndarray, is_closed_time: np.ndarray, start: int,
+                         end: int):
+        while start < end:
+            active_orders = self.order_service.get_active_orders()
+            if len(active_orders) == 0:
+                return
+
+            close_index = min(
+                find_close_index(order, self.instrument_name, prices[start:end], is_closed_time[start:end])
+                for order in active_orders
+            )
+            if close_index == end - start:
+                return
+
+            index = start + close_index
+            self.order_service.processed_orders(self.instrument_name, float(prices[index]),
+                                                pd.Timestamp(int(times[index]), tz="UTC"))
+            start = index + 1
+
+    # после завершения анализа перестраиваю кластера, т.к. закрытие торгов не совпадает целому часу
+    def finish(self):
+        self.strategy.calculate_clusters()
+        self.order_service.write_statistics()
+
+    def get_ticks_per_second(self) -> float:
+        if self.seconds == 0:
+            return 0.0
+        return self.ticks_count / self.seconds
+
+    def get_report(self) -> Dict:
+        return {
+            "instrument": self.instrument_name,
+            "ticks": self.ticks_count,
+            "seconds": self.seconds,
+            "ticks_per_second": self.get_ticks_per_second(),
+            "orders_count": len(self.order_service.orders),
+        }
+
+
+# расхождение анализа по барам с анализом по сделкам
+# совпавшими считаются сделки с одинаковым направлением, открытые в одном баре
+def calculate_divergence(exact_orders: List[Order], bar_orders: List[Order],
+                         period: str = FOOTPRINT_BAR_PERIOD) -> Dict:
+    def get_entries(orders: List[Order]) -> Dict[Tuple[pd.Timestamp, int], int]:
+        entries = {}
+        for order in orders:
+            key = (pd.Timestamp(order.time).floor(period), order.direction)
+            entries[key] = entries.get(key, 0) + 1
+        return entries
+
+    exact_entries = get_entries(exact_orders)
+    bar_entries = get_entries(bar_orders)
+    matched_orders = sum(min(count, bar_entries.get(key, 0)) for key, count in exact_entries.items())
+
+    exact_statistics = calculate_statistics(exact_orders)
+    bar_statistics = calculate_statistics(bar_orders)
+    return {
+        "exact_orders": exact_statistics["orders"],
+        "bar_orders": bar_statistics["orders"],
+        "matched_orders": matched_orders,
+        "exact_total_points": exact_statistics["total_points"],
+        "bar_total_points": bar_statistics["total_points"],
+        "points_divergence": bar_statistics["total_points"] - exact_statistics["total_points"],
+    }
+
+
+# анализ дня по сделкам и по барам с отчетом о расхождении и ускорении
+def compare_bar_backtest(instrument_name: str, block: TickBlock, period: str = FOOTPRINT_BAR_PERIOD) -> Dict:
+    exact_service = BacktestService(instrument_name)
+    exact_orders = exact_service.run(block)
+    bar_service = BacktestService(instrument_name)
+    bar_orders = bar_service.run_bars(block, period)
+
+    report = calculate_divergence(exact_orders, bar_orders, period)
+    report["instrument"] = instrument_name
+    report["ticks"] = exact_service.ticks_count
+    report["bar_ticks"] = bar_service.ticks_count
+    report["exact_seconds"] = exact_service.seconds
+    report["bar_seconds"] = bar_service.seconds
+    return report
+
+
+# анализ одного файла истории инструмента, выполняется в отдельном процессе
+# при заданном cache_path разобранные сделки и итог анализа берутся из кэша, если файл и код не изменились
+def run_backtest_job(instrument_name: str, file_path: str, cache_path: Optional[str] = None) -> Dict:
+    cache_service = CacheService(cache_path) if cache_path is not None else None
+    if cache_service is not None:
+        key = cache_service.get_orders_key(instrument_name, file_path, StrategySettings())
+        report = cache_service.get("orders", key)
+        if report is not None:
+            report["is_cached"] = True
+            return report
+
+    backtest_service = BacktestService(instrument_name)
+    if cache_service is not None:
+        started = time.perf_counter()
+        block = cache_service.read_ticks(file_path)
+        backtest_service.seconds += time.perf_counter() - started
+        backtest_service.run(block)
+    else:
+        backtest_service.run_file(file_path)
+    backtest_service.strategy.calculate_clusters()
+
+    report = backtest_service.get_report()
+    report["file_path"] = file_path
+    report["orders"] = backtest_service.order_service.orders
+    if cache_service is not None:
+        cache_service.put("orders", key, report)
+    return report
+
+
+# параллельный анализ файлов истории: задачи (инструмент, файл) распределяются по процессам,
+# результаты возвращаются по мере готовности, но строго в порядке задач, независимо от порядка завершения
+def run_backtests(jobs: List[Tuple[str, str]], processes: Optional[int] = None,
+                  cache_path: Optional[str] = None) -> Iterator[Dict]:
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = {
+            executor.submit(run_backtest_job, instrument_name, file_path, cache_path): index
+            for index, (instrument_name, file_path) in enumerate(jobs)
+        }
+
+        reports = {}
+        next_index = 0
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                reports[index] = future.result()
+            except Exception as ex:
+                logger.error(ex)
+                instrument_name, file_path = jobs[index]
+                reports[index] = {"instrument": instrument_name, "file_path": file_path, "orders": [],
+                                  "error": str(ex)}
+
+            while next_index in reports:
+                yield reports.pop(next_index)
+                next_index += 1
+
+
+# статистика по сделкам задачи в том же виде, что и при последовательном анализе
+def write_backtest_statistics(report: Dict):
+    orders = report["orders"]
+    clock = EventClock(datetime_to_ns(orders[-1].time) if len(orders) > 0 else None)
+    order_service = OrderService(file_path=None, clock=clock)
+    order_service.orders = orders
+    order_service.write_statistics()
+
+
+# непрерывный анализ истории из корня проекта: python -m services.backtest_service SBER 20220504 20220520
+if __name__ == "__main__":
+    name = sys.argv[1] if len(sys.argv) > 1 else "SBER"
+    start_date = sys.argv[2] if len(sys.argv) > 2 else "00000000"
+    end_date = sys.argv[3] if len(sys.argv) > 3 else "99999999"
+
+    backtest_service = BacktestService(name)
+    backtest_service.run_stream(HistorySource(name, start_date, end_date, storage=TickStorage()))
+    backtest_service.finish()
+    print(backtest_service.get_report())
@@ -0,0 +1,231 @@
+import glob
+import hashlib
+import json
+import logging
+import os
+import pickle
+import shutil
+import sys
+import uuid
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from domains.day_artifacts import DayArtifacts
+from domains.strategy_settings import StrategySettings
+from domains.tick import TickBlock
+from services.tick_storage import read_csv_ticks
+from settings import BACKTEST_CACHE_PATH, BACKTEST_CACHE_MAX_SIZE_MB
+from utils.strategy_util import ticks_to_cluster
+
+logger = logging.getLogger(__name__)
+
+# виды записей кэша, каждый хранится в отдельном каталоге
+CACHE_KINDS = ("ticks", "clusters", "orders")
+
+# каталоги с кодом, от которого зависят результаты анализа
+CODE_DIRECTORIES = ("domains", "services", "strategies", "utils")
+
+# хэши файлов по (путь, размер, время изменения), чтобы не читать файл повторно в одном процессе
+_file_hashes: Dict[tuple, str] = {}
+
+
+def get_file_hash(file_path: str) -> str:
+    stat = os.stat(file_path)
+    key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+    if key not in _file_hashes:
+        file_hash = hashlib.sha256()
+        with open(file_path, "rb") as file:
+            for chunk in iter(lambda: file.read(1024 * 1024), b""):
+                file_hash.update(chunk)
+        _file_hashes[key] = file_hash.hexdigest()
+    return _file_hashes[key]
+
+
+# версия кода - хэш исходников, влияющих на результат, любое изменение делает старые записи недоступными
+@lru_cache(maxsize=1)
+def get_code_version() -> str:
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    file_paths = [os.path.join(root, "constants.py")]
+    for directory in CODE_DIRECTORIES:
+        file_paths += glob.glob(os.path.join(root, directory, "*.py"))
+
+    code_hash = hashlib.sha256()
+    for file_path in sorted(file_paths):
+        code_hash.update(os.path.relpath(file_path, root).encode("utf-8"))
+        with open(file_path, "rb") as file:
+            code_hash.update(file.read())
+    return code_hash.hexdigest()
+
+
+# кэш промежуточных и итоговых результатов анализа истории на диске
+# ключ записи - хэш от вида, версии кода, хэша файла истории и влияющих на результат настроек
+# при превышении размера удаляются давно не использованные записи
+# размер кэша считается обходом записей один раз, далее ведется при записи и удалении,
+# поэтому обход на каждой записи выполняется только при превышении размера
+class CacheService(object):
+    def __init__(self, root: str = BACKTEST_CACHE_PATH, max_size_mb: float = BACKTEST_CACHE_MAX_SIZE_MB):
+        self.root = root
+        self.max_size = int(max_size_mb * 1024 * 1024)
+        self.total_size: Optional[int] = None
+
+    def get_key(self, kind: str, *parts) -> str:
+        value = json.dumps([kind, get_code_version(), parts], sort_keys=True, default=str)
+        return hashlib.sha256(value.encode("utf-8")).hexdigest()
+
+    def get_path(self, kind: str, key: str) -> str:
+        return os.path.join(self.root, kind, key[:2], f"{key}.pkl")
+
+    def get(self, kind: str, key: str):
+        path = self.get_path(kind, key)
+        try:
+            with open(path, "rb") as file:
+                value = pickle.load(file)
+        except FileNotFoundError:
+            return None
+        except Exception as ex:
+            # поврежденная запись удаляется и рассчитывается заново
+            logger.error("ошибка чтения кэша %s: %s", path, ex)
+            self.remove(path)
+            return None
+
+        # время изменения - время последнего использования для вытеснения
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+        return value
+
+    def put(self, kind: str, key: str, value):
+        path = self.get_path(kind, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # запись во временный файл и переименование, чтобы параллельные процессы не прочитали часть записи
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(temp_path, "wb") as file:
+            pickle.dump(value, file, protocol=pickle.HIGHEST_PROTOCOL)
+        size = os.path.getsize(temp_path)
+        replaced_size = self.get_size(path)
+        os.replace(temp_path, path)
+
+        if self.total_size is None:
+            self.total_size = self.get_total_size()
+        else:
+            self.total_size += size - replaced_size
+        if self.total_size > self.max_size:
+            self.evict()
+
+    def get_or_create(self, kind: str, key: str, create: Callable):
+        value = self.get(kind, key)
+        if value is None:
+            value = create()
+            self.put(kind, key, value)
+        return value
+
+    def get_entries(self) -> List[os.DirEntry]:
+        entries = []
+        for kind in CACHE_KINDS:
+            for directory in glob.glob(os.path.join(self.root, kind, "*")):
+                try:
+                    entries += [entry for entry in os.scandir(directory) if entry.name.endswith(".pkl")]
+                except FileNotFoundError:
+                    continue
+        return entries
+
+    def get_size(self, path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except FileNotFoundError:
+            return 0
+
+    def get_total_size(self) -> int:
+        return sum(stats["size"] for stats in self.get_stats().values())
+
+    # вытеснение давно не использованных записей до заданного размера
+    # размер пересчитывается по записям, в том числе добавленным другими процессами
+    def evict(self):
+        sizes = []
+        for entry in self.get_entries():
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            sizes.append((stat.st_mtime_ns, stat.st_size, entry.path))
+
+        total_size = sum(size for _, size, _ in sizes)
+        for _, size, path in sorted(sizes):
+            if total_size <= self.max_size:
+                break
+            self.remove(path)
+            total_size -= size
+        self.total_size = total_size
+
+    def remove(self, path: str):
+        size = self.get_size(path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            return
+        if self.total_size is not None:
+            self.total_size -= size
+
+    # удаление записей указанного вида или всего кэша
+    def invalidate(self, kind: Optional[str] = None):
+        if kind is not None and kind not in CACHE_KINDS:
+            raise ValueError(f"неизвестный вид записей кэша: {kind}")
+
+        for current_kind in CACHE_KINDS if kind is None else [kind]:
+            shutil.rmtree(os.path.join(self.root, current_kind), ignore_errors=True)
+        self.total_size = None
+
+    def get_stats(self) -> Dict[str, Dict]:
+        stats = {kind: {"entries": 0, "size": 0} for kind in CACHE_KINDS}
+        for entry in self.get_entries():
+            kind = os.path.basename(os.path.dirname(os.path.dirname(entry.path)))
+            try:
+                stats[kind]["size"] += entry.stat().st_size
+            except FileNotFoundError:
+                continue
+            stats[kind]["entries"] += 1
+        return stats
+
+    # разобранные сделки файла истории
+    def read_ticks(self, file_path: str) -> TickBlock:
+        key = self.get_key("ticks", get_file_hash(file_path))
+        return self.get_or_create("ticks", key, lambda: read_csv_ticks(file_path))
+
+    # кластерные свечи ticks_to_cluster по всем сделкам файла за период
+    def get_clusters(self, file_path: str, period: str) -> pd.DataFrame:
+        key = self.get_key("clusters", get_file_hash(file_path), period)
+        return self.get_or_create("clusters", key,
+                                  lambda: ticks_to_cluster(self.read_ticks(file_path).to_df(), period))
+
+    # снимки профиля и сигнальные свечи дня для подбора параметров
+    # bar_period - сделки предварительно свернуты в футпринт-бары
+    def get_day_artifacts(self, file_path: str, block: TickBlock, profile_period: str, signal_cluster_period: str,
+                          bar_period: Optional[str] = None) -> DayArtifacts:
+        key = self.get_key("clusters", get_file_hash(file_path), "artifacts", bar_period, profile_period,
+                           signal_cluster_period)
+        return self.get_or_create("clusters", key,
+                                  lambda: DayArtifacts(block, profile_period, signal_cluster_period))
+
+    # ключ итога анализа файла: отчета BacktestService вместе со списком сделок
+    def get_orders_key(self, instrument_name: str, file_path: str, settings: StrategySettings) -> str:
+        return self.get_key("orders", instrument_name, get_file_hash(file_path), dict(settings))
+
+
+# управление кэшем из корня проекта:
+# python -m services.cache_service stats
+# python -m services.cache_service invalidate [ticks|clusters|orders]
+if __name__ == "__main__":
+    cache_service = CacheService()
+    command = sys.argv[1] if len(sys.argv) > 1 else "stats"
+    if command == "invalidate":
+        cache_service.invalidate(sys.argv[2] if len(sys.argv) > 2 else None)
+    elif command != "stats":
+        print(f"неизвестная команда: {command}")
+        sys.exit(1)
+
+    for cache_kind, kind_stats in cache_service.get_stats().items():
+        print(f"{cache_kind}: записей {kind_stats['entries']}, {kind_stats['size'] / 1024 / 1024:.1f} МБ")
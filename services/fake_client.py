@@ -0,0 +1,124 @@
+import asyncio
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from tinkoff.invest import GetLastTradesResponse, MarketDataResponse, Trade, TradeDirection
+
+from domains.tick import TickBlock
+from utils.clock import EventClock
+from utils.format_util import float_to_quotation
+from utils.parse_util import datetime_to_ns
+
+# при воспроизведении без ограничения скорости поток отдает управление циклу событий через указанное
+# количество сообщений, иначе обработчики инструментов не успевают забирать сделки из очередей
+YIELD_EVERY_MESSAGES = 100
+
+
+def create_trade(figi: str, direction: int, price: float, quantity: int, time_ns: int) -> Trade:
+    return Trade(
+        figi=figi,
+        direction=TradeDirection(direction),
+        price=float_to_quotation(price),
+        quantity=quantity,
+        time=pd.Timestamp(time_ns, tz="UTC").to_pydatetime(warn=False)
+    )
+
+
+# поток market_data_stream по заранее загруженным сделкам инструментов (из csv или синтетическим)
+# сделки всех инструментов отдаются в порядке времени
+# speed - множитель скорости относительно времени сделок, 0 - без пауз, с максимальной скоростью
+# clock - время робота, переводится на время каждой отдаваемой сделки
+class FakeMarketDataStreamService(object):
+    def __init__(self, blocks: List[TickBlock], speed: float = 0.0, clock: Optional[EventClock] = None):
+        self.blocks = blocks
+        self.speed = speed
+        self.clock = clock
+        self.sent_count = 0
+        self.started_time: Optional[float] = None
+        self.finished_time: Optional[float] = None
+
+    async def market_data_stream(self, requests):
+        # первый запрос - подписка на сделки, воспроизводятся только инструменты подписки
+        request = await requests.__anext__()
+        await requests.aclose()
+        figis = {instrument.figi for instrument in request.subscribe_trades_request.instruments}
+        blocks = [block for block in self.blocks if block.figi in figis and block.size > 0]
+        if len(blocks) == 0:
+            return
+
+        block_indexes = np.concatenate([np.full(block.size, index) for index, block in enumerate(blocks)])
+        tick_indexes = np.concatenate([np.arange(block.size) for block in blocks])
+        times = np.concatenate([block.times for block in blocks])
+        order = np.argsort(times, kind="stable")
+
+        loop = asyncio.get_running_loop()
+        self.started_time = time.perf_counter()
+        start_loop_time = loop.time()
+        first_time = int(times[order[0]])
+        for block_index, tick_index, tick_time in zip(block_indexes[order].tolist(), tick_indexes[order].tolist(),
+                                                      times[order].tolist()):
+            if self.speed > 0:
+                delay = start_loop_time + (tick_time - first_time) / 10 ** 9 / self.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif self.sent_count % YIELD_EVERY_MESSAGES == 0:
+                await asyncio.sleep(0)
+
+            block = blocks[block_index]
+            trade = create_trade(block.figi, int(block.directions[tick_index]), float(block.prices[tick_index]),
+                                 int(block.quantities[tick_index]), tick_time)
+            if self.clock is not None:
+                self.clock.advance(tick_time)
+            self.sent_count += 1
+            yield MarketDataResponse(trade=trade)
+        self.finished_time = time.perf_counter()
+
+
+# get_last_trades по тем же сделкам, что и поток
+class FakeMarketDataService(object):
+    def __init__(self, blocks: List[TickBlock]):
+        self.blocks_by_figi: Dict[str, TickBlock] = {block.figi: block for block in blocks}
+
+    async def get_last_trades(self, figi: str, from_, to) -> GetLastTradesResponse:
+        block = self.blocks_by_figi.get(figi)
+        if block is None:
+            return GetLastTradesResponse(trades=[])
+
+        start = np.searchsorted(block.times, datetime_to_ns(from_), side="left")
+        end = np.searchsorted(block.times, datetime_to_ns(to), side="right")
+        return GetLastTradesResponse(trades=[
+            create_trade(figi, direction, price, quantity, tick_time)
+            for direction, price, quantity, tick_time in zip(
+                block.directions[start:end].tolist(), block.prices[start:end].tolist(),
+                block.quantities[start:end].tolist(), block.times[start:end].tolist()
+            )
+        ])
+
+
+# локальная замена AsyncClient с теми же методами получения сделок, что использует TradingRobot
+class FakeAsyncClient(object):
+    def __init__(self, blocks: List[TickBlock], speed: float = 0.0, clock: Optional[EventClock] = None):
+        self.market_data_stream = FakeMarketDataStreamService(blocks, speed, clock)
+        self.market_data = FakeMarketDataService(blocks)
+
+    async def __aenter__(self) -> "FakeAsyncClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+# время первой сделки, начальное время EventClock робота
+def get_blocks_start_time(blocks: List[TickBlock]) -> Optional[int]:
+    times = [int(block.times[0]) for block in blocks if block.size > 0]
+    return min(times) if len(times) > 0 else None
+
+
+# инструменты для синтетических сделок, figi совпадают с create_synthetic_ticks
+def create_fake_instruments(count: int) -> List[Dict]:
+    return [
+        {"name": f"SYNTHETIC{index:04d}", "figi": f"SYNTHETIC{index:04d}", "future": f"SYNTHETIC{index:04d}"}
+        for index in range(count)
+    ]
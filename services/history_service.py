@@ -0,0 +1,212 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+from tinkoff.invest.utils import now
+
+from constants import ONE_HOUR_TO_MINUTES
+from domains.tick import Tick, ticks_to_df
+from settings import HISTORY_CONCURRENCY, HISTORY_REQUESTS_PER_SECOND, HISTORY_RETRY_COUNT, \
+    HISTORY_RETRY_DELAY_SECONDS
+from utils.parse_util import processed_data
+from utils.strategy_util import create_empty_df
+
+logger = logging.getLogger(__name__)
+
+
+# ограничение частоты запросов к api: запросы выполняются не чаще заданного интервала
+class RateLimiter:
+    def __init__(self, requests_per_second: float):
+        self.interval = 1 / requests_per_second if requests_per_second else 0
+        self.next_time = 0
+        self.lock = None
+
+    async def wait(self):
+        if self.interval == 0:
+            return
+
+        # блокировка создается внутри цикла событий, в котором выполняется загрузка
+        if self.lock is None:
+            self.lock = asyncio.Lock()
+
+        async with self.lock:
+            loop = asyncio.get_event_loop()
+            delay = self.next_time - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self.next_time = max(self.next_time, loop.time()) + self.interval
+
+    # пауза для всех следующих запросов, например после ошибки ограничения частоты
+    def delay(self, seconds: float):
+        loop = asyncio.get_event_loop()
+        self.next_time = max(self.next_time, loop.time() + seconds)
+
+
+# пауза перед повтором запроса: время сброса ограничения из ответа api, если оно есть, иначе экспоненциальная
+def get_retry_delay(ex: Exception, attempt: int, retry_delay: float) -> float:
+    ratelimit_reset = getattr(getattr(ex, "metadata", None), "ratelimit_reset", None)
+    if ratelimit_reset:
+        return float(ratelimit_reset)
+    return retry_delay * 2 ** attempt
+
+
+# загрузка последних доступных обезличенных сделок по всем инструментам одновременно
+# с ограничением количества параллельных запросов и их частоты
+# запрос с ошибкой повторяется retry_count раз с нарастающей паузой
+class HistoryService:
+    def __init__(
+            self,
+            client,
+            concurrency: int = HISTORY_CONCURRENCY,
+            requests_per_second: float = HISTORY_REQUESTS_PER_SECOND,
+            window_minutes: int = ONE_HOUR_TO_MINUTES,
+            retry_count: int = HISTORY_RETRY_COUNT,
+            retry_delay_seconds: float = HISTORY_RETRY_DELAY_SECONDS
+    ):
+        self.client = client
+        self.concurrency = max(concurrency, 1)
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self.retry_count = max(retry_count, 0)
+        self.retry_delay = retry_delay_seconds
+        self.window = timedelta(minutes=window_minutes)
+        self.semaphore = None
+        # успешно загруженные окна по инструментам, для обновления индекса покрытия
+        self.loaded_windows: Dict[str, List[Tuple[datetime, datetime]]] = {}
+
+    async def load(
+            self,
+            instruments: List[Dict],
+            current_date: Optional[datetime] = None
+    ) -> Dict[str, pd.DataFrame]:
+        current_date = current_date or now()
+        history = await asyncio.gather(
+            *[self.get_history_trades(instrument, current_date) for instrument in instruments]
+        )
+        return {instrument["figi"]: history_df for instrument, history_df in zip(instruments, history)}
+
+    # загрузка истории инструмента окнами от текущего времени в прошлое, пока api возвращает сделки
+    # окна запрашиваются пачками по concurrency штук, страницы объединяются и сортируются один раз
+    # окно, не загруженное после повторов, пропускается (остается пробелом в индексе покрытия),
+    # загрузка останавливается на пустом ответе или если не загрузилось ни одно окно пачки
+    async def get_history_trades(
+            self,
+            instrument: Dict,
+            current_date: Optional[datetime] = None
+    ) -> pd.DataFrame:
+        current_date = current_date or now()
+        ticks: List[Tick] = []
+        window_index = 0
+
+        while True:
+            windows = range(window_index, window_index + self.concurrency)
+            pages = await asyncio.gather(
+                *[self.get_window_trades(instrument,
+                                         current_date - self.window * (index + 1),
+                                         current_date - self.window * index)
+                  for index in windows]
+            )
+
+            is_finished = all(page is None for page in pages)
+            if is_finished:
+                logger.error("instrument: %s, загрузка истории прервана: ни одно окно не загружено",
+                             instrument["name"])
+            for page in pages:
+                if page is None:
+                    continue
+                if len(page) == 0:
+                    # окна старше первого пустого не учитываю, как и при последовательной загрузке
+                    is_finished = True
+                    break
+                ticks += page
+
+            if is_finished:
+                break
+            window_index += self.concurrency
+
+        if len(ticks) == 0:
+            return create_empty_df()
+
+        history_df = ticks_to_df(ticks)
+        return history_df.sort_values("time", kind="mergesort").reset_index(drop=True)
+
+    # загрузка сделок за промежутки времени: все окна запрашиваются одновременно, без остановки на пустых
+    async def load_ranges(
+            self,
+            instruments: List[Dict],
+            ranges_by_figi: Dict[str, List[Tuple[datetime, datetime]]]
+    ) -> Dict[str, pd.DataFrame]:
+        history = await asyncio.gather(
+            *[self.get_ranges_trades(instrument, ranges_by_figi.get(instrument["figi"], []))
+              for instrument in instruments]
+        )
+        return {instrument["figi"]: history_df for instrument, history_df in zip(instruments, history)}
+
+    async def get_ranges_trades(
+            self,
+            instrument: Dict,
+            ranges: List[Tuple[datetime, datetime]]
+    ) -> pd.DataFrame:
+        windows = []
+        for interval_from, interval_to in ranges:
+            while interval_from < interval_to:
+                windows.append((max(interval_from, interval_to - self.window), interval_to))
+                interval_to -= self.window
+
+        pages = await asyncio.gather(
+            *[self.get_window_trades(instrument, interval_from, interval_to)
+              for interval_from, interval_to in windows]
+        )
+        # не загруженные окна не попадают в loaded_windows и будут запрошены при следующей синхронизации,
+        # покрытие потоком real-time данных продлевается только от его начала и не перекрывает их
+        ticks = [tick for page in pages if page is not None for tick in page]
+        if len(ticks) == 0:
+            return create_empty_df()
+
+        history_df = ticks_to_df(ticks)
+        return history_df.sort_values("time", kind="mergesort").reset_index(drop=True)
+
+    # сделки окна, [] - в окне нет сделок, None - окно не загружено после всех повторов
+    async def get_window_trades(
+            self,
+            instrument: Dict,
+            interval_from: datetime,
+            interval_to: datetime
+    ) -> Optional[List[Tick]]:
+        if self.semaphore is None:
+            self.semaphore = asyncio.Semaphore(self.concurrency)
+
+        async with self.semaphore:
+            attempt = 0
+            while True:
+                try:
+                    await self.rate_limiter.wait()
+                    response = await self.client.market_data.get_last_trades(
+                        figi=instrument["figi"],
+                        from_=interval_from,
+                        to=interval_to,
+                    )
+                    break
+                except Exception as ex:
+                    if attempt >= self.retry_count:
+                        logger.error("instrument: %s, from: %s, to: %s, окно не загружено: %s",
+                                     instrument["name"], interval_from, interval_to, ex)
+                        return None
+
+                    delay = get_retry_delay(ex, attempt, self.retry_delay)
+                    logger.warning("instrument: %s, from: %s, to: %s, повтор через %s с: %s",
+                                   instrument["name"], interval_from, interval_to, delay, ex)
+                    # следующие запросы всех окон тоже ждут, чтобы не продлевать ограничение частоты
+                    self.rate_limiter.delay(delay)
+                    await asyncio.sleep(delay)
+                    attempt += 1
+
+        if response is None:
+            return []
+        self.loaded_windows.setdefault(instrument["figi"], []).append((interval_from, interval_to))
+
+        logger.info("instrument: %s, from: %s, to: %s, size: %s",
+                    instrument["name"], interval_from, interval_to, len(response.trades))
+        ticks = [processed_data(trade) for trade in response.trades]
+        return [tick for tick in ticks if tick is not None]
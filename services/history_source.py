@@ -0,0 +1,75 @@
+import logging
+import os
+from datetime import date, datetime
+from typing import Iterator, List, Optional, Tuple, Union
+
+from domains.tick import TickBlock
+from services.tick_storage import CSV_FILE_NAME_PATTERN, TickStorage, read_csv_ticks
+
+logger = logging.getLogger(__name__)
+
+
+def format_history_date(value: Union[str, date, datetime]) -> str:
+    if isinstance(value, (date, datetime)):
+        return value.strftime("%Y%m%d")
+    return value.replace("-", "")
+
+
+# непрерывный поток сделок инструмента за промежуток дней
+# файлы дней <инструмент>-<ГГГГММДД>.csv находятся в каталоге истории, дни читаются по одному по мере обхода,
+# если день уже сконвертирован в бинарное хранилище, он читается оттуда без разбора текста
+# block_size - максимальный размер пачки, день без ограничения передается одной пачкой
+class HistorySource(object):
+    def __init__(
+            self,
+            instrument_name: str,
+            start_date: Union[str, date, datetime],
+            end_date: Union[str, date, datetime],
+            root: str = "./data",
+            storage: Optional[TickStorage] = None,
+            block_size: Optional[int] = None
+    ):
+        self.instrument_name = instrument_name
+        self.start_date = format_history_date(start_date)
+        self.end_date = format_history_date(end_date)
+        self.root = root
+        self.storage = storage
+        self.block_size = block_size
+
+    # дни промежутка с найденной историей: (ГГГГММДД, путь к csv или None, если день есть только в хранилище)
+    def get_dates(self) -> List[Tuple[str, Optional[str]]]:
+        file_paths = {}
+        if os.path.exists(self.root):
+            for file_name in os.listdir(self.root):
+                match = CSV_FILE_NAME_PATTERN.match(file_name)
+                if match is not None and match.group("name") == self.instrument_name:
+                    file_paths[match.group("date")] = os.path.join(self.root, file_name)
+
+        dates = set(file_paths)
+        if self.storage is not None:
+            dates.update(self.storage.get_dates(self.instrument_name))
+
+        return [
+            (history_date, file_paths.get(history_date))
+            for history_date in sorted(dates)
+            if self.start_date <= history_date <= self.end_date
+        ]
+
+    def read_day(self, history_date: str, file_path: Optional[str]) -> TickBlock:
+        if self.storage is not None and history_date in self.storage.get_dates(self.instrument_name):
+            return self.storage.read_partition(self.instrument_name, history_date)
+        return read_csv_ticks(file_path)
+
+    def __iter__(self) -> Iterator[TickBlock]:
+        for history_date, file_path in self.get_dates():
+            logger.info("анализ истории %s за %s", self.instrument_name, history_date)
+            block = self.read_day(history_date, file_path)
+            if self.block_size is None or block.size <= self.block_size:
+                yield block
+                continue
+
+            # пачки ссылаются на массивы дня без копирования
+            for start in range(0, block.size, self.block_size):
+                end = start + self.block_size
+                yield TickBlock(block.figi, block.directions[start:end], block.prices[start:end],
+                                block.quantities[start:end], block.times[start:end])
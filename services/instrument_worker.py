@@ -0,0 +1,187 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from settings import WORKER_QUEUE_SIZE, WORKER_OVERFLOW_POLICY, WORKER_BATCH_SIZE, WORKER_BATCH_LATENCY_MS
+
+logger = logging.getLogger(__name__)
+
+# при переполнении очереди диспетчер ждет освобождения места
+OVERFLOW_POLICY_BLOCK = "block"
+# при переполнении очереди отбрасывается поступившая сделка
+OVERFLOW_POLICY_DROP_NEWEST = "drop_newest"
+# при переполнении очереди отбрасывается самая старая сделка из очереди
+OVERFLOW_POLICY_DROP_OLDEST = "drop_oldest"
+
+OVERFLOW_POLICIES = [OVERFLOW_POLICY_BLOCK, OVERFLOW_POLICY_DROP_NEWEST, OVERFLOW_POLICY_DROP_OLDEST]
+
+# количество последних замеров по каждому этапу для расчета перцентилей
+LATENCY_SAMPLES_SIZE = 1000
+
+
+# статистика задержек по этапам обработки в секундах
+class LatencyStats(object):
+    def __init__(self, size: int = LATENCY_SAMPLES_SIZE):
+        self.size = size
+        self.samples: Dict[str, deque] = {}
+        self.counts: Dict[str, int] = {}
+        self.totals: Dict[str, float] = {}
+        self.max: Dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float):
+        if stage not in self.samples:
+            self.samples[stage] = deque(maxlen=self.size)
+            self.counts[stage] = 0
+            self.totals[stage] = 0.0
+            self.max[stage] = 0.0
+
+        self.samples[stage].append(seconds)
+        self.counts[stage] += 1
+        self.totals[stage] += seconds
+        self.max[stage] = max(self.max[stage], seconds)
+
+    # замер от started (time.perf_counter) до текущего момента
+    def add_since(self, stage: str, started: float):
+        self.add(stage, time.perf_counter() - started)
+
+    # сводка в миллисекундах: среднее за все время, перцентили по последним замерам
+    def get(self) -> Dict[str, Dict[str, float]]:
+        result = {}
+        for stage, samples in list(self.samples.items()):
+            ordered = sorted(samples)
+            result[stage] = {
+                "count": self.counts[stage],
+                "mean_ms": self.totals[stage] / self.counts[stage] * 1000,
+                "p50_ms": ordered[len(ordered) // 2] * 1000,
+                "p99_ms": ordered[min(int(len(ordered) * 0.99), len(ordered) - 1)] * 1000,
+                "max_ms": self.max[stage] * 1000,
+            }
+        return result
+
+
+# обработчик сделок одного инструмента: ограниченная очередь и собственный поток,
+# чтобы медленная обработка одного инструмента не задерживала остальные
+# handler(items, stats) выполняется в потоке обработчика и сам замеряет свои этапы в stats
+# при batch_size > 1 в handler передаются все накопившиеся в очереди сделки, но не более batch_size,
+# при batch_size = 1 - по одной сделке
+class InstrumentWorker(object):
+    def __init__(
+            self,
+            name: str,
+            handler: Callable[[List[Any], LatencyStats], None],
+            queue_size: int = WORKER_QUEUE_SIZE,
+            overflow_policy: str = WORKER_OVERFLOW_POLICY,
+            batch_size: int = WORKER_BATCH_SIZE,
+            batch_latency_ms: int = WORKER_BATCH_LATENCY_MS
+    ):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"неизвестная политика переполнения очереди: {overflow_policy}")
+
+        self.name = name
+        self.handler = handler
+        self.queue_size = max(queue_size, 1)
+        self.overflow_policy = overflow_policy
+        self.batch_size = max(batch_size, 1)
+        self.batch_latency = batch_latency_ms / 1000
+
+        self.stats = LatencyStats()
+        self.dropped = 0
+        self.max_depth = 0
+        self.batches = 0
+        self.max_batch_size = 0
+
+        # очередь и задача создаются внутри цикла событий, в котором выполняется обработка
+        self.queue: Optional[asyncio.Queue] = None
+        self.task: Optional[asyncio.Task] = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"worker-{name}")
+
+    def start(self):
+        if self.task is None:
+            self.queue = asyncio.Queue(maxsize=self.queue_size)
+            self.task = asyncio.ensure_future(self.run())
+
+    async def put(self, item: Any):
+        self.start()
+        entry = (item, time.perf_counter())
+
+        if self.queue.full():
+            if self.overflow_policy == OVERFLOW_POLICY_DROP_NEWEST:
+                self.dropped += 1
+                return
+            if self.overflow_policy == OVERFLOW_POLICY_DROP_OLDEST:
+                self.queue.get_nowait()
+                self.queue.task_done()
+                self.dropped += 1
+
+        await self.queue.put(entry)
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            if self.batch_size > 1 and batch[0][0] is not None:
+                await self.fill_batch(batch)
+
+            items = [item for item, _ in batch if item is not None]
+            try:
+                if len(items) > 0:
+                    for _, received_time in batch:
+                        self.stats.add_since("queue", received_time)
+                    started = time.perf_counter()
+                    await loop.run_in_executor(self.executor, self.handler, items, self.stats)
+                    self.stats.add_since("handler", started)
+                    # полная задержка от постановки сделки в очередь до завершения ее обработки
+                    for _, received_time in batch:
+                        self.stats.add_since("total", received_time)
+                    self.batches += 1
+                    self.max_batch_size = max(self.max_batch_size, len(items))
+            except Exception as ex:
+                logger.error(ex)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+            if batch[-1][0] is None:
+                return
+
+    # добор пачки уже поступившими сделками, ожидание следующих не дольше batch_latency от первой сделки пачки
+    async def fill_batch(self, batch: List[Tuple[Any, float]]):
+        deadline = batch[0][1] + self.batch_latency
+        while len(batch) < self.batch_size:
+            if not self.queue.empty():
+                entry = self.queue.get_nowait()
+            else:
+                timeout = deadline - time.perf_counter()
+                if timeout <= 0:
+                    return
+                try:
+                    entry = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    return
+
+            batch.append(entry)
+            if entry[0] is None:
+                return
+
+    # обработка уже поступивших сделок и остановка обработчика
+    async def stop(self):
+        if self.task is not None:
+            # признак остановки ставится в очередь без учета политики переполнения
+            await self.queue.put((None, time.perf_counter()))
+            await self.task
+            self.task = None
+        self.executor.shutdown(wait=True)
+
+    def get_stats(self) -> Dict:
+        return {
+            "depth": self.queue.qsize() if self.queue is not None else 0,
+            "max_depth": self.max_depth,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "max_batch_size": self.max_batch_size,
+            "latency": self.stats.get(),
+        }
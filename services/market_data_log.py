@@ -0,0 +1,266 @@
+import asyncio
+import logging
+import os
+import struct
+import sys
+import time
+from collections import defaultdict
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from tinkoff.invest import MarketDataResponse, Ping, Quotation, Trade, TradeDirection
+from tinkoff.invest._grpc_helpers import dataclass_to_protobuff, protobuf_to_dataclass
+from tinkoff.invest.grpc import marketdata_pb2
+
+from domains.tick import TickBlock
+from services.fake_client import FakeMarketDataService, YIELD_EVERY_MESSAGES
+from utils.clock import EventClock
+from utils.parse_util import datetime_to_ns, ns_to_datetime, processed_data
+
+logger = logging.getLogger(__name__)
+
+# заголовок файла записи потока и версия формата
+MARKET_DATA_LOG_MAGIC = b"MDLOG\x00\x03\n"
+
+# заголовок записи: длина сообщения (uint32) и время получения в наносекундах UTC (uint64)
+RECORD_HEADER = struct.Struct("<IQ")
+
+# виды записей, первый байт сообщения
+RECORD_FIGI = 0
+RECORD_TRADE = 1
+RECORD_PING = 2
+RECORD_MESSAGE = 3
+
+# figi получает номер при первой сделке инструмента: [вид][номер figi] + figi в utf-8
+FIGI_RECORD = struct.Struct("<BH")
+
+# сделка: [вид][номер figi][цена units][цена nano][количество][направление][время сделки в наносекундах UTC]
+TRADE_RECORD = struct.Struct("<BHqiqBq")
+
+# ping: [вид][время ping в наносекундах UTC, 0 - не задано]
+PING_RECORD = struct.Struct("<Bq")
+
+# остальные сообщения (ответы на подписку, статусы торгов, свечи, стаканы): [вид] + MarketDataResponse
+# в protobuf-формате api, сообщение воспроизводится полностью
+MESSAGE_RECORD = struct.Struct("<B")
+
+
+# записи файла: (смещение конца записи, время получения, сообщение)
+# оборванная при аварийном завершении последняя запись пропускается
+def read_records(file: BinaryIO, file_path: str) -> Iterator[Tuple[int, int, bytes]]:
+    if file.read(len(MARKET_DATA_LOG_MAGIC)) != MARKET_DATA_LOG_MAGIC:
+        raise ValueError(f"файл не является записью потока: {file_path}")
+
+    while True:
+        header = file.read(RECORD_HEADER.size)
+        if len(header) < RECORD_HEADER.size:
+            if len(header) > 0:
+                logger.error("запись потока %s оборвана", file_path)
+            return
+        size, receive_time = RECORD_HEADER.unpack(header)
+        payload = file.read(size)
+        if len(payload) < size:
+            logger.error("запись потока %s оборвана", file_path)
+            return
+        yield file.tell(), receive_time, payload
+
+
+# запись каждого сообщения MarketDataResponse потока в бинарный файл:
+# [длина][время получения][сообщение], сделки сохраняются записями фиксированного размера,
+# figi - номером из таблицы, которая пишется в тот же файл при первой сделке инструмента,
+# остальные сообщения - в protobuf-формате api
+class MarketDataRecorder(object):
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.count = 0
+        self.file: Optional[BinaryIO] = None
+        self.figi_ids: Dict[str, int] = {}
+
+    def open(self):
+        directory = os.path.dirname(self.file_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        # при дозаписи восстанавливаю таблицу figi и отрезаю оборванную последнюю запись
+        end = 0
+        if os.path.exists(self.file_path) and os.path.getsize(self.file_path) > 0:
+            with open(self.file_path, "rb") as file:
+                end = len(MARKET_DATA_LOG_MAGIC)
+                for end, _, payload in read_records(file, self.file_path):
+                    if payload[0] == RECORD_FIGI:
+                        _, figi_id = FIGI_RECORD.unpack_from(payload)
+                        self.figi_ids[payload[FIGI_RECORD.size:].decode("utf-8")] = figi_id
+
+        self.file = open(self.file_path, "r+b" if end > 0 else "wb")
+        if end > 0:
+            self.file.truncate(end)
+            self.file.seek(end)
+        else:
+            self.file.write(MARKET_DATA_LOG_MAGIC)
+
+    def write_record(self, payload: bytes, receive_time: int):
+        self.file.write(RECORD_HEADER.pack(len(payload), receive_time))
+        self.file.write(payload)
+
+    def get_figi_id(self, figi: str, receive_time: int) -> int:
+        figi_id = self.figi_ids.get(figi)
+        if figi_id is None:
+            figi_id = len(self.figi_ids)
+            self.figi_ids[figi] = figi_id
+            self.write_record(FIGI_RECORD.pack(RECORD_FIGI, figi_id) + figi.encode("utf-8"), receive_time)
+        return figi_id
+
+    def write(self, marketdata, receive_time: Optional[int] = None):
+        if self.file is None:
+            self.open()
+        if receive_time is None:
+            receive_time = time.time_ns()
+
+        trade = getattr(marketdata, "trade", None)
+        ping = getattr(marketdata, "ping", None)
+        if trade is not None:
+            figi_id = self.get_figi_id(trade.figi, receive_time)
+            payload = TRADE_RECORD.pack(RECORD_TRADE, figi_id, trade.price.units, trade.price.nano, trade.quantity,
+                                        int(trade.direction), datetime_to_ns(trade.time))
+        elif ping is not None:
+            payload = PING_RECORD.pack(RECORD_PING, datetime_to_ns(ping.time) if ping.time is not None else 0)
+        else:
+            message = dataclass_to_protobuff(marketdata, marketdata_pb2.MarketDataResponse())
+            payload = MESSAGE_RECORD.pack(RECORD_MESSAGE) + message.SerializeToString()
+
+        self.write_record(payload, receive_time)
+        self.count += 1
+
+    def flush(self):
+        if self.file is not None:
+            self.file.flush()
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+# чтение записи потока: (время получения в наносекундах UTC, сообщение)
+def read_market_data_log(file_path: str) -> Iterator[Tuple[int, MarketDataResponse]]:
+    figis: Dict[int, str] = {}
+    with open(file_path, "rb") as file:
+        for _, receive_time, payload in read_records(file, file_path):
+            kind = payload[0]
+            if kind == RECORD_TRADE:
+                _, figi_id, units, nano, quantity, direction, trade_time = TRADE_RECORD.unpack(payload)
+                yield receive_time, MarketDataResponse(trade=Trade(
+                    figi=figis[figi_id],
+                    direction=TradeDirection(direction),
+                    price=Quotation(units=units, nano=nano),
+                    quantity=quantity,
+                    time=ns_to_datetime(trade_time)
+                ))
+            elif kind == RECORD_FIGI:
+                _, figi_id = FIGI_RECORD.unpack_from(payload)
+                figis[figi_id] = payload[FIGI_RECORD.size:].decode("utf-8")
+            elif kind == RECORD_PING:
+                _, ping_time = PING_RECORD.unpack(payload)
+                yield receive_time, MarketDataResponse(ping=Ping(time=ns_to_datetime(ping_time) if ping_time else None))
+            elif kind == RECORD_MESSAGE:
+                message = marketdata_pb2.MarketDataResponse.FromString(payload[MESSAGE_RECORD.size:])
+                yield receive_time, protobuf_to_dataclass(message, MarketDataResponse)
+            else:
+                raise ValueError(f"неизвестный вид записи {kind} в {file_path}")
+
+
+# время получения первого сообщения, начальное время EventClock робота
+def get_market_data_log_start_time(file_path: str) -> Optional[int]:
+    for receive_time, _ in read_market_data_log(file_path):
+        return receive_time
+    return None
+
+
+# сделки записи по инструментам, для get_last_trades
+def get_market_data_log_blocks(file_path: str) -> List[TickBlock]:
+    ticks_by_figi = defaultdict(list)
+    for _, marketdata in read_market_data_log(file_path):
+        trade = getattr(marketdata, "trade", None)
+        if trade is not None:
+            tick = processed_data(trade)
+            if tick is not None:
+                ticks_by_figi[tick.figi].append(tick)
+    return [TickBlock.from_ticks(ticks) for ticks in ticks_by_figi.values()]
+
+
+# поток market_data_stream из записи: сообщения отдаются в исходном порядке
+# speed - множитель скорости относительно времени получения: 1 - исходный темп, 0 - без пауз
+# clock - время робота, переводится на время получения каждого сообщения
+class ReplayMarketDataStreamService(object):
+    def __init__(self, file_path: str, speed: float = 1.0, clock: Optional[EventClock] = None):
+        self.file_path = file_path
+        self.speed = speed
+        self.clock = clock
+        self.sent_count = 0
+        self.started_time: Optional[float] = None
+        self.finished_time: Optional[float] = None
+
+    async def market_data_stream(self, requests):
+        # подписка не влияет на воспроизведение: отдаются все записанные сообщения
+        await requests.__anext__()
+        await requests.aclose()
+
+        loop = asyncio.get_running_loop()
+        self.started_time = time.perf_counter()
+        start_loop_time = loop.time()
+        first_time = None
+        for receive_time, marketdata in read_market_data_log(self.file_path):
+            if first_time is None:
+                first_time = receive_time
+
+            if self.speed > 0:
+                delay = start_loop_time + (receive_time - first_time) / 10 ** 9 / self.speed - loop.time()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            elif self.sent_count % YIELD_EVERY_MESSAGES == 0:
+                await asyncio.sleep(0)
+
+            if self.clock is not None:
+                self.clock.advance(receive_time)
+            self.sent_count += 1
+            yield marketdata
+        self.finished_time = time.perf_counter()
+
+
+# локальная замена AsyncClient для воспроизведения записи потока
+class ReplayAsyncClient(object):
+    def __init__(self, file_path: str, speed: float = 1.0, clock: Optional[EventClock] = None):
+        self.market_data_stream = ReplayMarketDataStreamService(file_path, speed, clock)
+        self.market_data = FakeMarketDataService(get_market_data_log_blocks(file_path))
+
+    async def __aenter__(self) -> "ReplayAsyncClient":
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+# инструменты записи: из настроек, если figi найден, иначе с именем по figi
+def get_market_data_log_instruments(file_path: str, instruments: List[Dict]) -> List[Dict]:
+    instrument_by_figi = {instrument["figi"]: instrument for instrument in instruments}
+    return [
+        instrument_by_figi.get(block.figi, {"name": block.figi, "figi": block.figi, "future": block.figi})
+        for block in get_market_data_log_blocks(file_path)
+    ]
+
+
+# воспроизведение записи через робота из корня проекта:
+# python -m services.market_data_log ./data/marketdata-20220506.bin [скорость, 0 - без пауз]
+# позиции не открываются и не сохраняются в файл сделок, время робота - время получения записанных сообщений
+if __name__ == "__main__":
+    from services.order_service import OrderService
+    from settings import INSTRUMENTS
+    from trading_robot import TradingRobot
+
+    log_file_path = sys.argv[1]
+    replay_speed = float(sys.argv[2]) if len(sys.argv) > 2 else 1.0
+
+    replay_clock = EventClock(get_market_data_log_start_time(log_file_path))
+    robot = TradingRobot(get_market_data_log_instruments(log_file_path, INSTRUMENTS),
+                         order_service=OrderService(file_path=None, clock=replay_clock), clock=replay_clock)
+    asyncio.run(robot.run(ReplayAsyncClient(log_file_path, replay_speed, replay_clock)))
+    robot.order_service.write_statistics()
@@ -1,17 +1,18 @@
-import csv
 import logging
 import threading
 from datetime import datetime
 from itertools import groupby
-from os.path import exists
-from typing import List
+from typing import List, Optional
 
 from tinkoff.invest import Client, OrderType, OrderDirection
 
 from constants import APP_NAME
 from domains.order import Order
+from domains.order_trigger_book import OrderTriggerBook
+from services.order_storage import OrderStorage
 from services.telegram_service import TelegramService
 from settings import NOTIFICATION, ACCOUNT_ID, TOKEN, IS_SANDBOX, CAN_REVERSE_ORDER
+from utils.clock import Clock, WALL_CLOCK
 from utils.exchange_util import is_open_orders
 from utils.format_util import fixed_float
 from utils.instrument_util import get_instrument_by_name
@@ -19,53 +20,10 @@ from utils.order_util import is_order_already_open, get_reverse_order
 
 logger = logging.getLogger(__name__)
 
-orders_file_path = "./../data/orders.csv"
+orders_file_path = "./../data/orders.db"
 
-
-def write_file(order: Order):
-    try:
-        order_dict = dict(order)
-        with open(orders_file_path, "a", newline='') as file:
-            writer = csv.writer(file)
-            if file.tell() == 0:
-                writer.writerow(order_dict.keys())
-            writer.writerow(order_dict.values())
-    except Exception as ex:
-        logger.error(ex)
-
-
-def rewrite_file(orders: List[Order]):
-    try:
-        with open(orders_file_path, "w", newline='') as file:
-            writer = csv.writer(file)
-            for order in orders:
-                order_dict = dict(order)
-                if file.tell() == 0:
-                    writer.writerow(order_dict.keys())
-                writer.writerow(order_dict.values())
-    except Exception as ex:
-        logger.error(ex)
-
-
-def load_orders():
-    orders: List[Order] = []
-
-    if not exists(orders_file_path):
-        return orders
-
-    try:
-        with open(orders_file_path, newline='') as file:
-            reader = csv.DictReader(file)
-            # header = next(reader)
-            for row in reader:
-                order = Order.from_dict(row)
-                if order.status == "open":
-                    # после запуска приложения анализирую только незакрытые позиции
-                    orders.append(order)
-    except Exception as ex:
-        logger.error(ex)
-
-    return orders
+# прежнее хранение сделок, переносится в базу при ее создании
+orders_csv_file_path = "./../data/orders.csv"
 
 
 def open_order(
@@ -107,27 +65,79 @@ def open_order(
 
 
 # в отдельном потоке, чтобы не замедлял процесс обработки
+# file_path - база сделок (OrderStorage), None - сделки хранятся только в памяти (для анализа истории)
+# clock - источник даты торговой сессии для статистики
 class OrderService(threading.Thread):
-    def __init__(self, is_notification=False, can_open_orders=False):
+    def __init__(
+            self,
+            is_notification=False,
+            can_open_orders=False,
+            file_path: Optional[str] = orders_file_path,
+            can_reverse_order: bool = CAN_REVERSE_ORDER,
+            clock: Clock = WALL_CLOCK
+    ):
         super().__init__()
 
         self.telegram_service = TelegramService(NOTIFICATION["bot_token"], NOTIFICATION["chat_id"])
 
         self.is_notification = is_notification
         self.can_open_orders = can_open_orders
-        self.orders: List[Order] = load_orders()
+        self.can_reverse_order = can_reverse_order
+        self.file_path = file_path
+        self.clock = clock
+        self.storage = self.open_storage(file_path) if file_path is not None else None
+        # после запуска приложения анализирую только незакрытые позиции
+        self.orders: List[Order] = self.storage.load_active_orders() if self.storage is not None else []
+        # активные сделки, проверяемые на закрытие по стопу/тейку на каждой сделке
+        self.trigger_book = OrderTriggerBook()
+        for order in self.orders:
+            if order.status == "active":
+                self.trigger_book.add(order)
+        # сделки разных инструментов обрабатываются в разных потоках
+        self.lock = threading.RLock()
+
+    @staticmethod
+    def open_storage(file_path: str) -> Optional[OrderStorage]:
+        try:
+            storage = OrderStorage(file_path, orders_csv_file_path if file_path == orders_file_path else None)
+            storage.start()
+            return storage
+        except Exception as ex:
+            logger.error(ex)
+            return None
+
+    # сохранение сделок и остановка потока обслуживания базы
+    def close_storage(self):
+        if self.storage is not None:
+            self.storage.close()
+            self.storage = None
+
+    # добавление сделки в историю и, если она активна, в индекс проверки закрытия
+    def add_order(self, order: Order):
+        self.orders.append(order)
+        if order.status == "active":
+            self.trigger_book.add(order)
+
+    # активные сделки в порядке открытия, всех инструментов или одного
+    def get_active_orders(self, instrument: Optional[str] = None) -> List[Order]:
+        with self.lock:
+            return self.trigger_book.get_active_orders(instrument)
 
     def create_order(self, order: Order):
+        with self.lock:
+            self._create_order(order)
+
+    def _create_order(self, order: Order):
         try:
             if order is None:
                 return
 
-            if is_order_already_open(self.orders, order):
+            if is_order_already_open(self.trigger_book.get_active_orders(order.instrument), order):
                 logger.info(f"сделка в направлении {order.direction} уже открыта: {order}")
                 return
 
-            if CAN_REVERSE_ORDER:
-                active_orders = get_reverse_order(self.orders, order)
+            if self.can_reverse_order:
+                active_orders = get_reverse_order(self.trigger_book.get_active_orders(order.instrument), order)
                 if len(active_orders) > 0:
                     # если поступила сделка в обратном направлении, то переворачиваю позицию
                     logger.info(f"переворачиваю позицию - поступила сделка в обратном направлении: {order}")
@@ -135,8 +145,8 @@ class OrderService(threading.Thread):
                         # цена закрытия предыдущей сделки = цене открытия новой
                         self.close_order(active_order, order.open)
 
-            instrument = get_instrument_by_name(order.instrument)
             if self.can_open_orders:
+                instrument = get_instrument_by_name(order.instrument)
                 new_order = open_order(
                     figi=instrument["future"],
                     quantity=order.quantity,
@@ -145,8 +155,9 @@ class OrderService(threading.Thread):
                 )
                 order.order_id = new_order.order_id
 
-            self.orders.append(order)
-            write_file(order)
+            self.add_order(order)
+            if self.storage is not None:
+                self.storage.insert(order)
 
             logger.info(f"✅ ТВ {order.instrument}: цена {order.open}, тейк {order.take}, стоп {order.stop}")
             if self.is_notification:
@@ -156,6 +167,11 @@ class OrderService(threading.Thread):
             logger.error(ex)
 
     def close_order(self, order: Order, close_price: float):
+        with self.lock:
+            self._close_order(order, close_price)
+
+    def _close_order(self, order: Order, close_price: float):
+        self.trigger_book.remove(order)
         order.status = "close"
         order.close = close_price
         if order.direction == OrderDirection.ORDER_DIRECTION_BUY.value:
@@ -184,63 +200,63 @@ class OrderService(threading.Thread):
                 order_id=f"{order.id}-close"
             )
 
-        # перезаписываю файл с результатами сделок
-        # todo перенести хранение сделок в БД
-        rewrite_file(self.orders)
+        # обновляю в базе только закрытую сделку
+        if self.storage is not None:
+            try:
+                self.storage.close_order(order)
+            except Exception as ex:
+                logger.error(ex)
         if self.is_notification:
             self.telegram_service.post(f"закрыта позиция на {order.instrument}: результат {order.result}")
 
     def processed_orders(self, instrument: str, current_price: float, time: datetime):
-        for order in self.orders:
-            if order.status == "active":
-                if not is_open_orders(time):
-                    # закрытие сделок по причине приближении закрытии биржи
-                    self.close_order(order, current_price)
-                    continue
-
-                if order.instrument != instrument:
-                    continue
-
-                if order.direction == OrderDirection.ORDER_DIRECTION_BUY.value:
-                    if current_price < order.stop:
-                        # закрываю активные buy-заявки по стопу, если цена ниже стоп-лосса
-                        self.close_order(order, current_price)
-                    elif current_price > order.take:
-                        # закрываю активные buy-заявки по цели, если цена выше заданной цели
-                        self.close_order(order, current_price)
-                else:
-                    if current_price > order.stop:
-                        # закрываю активные sell-заявки по стопу, если цена выше стоп-лосса
-                        self.close_order(order, current_price)
-                    elif current_price < order.take:
-                        # закрываю активные sell-заявки по цели, если цена ниже заданной цели
-                        self.close_order(order, current_price)
+        with self.lock:
+            self._processed_orders(instrument, current_price, time)
+
+    # проверяются только активные сделки: при закрытии биржи - все, иначе - уровни инструмента, пересеченные ценой
+    def _processed_orders(self, instrument: str, current_price: float, time: datetime):
+        if not is_open_orders(time):
+            # закрытие сделок по причине приближении закрытии биржи
+            for order in self.trigger_book.get_active_orders():
+                self.close_order(order, current_price)
+            return
+
+        # закрываю buy-заявки при цене ниже стоп-лосса или выше цели,
+        # sell-заявки - при цене выше стоп-лосса или ниже цели
+        for order in self.trigger_book.pop_triggered(instrument, current_price):
+            self.close_order(order, current_price)
 
     def write_statistics(self):
-        groups = groupby(self.orders, lambda order: order.instrument)
-        for instrument, group in groups:
-            file_path = f"./../logs/statistics-{instrument}.log"
-            orders: List[Order] = list(group)
-            with open(file_path, "a", encoding="utf-8") as file:
-                take_orders = list(filter(lambda x: x.is_win, orders))
-                earned_points = sum(order.result for order in take_orders)
-                loss_orders = list(filter(lambda x: not x.is_win, orders))
-                lost_points = sum(order.result for order in loss_orders)
-                total = earned_points + lost_points
-
-                logger.info(f"инструмент: {instrument}")
-                logger.info(f"количество сделок: {len(orders)}")
-                logger.info(f"успешных сделок: {len(take_orders)}")
-                logger.info(f"заработано пунктов: {fixed_float(earned_points)}")
-                logger.info(f"отрицательных сделок: {len(loss_orders)}")
-                logger.info(f"потеряно пунктов: {fixed_float(lost_points)}")
-                logger.info(f"итого пунктов: {fixed_float(total)}")
-                logger.info("-------------------------------------")
-
-                file.write(f"количество сделок: {len(orders)}\n")
-                file.write(f"успешных сделок: {len(take_orders)}\n")
-                file.write(f"заработано пунктов: {fixed_float(earned_points)}\n")
-                file.write(f"отрицательных сделок: {len(loss_orders)}\n")
-                file.write(f"потеряно пунктов: {fixed_float(lost_points)}\n\n")
-                file.write(f"итого пунктов: {fixed_float(total)}\n")
-                file.write("-------------------------------------\n")
+        date = self.clock.now().strftime("%d-%m-%Y")
+        # позиции закрываются в потоках обработчиков инструментов, поэтому статистика считается под блокировкой
+        with self.lock:
+            # groupby объединяет только соседние сделки, поэтому сделки упорядочиваются по инструменту
+            orders_by_instrument = sorted(self.orders, key=lambda order: order.instrument)
+            groups = groupby(orders_by_instrument, lambda order: order.instrument)
+            for instrument, group in groups:
+                file_path = f"./../logs/statistics-{instrument}.log"
+                orders: List[Order] = list(group)
+                with open(file_path, "a", encoding="utf-8") as file:
+                    take_orders = list(filter(lambda x: x.is_win, orders))
+                    earned_points = sum(order.result for order in take_orders)
+                    loss_orders = list(filter(lambda x: not x.is_win, orders))
+                    lost_points = sum(order.result for order in loss_orders)
+                    total = earned_points + lost_points
+
+                    logger.info(f"инструмент: {instrument}, дата: {date}")
+                    logger.info(f"количество сделок: {len(orders)}")
+                    logger.info(f"успешных сделок: {len(take_orders)}")
+                    logger.info(f"заработано пунктов: {fixed_float(earned_points)}")
+                    logger.info(f"отрицательных сделок: {len(loss_orders)}")
+                    logger.info(f"потеряно пунктов: {fixed_float(lost_points)}")
+                    logger.info(f"итого пунктов: {fixed_float(total)}")
+                    logger.info("-------------------------------------")
+
+                    file.write(f"дата: {date}\n\n")
+                    file.write(f"количество сделок: {len(orders)}\n")
+                    file.write(f"успешных сделок: {len(take_orders)}\n")
+                    file.write(f"заработано пунктов: {fixed_float(earned_points)}\n")
+                    file.write(f"отрицательных сделок: {len(loss_orders)}\n")
+                    file.write(f"потеряно пунктов: {fixed_float(lost_points)}\n\n")
+                    file.write(f"итого пунктов: {fixed_float(total)}\n")
+                    file.write("-------------------------------------\n")
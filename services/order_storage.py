@@ -0,0 +1,176 @@
+import csv
+import logging
+import os
+import sqlite3
+import threading
+from typing import List, Optional
+
+import pandas as pd
+
+from domains.order import Order
+from settings import ORDER_STORAGE_CHECKPOINT_INTERVAL_SECONDS
+from utils.parse_util import datetime_to_ns
+
+logger = logging.getLogger(__name__)
+
+ORDER_COLUMNS = ["id", "group_id", "instrument", "open", "close", "stop", "take", "quantity", "direction", "time",
+                 "status", "result", "is_win", "order_id"]
+
+CREATE_TABLE_SQL = """
+create table if not exists orders (
+    id text primary key,
+    group_id text,
+    instrument text,
+    open real,
+    close real,
+    stop real,
+    take real,
+    quantity integer,
+    direction integer,
+    time integer,
+    status text,
+    result real,
+    is_win integer,
+    order_id text
+)
+"""
+
+CREATE_INDEXES_SQL = [
+    "create index if not exists orders_status on orders (status)",
+    "create index if not exists orders_instrument on orders (instrument)",
+]
+
+INSERT_SQL = f"insert or replace into orders ({', '.join(ORDER_COLUMNS)}) " \
+             f"values ({', '.join('?' for _ in ORDER_COLUMNS)})"
+
+CLOSE_SQL = "update orders set status = ?, close = ?, result = ?, is_win = ? where id = ?"
+
+SELECT_SQL = f"select {', '.join(ORDER_COLUMNS)} from orders"
+
+
+def order_to_row(order: Order) -> tuple:
+    return (order.id, order.group_id, order.instrument, order.open, order.close, order.stop, order.take,
+            order.quantity, order.direction, datetime_to_ns(order.time) if order.time is not None else None,
+            order.status, order.result, int(bool(order.is_win)), order.order_id)
+
+
+def row_to_order(row: tuple) -> Order:
+    (id, group_id, instrument, open, close, stop, take, quantity, direction, time, status, result, is_win,
+     order_id) = row
+    order = Order(id=id, group_id=group_id, instrument=instrument, open=open, stop=stop, take=take,
+                  quantity=quantity, direction=direction,
+                  time=pd.Timestamp(time, tz="UTC") if time is not None else None,
+                  status=status, result=result, is_win=bool(is_win), close=close)
+    order.order_id = order_id
+    return order
+
+
+# сделки из прежнего orders.csv, для переноса в базу
+def read_orders_csv(file_path: str) -> List[Order]:
+    orders: List[Order] = []
+    with open(file_path, newline='') as file:
+        for row in csv.DictReader(file):
+            order = Order.from_dict(row)
+            # в csv признак записан строкой
+            order.is_win = row.get("is_win") == "True"
+            orders.append(order)
+    return orders
+
+
+# хранение сделок в SQLite в режиме WAL:
+# открытие и закрытие сделки - одна вставка или обновление строки вместо перезаписи всей истории,
+# при запуске по индексу статуса читаются только активные сделки
+# журнал WAL переносится в основной файл (checkpoint) в отдельном потоке, а не в потоке обработки сделок
+# при первом открытии в базу переносятся сделки из csv_file_path, если файл есть
+class OrderStorage(threading.Thread):
+    def __init__(
+            self,
+            file_path: str,
+            csv_file_path: Optional[str] = None,
+            checkpoint_interval_seconds: float = ORDER_STORAGE_CHECKPOINT_INTERVAL_SECONDS
+    ):
+        super().__init__(daemon=True)
+
+        self.file_path = file_path
+        self.checkpoint_interval = checkpoint_interval_seconds
+        self.stopped = threading.Event()
+        # соединение используется потоками обработчиков инструментов под блокировкой
+        self.lock = threading.Lock()
+
+        self.connection = sqlite3.connect(file_path, check_same_thread=False, isolation_level=None)
+        self.connection.execute("pragma journal_mode=wal")
+        self.connection.execute("pragma synchronous=normal")
+        # автоматический checkpoint выполнялся бы в потоке записи
+        self.connection.execute("pragma wal_autocheckpoint=0")
+        is_created = self.connection.execute(
+            "select count(*) from sqlite_master where type = 'table' and name = 'orders'").fetchone()[0] == 0
+        self.connection.execute(CREATE_TABLE_SQL)
+        for sql in CREATE_INDEXES_SQL:
+            self.connection.execute(sql)
+
+        if is_created and csv_file_path is not None and os.path.exists(csv_file_path):
+            orders = read_orders_csv(csv_file_path)
+            self.insert_many(orders)
+            logger.info("перенесено сделок из %s: %s", csv_file_path, len(orders))
+
+    def insert(self, order: Order):
+        with self.lock:
+            self.connection.execute(INSERT_SQL, order_to_row(order))
+
+    def insert_many(self, orders: List[Order]):
+        with self.lock:
+            self.connection.execute("begin")
+            try:
+                self.connection.executemany(INSERT_SQL, [order_to_row(order) for order in orders])
+            except Exception:
+                self.connection.execute("rollback")
+                raise
+            self.connection.execute("commit")
+
+    def close_order(self, order: Order):
+        with self.lock:
+            self.connection.execute(CLOSE_SQL, (order.status, order.close, order.result, int(bool(order.is_win)),
+                                                order.id))
+
+    def load_orders(self, status: Optional[str] = None, instrument: Optional[str] = None) -> List[Order]:
+        conditions, parameters = [], []
+        if status is not None:
+            conditions.append("status = ?")
+            parameters.append(status)
+        if instrument is not None:
+            conditions.append("instrument = ?")
+            parameters.append(instrument)
+        sql = SELECT_SQL + (f" where {' and '.join(conditions)}" if len(conditions) > 0 else "") + " order by rowid"
+
+        with self.lock:
+            rows = self.connection.execute(sql, parameters).fetchall()
+        return [row_to_order(row) for row in rows]
+
+    # после запуска приложения анализирую только незакрытые позиции
+    def load_active_orders(self) -> List[Order]:
+        return self.load_orders(status="active")
+
+    # перенос журнала WAL в основной файл: passive не ожидает записи и чтения,
+    # truncate дополнительно усекает журнал и выполняется при закрытии
+    def checkpoint(self, connection: Optional[sqlite3.Connection] = None, mode: str = "passive"):
+        connection = connection or self.connection
+        try:
+            connection.execute(f"pragma wal_checkpoint({mode})")
+        except sqlite3.Error as ex:
+            logger.error(ex)
+
+    def run(self):
+        connection = sqlite3.connect(self.file_path, isolation_level=None)
+        try:
+            while not self.stopped.wait(self.checkpoint_interval):
+                self.checkpoint(connection)
+        finally:
+            connection.close()
+
+    def close(self):
+        self.stopped.set()
+        if self.is_alive():
+            self.join()
+        with self.lock:
+            self.checkpoint(mode="truncate")
+            self.connection.close()
@@ -0,0 +1,188 @@
+import glob
+import itertools
+import logging
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Dict, List, Optional, Tuple
+
+import pandas as pd
+
+from domains.day_artifacts import DayArtifacts, PrecomputedProfile, PrecomputedSignalCandles
+from domains.footprint_bars import FOOTPRINT_BAR_PERIOD, FootprintBars
+from domains.strategy_settings import StrategySettings
+from domains.tick import TickBlock
+from services.backtest_service import BacktestService
+from services.cache_service import CacheService
+from services.order_service import OrderService
+from services.tick_storage import read_csv_ticks
+from settings import BACKTEST_CACHE_PATH
+from strategies.profile_touch_strategy import ProfileTouchStrategy
+from utils.order_util import calculate_statistics
+
+logger = logging.getLogger(__name__)
+
+# пример сетки для запуска из командной строки
+SWEEP_GRID = {
+    "first_goal": [2, 3, 4],
+    "goal_step": [0.5, 1],
+    "percentage_stop_loss": [0.02, 0.03, 0.05],
+    "percentage_volume_level_range": [0.02, 0.03],
+    "first_touch_volume_level": [60, 90],
+}
+
+# колонки результата варианта, не являющиеся параметрами
+STATISTICS_COLUMNS = list(calculate_statistics([]).keys())
+
+# артефакты дней в процессе подбора по периодам (профиль, сигнальная свеча)
+_artifacts_by_periods: Dict[Tuple[str, str], List[DayArtifacts]] = {}
+
+
+# все сочетания значений сетки
+def create_grid(grid: Dict[str, List]) -> List[Dict]:
+    keys = list(grid.keys())
+    return [dict(zip(keys, values)) for values in itertools.product(*[grid[key] for key in keys])]
+
+
+# случайные сочетания значений без повторов
+def create_random_samples(grid: Dict[str, List], count: int, seed: int = 0) -> List[Dict]:
+    rng = random.Random(seed)
+    total = 1
+    for values in grid.values():
+        total *= len(values)
+
+    samples = []
+    keys = set()
+    while len(samples) < min(count, total):
+        sample = {key: rng.choice(values) for key, values in grid.items()}
+        sample_key = tuple(sorted(sample.items()))
+        if sample_key not in keys:
+            keys.add(sample_key)
+            samples.append(sample)
+    return samples
+
+
+def init_sweep_worker(artifacts_by_periods: Dict[Tuple[str, str], List[DayArtifacts]]):
+    global _artifacts_by_periods
+    _artifacts_by_periods = artifacts_by_periods
+
+
+# анализ всех дней с одним набором параметров, выполняется в отдельном процессе
+def run_sweep_job(instrument_name: str, parameters: Dict) -> Dict:
+    settings = StrategySettings().replace(**parameters)
+
+    orders = []
+    for artifacts in _artifacts_by_periods[(settings.profile_period, settings.signal_cluster_period)]:
+        strategy = ProfileTouchStrategy(
+            instrument_name,
+            settings,
+            profile=PrecomputedProfile(artifacts),
+            signal_candles=PrecomputedSignalCandles(artifacts)
+        )
+        order_service = OrderService(file_path=None, can_reverse_order=settings.can_reverse_order)
+        backtest_service = BacktestService(instrument_name, strategy, order_service)
+        orders += backtest_service.run(artifacts.block)
+
+    result = dict(parameters)
+    result.update(calculate_statistics(orders))
+    return result
+
+
+# подбор параметров стратегии: варианты анализируются параллельно,
+# сделки дней разбираются один раз, профиль и сигнальные свечи - один раз на пару периодов
+# при заданном bar_period дни анализируются по футпринт-барам для быстрого отбора вариантов
+# при заданном cache_path разобранные сделки и артефакты дней сохраняются в кэш между запусками
+class SweepService(object):
+    def __init__(
+            self,
+            instrument_name: str,
+            file_paths: List[str],
+            processes: Optional[int] = None,
+            bar_period: Optional[str] = None,
+            cache_path: Optional[str] = None
+    ):
+        self.instrument_name = instrument_name
+        self.file_paths = file_paths
+        self.processes = processes
+        self.bar_period = bar_period
+        self.cache_path = cache_path
+        self.cache_service = CacheService(cache_path) if cache_path is not None else None
+        self.blocks: Optional[List[TickBlock]] = None
+        self.artifacts_by_periods: Dict[Tuple[str, str], List[DayArtifacts]] = {}
+
+    def get_blocks(self) -> List[TickBlock]:
+        if self.blocks is None:
+            read_ticks = self.cache_service.read_ticks if self.cache_service is not None else read_csv_ticks
+            self.blocks = [read_ticks(file_path) for file_path in self.file_paths]
+            if self.bar_period is not None:
+                self.blocks = [FootprintBars.from_ticks(block, self.bar_period).to_tick_block()
+                               for block in self.blocks]
+        return self.blocks
+
+    def get_artifacts(self, profile_period: str, signal_cluster_period: str) -> List[DayArtifacts]:
+        key = (profile_period, signal_cluster_period)
+        if key not in self.artifacts_by_periods and self.cache_service is not None:
+            self.artifacts_by_periods[key] = [
+                self.cache_service.get_day_artifacts(file_path, block, profile_period, signal_cluster_period,
+                                                     self.bar_period)
+                for file_path, block in zip(self.file_paths, self.get_blocks())
+            ]
+        elif key not in self.artifacts_by_periods:
+            self.artifacts_by_periods[key] = [
+                DayArtifacts(block, profile_period, signal_cluster_period) for block in self.get_blocks()
+            ]
+        return self.artifacts_by_periods[key]
+
+    # результаты отсортированы по итогу в пунктах, при равенстве - по порядку вариантов
+    def run(self, parameter_sets: List[Dict]) -> pd.DataFrame:
+        artifacts_by_periods = {}
+        for parameters in parameter_sets:
+            settings = StrategySettings().replace(**parameters)
+            key = (settings.profile_period, settings.signal_cluster_period)
+            artifacts_by_periods[key] = self.get_artifacts(*key)
+
+        logger.info("подбор параметров %s: вариантов %s, дней %s", self.instrument_name, len(parameter_sets),
+                    len(self.file_paths))
+        with ProcessPoolExecutor(
+                max_workers=self.processes,
+                initializer=init_sweep_worker,
+                initargs=(artifacts_by_periods,)
+        ) as executor:
+            results = list(executor.map(partial(run_sweep_job, self.instrument_name), parameter_sets))
+
+        results_df = pd.DataFrame(results)
+        if len(results_df) == 0:
+            return results_df
+        return results_df.sort_values("total_points", ascending=False, kind="mergesort").reset_index(drop=True)
+
+    # проверка лучших вариантов отбора по барам анализом по сделкам
+    # к результатам добавляются итоги по сделкам и расхождение в пунктах
+    def confirm(self, results_df: pd.DataFrame, count: int) -> pd.DataFrame:
+        parameter_columns = [column for column in results_df.columns if column not in STATISTICS_COLUMNS]
+        best_df = results_df.head(count).reset_index(drop=True)
+        exact_service = SweepService(self.instrument_name, self.file_paths, self.processes,
+                                     cache_path=self.cache_path)
+        exact_df = exact_service.run(best_df[parameter_columns].to_dict("records"))
+
+        exact_df = exact_df.rename(columns={column: f"exact_{column}" for column in STATISTICS_COLUMNS})
+        confirmed_df = best_df.merge(exact_df, on=parameter_columns, how="left")
+        confirmed_df["points_divergence"] = confirmed_df["total_points"] - confirmed_df["exact_total_points"]
+        return confirmed_df.sort_values("exact_total_points", ascending=False, kind="mergesort") \
+            .reset_index(drop=True)
+
+
+# подбор из корня проекта: python -m services.sweep_service SBER [./data/SBER-*.csv]
+# с флагом --bars варианты отбираются по минутным барам, а лучшие из них проверяются по сделкам
+if __name__ == "__main__":
+    arguments = [argument for argument in sys.argv[1:] if argument != "--bars"]
+    name = arguments[0] if len(arguments) > 0 else "SBER"
+    file_paths = sorted(arguments[1:] or glob.glob(f"./data/{name}-*.csv"))
+
+    if "--bars" in sys.argv:
+        sweep_service = SweepService(name, file_paths, bar_period=FOOTPRINT_BAR_PERIOD, cache_path=BACKTEST_CACHE_PATH)
+        sweep_df = sweep_service.confirm(sweep_service.run(create_grid(SWEEP_GRID)), count=20)
+    else:
+        sweep_df = SweepService(name, file_paths, cache_path=BACKTEST_CACHE_PATH).run(create_grid(SWEEP_GRID))
+    sweep_df.to_csv(f"./logs/sweep-{name}.csv", index=False)
+    print(sweep_df.head(20).to_string())
@@ -0,0 +1,166 @@
+import glob
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+from os.path import exists
+from typing import Iterator, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from domains.tick import TickBlock
+from utils.parse_util import datetime_to_ns
+
+logger = logging.getLogger(__name__)
+
+# колонки сделок, каждая хранится отдельным файлом .npy
+COLUMNS = {
+    "direction": np.int64,
+    "price": np.float64,
+    "quantity": np.int64,
+    "time": np.int64,
+}
+
+# имя файла с историей: <инструмент>-<ГГГГММДД>.csv
+CSV_FILE_NAME_PATTERN = re.compile(r"^(?P<name>.+)-(?P<date>\d{8})\.csv$")
+
+
+# чтение файла сделок целиком с векторным разбором времени
+def read_csv_ticks(file_path: str) -> TickBlock:
+    # round_trip - цены совпадают с float(строка) при построчном разборе
+    df = pd.read_csv(file_path, sep=",", dtype={"figi": "object"}, float_precision="round_trip")
+    if len(df) == 0:
+        return TickBlock.from_ticks([])
+
+    times = pd.to_datetime(df["time"], utc=True).values.astype("datetime64[ns]").view(np.int64)
+    # догруженные при восстановлении промежутки могут находиться в конце файла
+    order = np.argsort(times, kind="stable")
+    return TickBlock(
+        figi=df["figi"].iloc[0],
+        directions=df["direction"].to_numpy(dtype=np.int64)[order],
+        prices=df["price"].to_numpy(dtype=np.float64)[order],
+        quantities=df["quantity"].to_numpy(dtype=np.int64)[order],
+        times=times[order]
+    )
+
+
+# бинарное колоночное хранилище сделок с разбиением по инструментам и дням:
+# <root>/<инструмент>/<ГГГГММДД>/{direction,price,quantity,time}.npy и meta.json
+# чтение выполняется через memmap без копирования, лишние дни отсекаются по meta.json
+class TickStorage:
+    def __init__(self, root: str = "./data/ticks"):
+        self.root = root
+
+    def get_partition_path(self, name: str, date: str) -> str:
+        return os.path.join(self.root, name, date)
+
+    def get_dates(self, name: str) -> List[str]:
+        instrument_path = os.path.join(self.root, name)
+        if not exists(instrument_path):
+            return []
+        return sorted(date for date in os.listdir(instrument_path) if re.fullmatch(r"\d{8}", date))
+
+    def write(self, name: str, date: str, block: TickBlock):
+        partition_path = self.get_partition_path(name, date)
+        temp_path = f"{partition_path}.tmp"
+        shutil.rmtree(temp_path, ignore_errors=True)
+        os.makedirs(temp_path)
+
+        # внутри дня сделки хранятся по возрастанию времени, чтобы искать границы бинарным поиском
+        order = np.argsort(block.times, kind="stable")
+        arrays = {
+            "direction": block.directions[order],
+            "price": block.prices[order],
+            "quantity": block.quantities[order],
+            "time": block.times[order],
+        }
+        for column, dtype in COLUMNS.items():
+            np.save(os.path.join(temp_path, f"{column}.npy"), np.ascontiguousarray(arrays[column], dtype=dtype))
+
+        meta = {
+            "figi": block.figi,
+            "size": int(block.size),
+            "first_time": int(arrays["time"][0]) if block.size > 0 else None,
+            "last_time": int(arrays["time"][-1]) if block.size > 0 else None,
+        }
+        with open(os.path.join(temp_path, "meta.json"), "w", encoding="utf-8") as file:
+            json.dump(meta, file)
+
+        # замена раздела целиком, чтобы читатели не увидели частично записанные данные
+        shutil.rmtree(partition_path, ignore_errors=True)
+        os.replace(temp_path, partition_path)
+
+    def read_meta(self, name: str, date: str) -> dict:
+        with open(os.path.join(self.get_partition_path(name, date), "meta.json"), encoding="utf-8") as file:
+            return json.load(file)
+
+    # сделки одного дня: массивы отображаются в память, копирование не выполняется
+    def read_partition(self, name: str, date: str, start=None, end=None) -> TickBlock:
+        partition_path = self.get_partition_path(name, date)
+        meta = self.read_meta(name, date)
+        arrays = {
+            column: np.load(os.path.join(partition_path, f"{column}.npy"), mmap_mode="r")
+            for column in COLUMNS
+        }
+
+        times = arrays["time"]
+        start_index = 0 if start is None else np.searchsorted(times, datetime_to_ns(start), side="left")
+        end_index = len(times) if end is None else np.searchsorted(times, datetime_to_ns(end), side="right")
+        return TickBlock(
+            figi=meta["figi"],
+            directions=arrays["direction"][start_index:end_index],
+            prices=arrays["price"][start_index:end_index],
+            quantities=arrays["quantity"][start_index:end_index],
+            times=times[start_index:end_index]
+        )
+
+    # сделки по дням за промежуток времени, дни вне промежутка не открываются
+    def iterate(self, name: str, start=None, end=None) -> Iterator[TickBlock]:
+        start = None if start is None else datetime_to_ns(start)
+        end = None if end is None else datetime_to_ns(end)
+        for date in self.get_dates(name):
+            meta = self.read_meta(name, date)
+            if meta["size"] == 0:
+                continue
+            if start is not None and meta["last_time"] < start:
+                continue
+            if end is not None and meta["first_time"] > end:
+                continue
+            yield self.read_partition(name, date, start, end)
+
+    def read(self, name: str, start=None, end=None) -> TickBlock:
+        blocks = list(self.iterate(name, start, end))
+        if len(blocks) == 0:
+            return TickBlock.from_ticks([])
+        if len(blocks) == 1:
+            return blocks[0]
+
+        return TickBlock(
+            figi=blocks[0].figi,
+            directions=np.concatenate([block.directions for block in blocks]),
+            prices=np.concatenate([block.prices for block in blocks]),
+            quantities=np.concatenate([block.quantities for block in blocks]),
+            times=np.concatenate([block.times for block in blocks])
+        )
+
+    # конвертация файла истории <инструмент>-<ГГГГММДД>.csv в бинарный раздел
+    def convert_csv(self, file_path: str) -> Optional[str]:
+        match = CSV_FILE_NAME_PATTERN.match(os.path.basename(file_path))
+        if match is None:
+            return None
+
+        self.write(match.group("name"), match.group("date"), read_csv_ticks(file_path))
+        return self.get_partition_path(match.group("name"), match.group("date"))
+
+
+# конвертация архива из корня проекта: python -m services.tick_storage [./data/*.csv]
+if __name__ == "__main__":
+    file_paths = sys.argv[1:] or glob.glob("./data/*.csv")
+    storage = TickStorage()
+    for csv_file_path in sorted(file_paths):
+        partition = storage.convert_csv(csv_file_path)
+        if partition is not None:
+            print(f"{csv_file_path} -> {partition}")
@@ -0,0 +1,165 @@
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import pandas as pd
+
+from domains.tick import Tick, TickBlock
+from settings import TICK_WRITER_BUFFER_SIZE, TICK_WRITER_FLUSH_INTERVAL_MS, TICK_WRITER_FSYNC_INTERVAL_MS
+
+logger = logging.getLogger(__name__)
+
+CSV_HEADER = "figi,direction,price,quantity,time\n"
+
+
+# строка в формате DataFrame.to_csv для create_empty_df
+def format_tick(figi: str, direction: int, price: float, quantity: int, time_ns: int) -> str:
+    return f"{figi},{direction},{price!r},{quantity},{pd.Timestamp(time_ns, tz='UTC')}\n"
+
+
+# запись сделок в файлы инструментов в отдельном потоке:
+# на каждый инструмент открыт один файл, строки копятся в буфере и дописываются в конец файла
+# по достижении размера буфера, по истечении интервала и при завершении работы
+# fsync_interval_ms = 0 - только сброс в ОС, иначе fsync не чаще указанного интервала
+class TickWriter(threading.Thread):
+    def __init__(
+            self,
+            buffer_size: int = TICK_WRITER_BUFFER_SIZE,
+            flush_interval_ms: int = TICK_WRITER_FLUSH_INTERVAL_MS,
+            fsync_interval_ms: int = TICK_WRITER_FSYNC_INTERVAL_MS,
+            on_flush: Optional[Callable[[str, int], None]] = None
+    ):
+        super().__init__(daemon=True)
+
+        self.buffer_size = max(buffer_size, 1)
+        self.flush_interval = flush_interval_ms / 1000
+        self.fsync_interval = fsync_interval_ms / 1000
+        # вызывается из потока записи после сброса: figi и время последней записанной сделки
+        self.on_flush = on_flush
+
+        self.queue = queue.Queue()
+        self.files = {}
+        self.rows: Dict[str, List[str]] = {}
+        self.last_times: Dict[str, int] = {}
+        self.size = 0
+        self.flushed_time = time.monotonic()
+        self.synced_time = time.monotonic()
+
+    # открытие файла инструмента на дозапись, заголовок пишется только в пустой файл
+    def open(self, figi: str, file_path: str):
+        file = open(file_path, "a", newline='')
+        if file.tell() == 0:
+            file.write(CSV_HEADER)
+            file.flush()
+        self.files[figi] = file
+        self.rows[figi] = []
+
+    def write(self, tick: Tick):
+        self.queue.put(tick)
+
+    def write_block(self, block: TickBlock):
+        if block.size > 0:
+            self.queue.put(block)
+
+    # сброс буферов с ожиданием завершения
+    def flush(self):
+        event = threading.Event()
+        self.queue.put(event)
+        if self.is_alive():
+            event.wait()
+
+    # сброс буферов и закрытие файлов в конце сессии
+    def close(self):
+        if self.is_alive():
+            self.queue.put(None)
+            self.join()
+        else:
+            self.flush_all()
+            self.close_files()
+
+    def run(self):
+        while True:
+            timeout = max(self.flushed_time + self.flush_interval - time.monotonic(), 0)
+            try:
+                item = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                self.flush_all()
+                continue
+
+            if item is None:
+                self.flush_all()
+                self.close_files()
+                return
+
+            if isinstance(item, threading.Event):
+                self.flush_all()
+                item.set()
+                continue
+
+            try:
+                self.add(item)
+            except Exception as ex:
+                logger.error(ex)
+
+            if self.size >= self.buffer_size or time.monotonic() - self.flushed_time >= self.flush_interval:
+                self.flush_all()
+
+    def add(self, item):
+        if isinstance(item, Tick):
+            rows = self.rows[item.figi]
+            rows.append(format_tick(item.figi, item.direction, item.price, item.quantity, item.time))
+            self.last_times[item.figi] = max(self.last_times.get(item.figi, item.time), item.time)
+            self.size += 1
+            return
+
+        rows = self.rows[item.figi]
+        for direction, price, quantity, time_ns in zip(
+                item.directions.tolist(), item.prices.tolist(), item.quantities.tolist(), item.times.tolist()
+        ):
+            rows.append(format_tick(item.figi, direction, price, quantity, time_ns))
+        last_time = int(item.times.max())
+        self.last_times[item.figi] = max(self.last_times.get(item.figi, last_time), last_time)
+        self.size += item.size
+
+    def flush_all(self):
+        is_fsync_needed = self.fsync_interval > 0 and time.monotonic() - self.synced_time >= self.fsync_interval
+
+        flushed = []
+        for figi, rows in self.rows.items():
+            if len(rows) == 0:
+                continue
+            try:
+                file = self.files[figi]
+                file.write("".join(rows))
+                file.flush()
+                if is_fsync_needed:
+                    os.fsync(file.fileno())
+                flushed.append(figi)
+            except Exception as ex:
+                logger.error(ex)
+            rows.clear()
+
+        self.size = 0
+        self.flushed_time = time.monotonic()
+        if is_fsync_needed:
+            self.synced_time = self.flushed_time
+
+        if self.on_flush is not None:
+            for figi in flushed:
+                try:
+                    self.on_flush(figi, self.last_times[figi])
+                except Exception as ex:
+                    logger.error(ex)
+
+    def close_files(self):
+        for file in self.files.values():
+            try:
+                if self.fsync_interval > 0:
+                    os.fsync(file.fileno())
+                file.close()
+            except Exception as ex:
+                logger.error(ex)
+        self.files = {}
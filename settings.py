@@ -49,12 +49,68 @@ NOTIFICATION = {
     "bot_token": "",
     "chat_id": ""
 }
+
+# количество одновременных запросов при загрузке истории по всем инструментам
+HISTORY_CONCURRENCY = 4
+
+# ограничение количества запросов в секунду при загрузке истории
+HISTORY_REQUESTS_PER_SECOND = 5
+
+# количество повторов запроса истории при ошибке (ограничение частоты, таймаут, обрыв соединения)
+HISTORY_RETRY_COUNT = 3
+
+# пауза в секундах перед первым повтором запроса истории, каждый следующий повтор ждет вдвое дольше
+HISTORY_RETRY_DELAY_SECONDS = 1
+
+# количество сделок в буфере записи, по достижении которого буфер сбрасывается в файлы инструментов
+TICK_WRITER_BUFFER_SIZE = 1000
+
+# максимальное время в миллисекундах, которое сделка может находиться в буфере записи
+TICK_WRITER_FLUSH_INTERVAL_MS = 1000
+
+# интервал в миллисекундах для fsync файлов сделок, 0 - только сброс буфера без fsync
+TICK_WRITER_FSYNC_INTERVAL_MS = 0
+
+# максимальное количество необработанных сделок в очереди каждого инструмента
+WORKER_QUEUE_SIZE = 10000
+
+# поведение при заполненной очереди инструмента:
+# block - ожидание освобождения места, drop_newest - отбросить новую сделку, drop_oldest - отбросить самую старую
+WORKER_OVERFLOW_POLICY = "block"
+
+# интервал в секундах для вывода в лог глубины очередей и задержек обработки
+WORKER_STATS_INTERVAL_SECONDS = 60
+
+# режим пачек: максимальное количество накопившихся сделок инструмента, обрабатываемых за раз
+# 1 - каждая сделка обрабатывается отдельно
+WORKER_BATCH_SIZE = 1
+
+# максимальная задержка в миллисекундах, добавляемая ожиданием сделок для пачки
+# 0 - в пачку попадают только уже поступившие сделки
+WORKER_BATCH_LATENCY_MS = 0
+
+# каталог кэша результатов анализа истории: разобранные сделки, кластера и сделки стратегии
+BACKTEST_CACHE_PATH = "./data/cache"
+
+# максимальный размер кэша в мегабайтах, при превышении удаляются давно не использованные записи
+BACKTEST_CACHE_MAX_SIZE_MB = 2048
+
+# интервал в секундах для переноса журнала базы сделок (WAL) в основной файл в отдельном потоке
+ORDER_STORAGE_CHECKPOINT_INTERVAL_SECONDS = 60
+
+# запись всех сообщений потока с временем получения в ./data/marketdata-ГГГГММДД.bin
+# для последующего воспроизведения через робота (services/market_data_log.py)
+IS_MARKET_DATA_RECORD = False
 # endregion общие настройки робота
 
 # region настройки стратегии
 # период профиля рынка, примеры: 1min, 1h, 1d, 1m
 PROFILE_PERIOD = "1h"
 
+# глубина профиля рынка: сделки и кластера старше удаляются при смене часа, None - без ограничения
+# при анализе нескольких дней подряд уровни предыдущей сессии учитываются в пределах глубины
+PROFILE_LOOKBACK = "1d"
+
 # ТФ сигнальной свечи для рассмотрения ТВ, примеры: 1min, 1h, 1d, 1m
 SIGNAL_CLUSTER_PERIOD = "5min"
 
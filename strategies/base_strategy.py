@@ -0,0 +1,45 @@
+from abc import ABC, abstractmethod
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from domains.order import Order
+
+
+# протокол стратегии: сделки инструмента передаются пачками в виде колонок numpy,
+# время в наносекундах UTC, сделки в пачке упорядочены по времени
+# одна и та же реализация используется в real-time (по одной сделке или пачками) и при анализе истории
+class BaseStrategy(ABC):
+    # загрузка накопленных сделок в формате create_empty_df
+    @abstractmethod
+    def set_df(self, df: pd.DataFrame):
+        pass
+
+    # обработка пачки сделок: список (индекс сделки в пачке, ордера), сформированных на этой сделке
+    # индекс позволяет вызывающему проверить открытые позиции по сделкам до нее, как при обработке по одной
+    @abstractmethod
+    def analyze_batch(
+            self,
+            prices: np.ndarray,
+            quantities: np.ndarray,
+            directions: np.ndarray,
+            times: np.ndarray
+    ) -> List[Tuple[int, List[Order]]]:
+        pass
+
+    # обработка одной сделки в формате create_empty_df
+    def analyze(
+            self,
+            trade_df: pd.DataFrame
+    ) -> Optional[List[Order]]:
+        trade_data = trade_df.iloc[0]
+        results = self.analyze_batch(
+            np.array([trade_data["price"]], dtype=np.float64),
+            np.array([trade_data["quantity"]], dtype=np.int64),
+            np.array([trade_data["direction"]], dtype=np.int64),
+            np.array([pd.Timestamp(trade_data["time"]).value], dtype=np.int64)
+        )
+        if len(results) == 0:
+            return None
+        return results[0][1]
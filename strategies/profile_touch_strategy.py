@@ -1,20 +1,25 @@
 import datetime
 import logging
 import threading
-from typing import List, Optional
+from typing import List, Optional, Tuple
 
+import numpy as np
 import pandas as pd
 from tinkoff.invest import TradeDirection, OrderDirection
 
-from constants import FIVE_MINUTES_TO_SECONDS
+from constants import FIVE_MINUTES_TO_NANOSECONDS, ONE_HOUR_TO_NANOSECONDS, ONE_MINUTE_TO_NANOSECONDS
 from domains.order import Order
-from utils.exchange_util import is_open_orders, is_premarket_time
+from domains.signal_candles import SignalCandles
+from domains.strategy_settings import StrategySettings
+from domains.tick_buffer import TickBuffer
+from domains.volume_levels import VolumeLevels
+from domains.volume_profile import VolumeProfile
+from strategies.base_strategy import BaseStrategy
+from utils.exchange_util import is_open_orders_ns, is_premarket_time_ns
 from visualizers.finplot_graph import FinplotGraph
-from settings import PROFILE_PERIOD, FIRST_TOUCH_VOLUME_LEVEL, SECOND_TOUCH_VOLUME_LEVEL, FIRST_GOAL, \
-    PERCENTAGE_STOP_LOSS, SIGNAL_CLUSTER_PERIOD, IS_SHOW_CHART, GOAL_STEP, COUNT_LOTS, COUNT_GOALS
+from settings import IS_SHOW_CHART
 from utils.order_util import prepare_orders
-from utils.strategy_util import is_price_in_range_cluster, ticks_to_cluster, calculate_ratio, \
-    processed_volume_levels_to_times, apply_frame_type
+from utils.strategy_util import processed_volume_levels_to_times
 
 pd.options.display.max_columns = None
 pd.options.display.max_rows = None
@@ -24,102 +29,183 @@ logger = logging.getLogger(__name__)
 
 
 # стратегия касание объемного уровня
-class ProfileTouchStrategy(threading.Thread):
-    def __init__(self, instrument_name):
+# профиль и сигнальные свечи могут быть переданы заранее рассчитанными для всех сделок дня
+class ProfileTouchStrategy(BaseStrategy, threading.Thread):
+    def __init__(
+            self,
+            instrument_name,
+            settings: Optional[StrategySettings] = None,
+            profile=None,
+            signal_candles=None
+    ):
         super().__init__()
 
         self.instrument_name = instrument_name
+        self.settings = settings if settings is not None else StrategySettings()
+        self.first_touch_volume_level_ns = self.settings.first_touch_volume_level * ONE_MINUTE_TO_NANOSECONDS
+        self.second_touch_volume_level_ns = self.settings.second_touch_volume_level * ONE_MINUTE_TO_NANOSECONDS
+        self.profile_lookback_ns = pd.Timedelta(self.settings.profile_lookback).value \
+            if self.settings.profile_lookback is not None else None
 
-        self.df = pd.DataFrame(columns=["figi", "direction", "price", "quantity", "time"])
-        self.df = apply_frame_type(self.df)
+        self.ticks = TickBuffer()
+        self.profile = profile if profile is not None else VolumeProfile(self.settings.profile_period)
+        self.signal_candles = signal_candles if signal_candles is not None \
+            else SignalCandles(self.settings.signal_cluster_period)
 
         self.first_tick_time = None
         self.fix_date = {}
         self.clusters = None
+        self.volume_levels = None
         self.processed_volume_levels = {}
 
+        # пачка сделок, обрабатываемая analyze_batch, и количество уже добавленных из нее сделок
+        self.batch = None
+        self.appended_index = 0
+
         if IS_SHOW_CHART:
-            self.visualizer = FinplotGraph(SIGNAL_CLUSTER_PERIOD)
+            self.visualizer = FinplotGraph(self.settings.signal_cluster_period)
             self.visualizer.start()
 
     def set_df(self, df: pd.DataFrame):
-        self.df = df
+        self.ticks = TickBuffer.from_df(df)
+        self.profile = VolumeProfile.from_ticks(self.settings.profile_period, self.ticks.prices,
+                                                self.ticks.quantities, self.ticks.times)
+        self.signal_candles = SignalCandles.from_ticks(self.settings.signal_cluster_period, self.ticks.prices,
+                                                       self.ticks.quantities, self.ticks.times)
         logger.info("загружен новый DataFrame")
 
     def analyze(
             self,
             trade_df: pd.DataFrame
     ) -> Optional[List[Order]]:
-        trade_data = trade_df.iloc[0]
-        current_price = trade_data["price"]
-        time = trade_data["time"]
+        if self.ticks.figi is None:
+            self.ticks.figi = trade_df.iloc[0]["figi"]
+        return super().analyze(trade_df)
 
-        if is_premarket_time(time):
+    def analyze_batch(
+            self,
+            prices: np.ndarray,
+            quantities: np.ndarray,
+            directions: np.ndarray,
+            times: np.ndarray
+    ) -> List[Tuple[int, List[Order]]]:
+        results = []
+
+        # пропускаю анализ премаркета
+        indexes = np.flatnonzero(~is_premarket_time_ns(np.asarray(times, dtype=np.int64)))
+        if len(indexes) == 0:
+            return results
+        if len(indexes) != len(times):
+            prices, quantities, directions, times = \
+                prices[indexes], quantities[indexes], directions[indexes], times[indexes]
+
+        # сделки добавляются в профиль и свечи отрезками непосредственно перед их использованием
+        self.appended_index = 0
+        self.batch = (prices, quantities, directions, times)
+
+        for index, (current_price, time) in enumerate(zip(prices.tolist(), times.tolist())):
+            # начало часа, а не час суток, чтобы смена часа определялась и при переходе на следующий день
+            hour = time - time % ONE_HOUR_TO_NANOSECONDS
+            if self.settings.profile_period not in self.fix_date:
+                self.fix_date[self.settings.profile_period] = hour
+
+            if self.first_tick_time is None:
+                # сбрасываю секунды, чтобы сравнивать "целые" минутные свечи
+                self.first_tick_time = time - time % ONE_MINUTE_TO_NANOSECONDS
+
+            if self.fix_date[self.settings.profile_period] < hour:
+                # построение кластерных свечей и графика раз в 1 час
+                self.fix_date[self.settings.profile_period] = hour
+                self.append_batch(index)
+                self.trim(hour)
+                self.calculate_clusters()
+
+            if self.volume_levels is not None:
+                self.process_touches(current_price, time)
+
+            if time - self.first_tick_time >= FIVE_MINUTES_TO_NANOSECONDS:
+                # сбрасываю секунды, чтобы сравнивать завершенные свечи
+                self.first_tick_time = time - time % ONE_MINUTE_TO_NANOSECONDS
+                # если торги доступны, то каждую завершенную минуту проверяю кластера на возможную ТВ
+                if is_open_orders_ns(time) and len(self.processed_volume_levels) > 0:
+                    self.append_batch(index + 1)
+                    orders = self.check_entry_points(current_price, pd.Timestamp(time, tz="UTC"))
+                    if orders is not None:
+                        results.append((int(indexes[index]), orders))
+
+        self.append_batch(len(times))
+        self.batch = None
+        return results
+
+    # добавление сделок пачки до end (не включительно) в буфер, профиль и сигнальные свечи
+    def append_batch(self, end: int):
+        start = self.appended_index
+        if start >= end:
             return
 
-        if PROFILE_PERIOD not in self.fix_date:
-            self.fix_date[PROFILE_PERIOD] = time.hour
-
-        if self.first_tick_time is None:
-            # сбрасываю секунды, чтобы сравнивать "целые" минутные свечи
-            self.first_tick_time = time.replace(second=0, microsecond=0)
-
-        if self.fix_date[PROFILE_PERIOD] < time.hour:
-            # построение кластерных свечей и графика раз в 1 час
-            self.fix_date[PROFILE_PERIOD] = time.hour
-            self.calculate_clusters()
-
-        self.df = pd.concat([self.df, trade_df])
-
-        if self.clusters is not None:
-            for index, cluster in self.clusters.iterrows():
-                cluster_time = cluster["time"]
-                cluster_price = cluster["max_volume_price"]
-
-                # цена может коснуться объемного уровня в заданном процентном диапазоне
-                is_price_in_range = is_price_in_range_cluster(current_price, cluster_price)
-                if is_price_in_range:
-                    timedelta = time - cluster_time
-                    if timedelta < datetime.timedelta(minutes=FIRST_TOUCH_VOLUME_LEVEL):
-                        continue
-
-                    if cluster_price not in self.processed_volume_levels:
-                        # инициализация первого касания уровня
-                        self.processed_volume_levels[cluster_price] = {}
-                        self.processed_volume_levels[cluster_price]["count_touches"] = 0
-                        self.processed_volume_levels[cluster_price]["times"] = {}
-                    else:
-                        # обработка второго и последующего касания уровня на основе времени последнего касания
-                        if self.processed_volume_levels[cluster_price]["last_touch_time"] is not None:
-                            timedelta = time - self.processed_volume_levels[cluster_price]["last_touch_time"]
-                            if timedelta < datetime.timedelta(minutes=SECOND_TOUCH_VOLUME_LEVEL):
-                                continue
-
-                    # установка параметров при касании уровня
-                    self.processed_volume_levels[cluster_price]["count_touches"] += 1
-                    self.processed_volume_levels[cluster_price]["last_touch_time"] = time
-                    self.processed_volume_levels[cluster_price]["times"][time] = None
-
-                    count_touches = self.processed_volume_levels[cluster_price]['count_touches']
-                    logger.info("объемный уровень %s сформирован %s", cluster_price, cluster_time)
-                    logger.info("время %s: цена %s подошла к объемному уровню %s раз\n", time, current_price, count_touches)
-                    break
-
-        if (time - self.first_tick_time).total_seconds() >= FIVE_MINUTES_TO_SECONDS:
-            # сбрасываю секунды, чтобы сравнивать завершенные свечи
-            self.first_tick_time = time.replace(second=0, microsecond=0)
-            # если торги доступны, то каждую завершенную минуту проверяю кластера на возможную ТВ
-            if is_open_orders(time) and len(self.processed_volume_levels) > 0:
-                return self.check_entry_points(current_price, time)
+        prices, quantities, directions, times = self.batch
+        self.ticks.extend(directions[start:end], prices[start:end], quantities[start:end], times[start:end])
+        self.profile.update_batch(prices[start:end], quantities[start:end], times[start:end])
+        self.signal_candles.update_batch(prices[start:end], quantities[start:end], times[start:end])
+        self.appended_index = end
+
+    # удаление сделок и кластеров старше глубины профиля, чтобы память не росла при анализе многих дней
+    def trim(self, time: int):
+        if self.profile_lookback_ns is None:
+            return
+
+        start_time = time - self.profile_lookback_ns
+        self.ticks.trim(start_time)
+        if self.profile.trim(start_time) == 0:
+            return
+
+        # уровни удаленных кластеров без ожидающих подтверждения касаний больше не нужны
+        prices = {cluster.max_volume_price for cluster in self.profile.clusters.values()}
+        for price in list(self.processed_volume_levels):
+            volume_level = self.processed_volume_levels[price]
+            if price not in prices and None not in volume_level["times"].values():
+                del self.processed_volume_levels[price]
+
+    # цена может коснуться объемного уровня в заданном процентном диапазоне
+    def process_touches(self, current_price: float, time: int):
+        for cluster_time, cluster_price in self.volume_levels.find(current_price):
+            if time - cluster_time.value < self.first_touch_volume_level_ns:
+                continue
+
+            if cluster_price not in self.processed_volume_levels:
+                # инициализация первого касания уровня
+                self.processed_volume_levels[cluster_price] = {}
+                self.processed_volume_levels[cluster_price]["count_touches"] = 0
+                self.processed_volume_levels[cluster_price]["times"] = {}
+            else:
+                # обработка второго и последующего касания уровня на основе времени последнего касания
+                last_touch_time = self.processed_volume_levels[cluster_price]["last_touch_time"]
+                if last_touch_time is not None and \
+                        time - last_touch_time.value < self.second_touch_volume_level_ns:
+                    continue
+
+            # установка параметров при касании уровня
+            touch_time = pd.Timestamp(time, tz="UTC")
+            self.processed_volume_levels[cluster_price]["count_touches"] += 1
+            self.processed_volume_levels[cluster_price]["last_touch_time"] = touch_time
+            self.processed_volume_levels[cluster_price]["times"][touch_time] = None
+
+            count_touches = self.processed_volume_levels[cluster_price]['count_touches']
+            logger.info("объемный уровень %s сформирован %s", cluster_price, cluster_time)
+            logger.info("время %s: цена %s подошла к объемному уровню %s раз\n", touch_time, current_price,
+                        count_touches)
+            break
 
     def calculate_clusters(self):
-        if self.df.empty:
+        if len(self.ticks) == 0:
             return
-        self.clusters = ticks_to_cluster(self.df, period=PROFILE_PERIOD)
+        # профиль обновляется на каждой сделке, поэтому кластера берутся без пересчета всех сделок
+        self.clusters = self.profile.to_df()
+        self.volume_levels = VolumeLevels(self.clusters, self.settings.percentage_volume_level_range)
         valid_entry_points, invalid_entry_points = processed_volume_levels_to_times(
             self.processed_volume_levels)
         if IS_SHOW_CHART:
-            self.visualizer.render(self.df,
+            self.visualizer.render(self.ticks.to_df(),
                                    valid_entry_points=valid_entry_points,
                                    invalid_entry_points=invalid_entry_points,
                                    clusters=self.clusters)
@@ -129,22 +215,20 @@ class ProfileTouchStrategy(threading.Thread):
             current_price: float,
             time: datetime
     ) -> Optional[List[Order]]:
+        # последние закрытые свечи одинаковы для всех уровней и касаний
+        prev_candle, current_candle = self.signal_candles.get_last_candles()
         for volume_price, volume_level in self.processed_volume_levels.items():
             for touch_time, value in volume_level["times"].items():
                 if value is not None:
                     continue
-                candles = ticks_to_cluster(self.df, period=SIGNAL_CLUSTER_PERIOD)
-                candles = calculate_ratio(candles)
-                prev_candle = candles.iloc[-3]
-                current_candle = candles.iloc[-2]
-                if current_candle.empty or prev_candle.empty:
+                if current_candle is None or prev_candle is None:
                     logger.error("свеча не найдена")
                     continue
 
                 if current_candle["win"] is True:
                     # если свеча является сигнальной, то осуществляю сделку
                     max_volume_price = current_candle["max_volume_price"]
-                    percent = (max_volume_price * PERCENTAGE_STOP_LOSS / 100)
+                    percent = (max_volume_price * self.settings.percentage_stop_loss / 100)
                     self.processed_volume_levels[volume_price]["times"][touch_time] = True
 
                     if current_candle["direction"] == TradeDirection.TRADE_DIRECTION_BUY:
@@ -223,8 +307,8 @@ class ProfileTouchStrategy(threading.Thread):
             time=time,
             stop_loss=stop,
             direction=direction,
-            count_lots=COUNT_LOTS,
-            count_goals=COUNT_GOALS,
-            goal_step=GOAL_STEP,
-            first_goal=FIRST_GOAL
+            count_lots=self.settings.count_lots,
+            count_goals=self.settings.count_goals,
+            goal_step=self.settings.goal_step,
+            first_goal=self.settings.first_goal
         )
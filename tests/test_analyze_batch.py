@@ -0,0 +1,84 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from strategies.profile_touch_strategy import ProfileTouchStrategy
+from utils.strategy_util import apply_frame_type
+
+FIGI = "BBG004730N88"
+
+
+def create_ticks(count: int, seed: int = 1) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    start = pd.Timestamp("2022-05-06 06:55:00+00:00").value
+    end = pd.Timestamp("2022-05-06 14:00:00+00:00").value
+    times = np.sort(rng.integers(start, end, count)) // 1000 * 1000
+    steps = rng.choice([-1, 0, 1], count, p=[0.3, 0.4, 0.3])
+    return pd.DataFrame({
+        "figi": FIGI,
+        "direction": rng.integers(1, 3, count),
+        "price": np.round(100 + np.cumsum(steps) * 0.01, 2),
+        "quantity": rng.integers(1, 50, count),
+        "time": pd.to_datetime(times, utc=True),
+    })
+
+
+# ордер без случайных идентификаторов
+def order_to_tuple(order):
+    return order.instrument, order.open, order.stop, order.take, order.quantity, order.direction, order.time
+
+
+class TestAnalyzeBatch(unittest.TestCase):
+    def setUp(self):
+        self.df = create_ticks(4000)
+        self.prices = self.df["price"].to_numpy(dtype=np.float64)
+        self.quantities = self.df["quantity"].to_numpy(dtype=np.int64)
+        self.directions = self.df["direction"].to_numpy(dtype=np.int64)
+        self.times = self.df["time"].values.view(np.int64)
+
+    def analyze_by_tick(self):
+        strategy = ProfileTouchStrategy("SBER")
+        results = []
+        for index in range(len(self.df)):
+            orders = strategy.analyze(apply_frame_type(self.df.iloc[[index]]))
+            if orders is not None:
+                results.append((index, orders))
+        return strategy, results
+
+    def analyze_by_batch(self, size: int):
+        strategy = ProfileTouchStrategy("SBER")
+        results = []
+        for start in range(0, len(self.df), size):
+            end = start + size
+            batch_results = strategy.analyze_batch(self.prices[start:end], self.quantities[start:end],
+                                                   self.directions[start:end], self.times[start:end])
+            results += [(start + index, orders) for index, orders in batch_results]
+        return strategy, results
+
+    def test_same_as_by_tick(self):
+        expected_strategy, expected_results = self.analyze_by_tick()
+        self.assertGreater(len(expected_strategy.processed_volume_levels), 0)
+        self.assertGreater(len(expected_results), 0)
+
+        for size in [7, 1000, len(self.df)]:
+            strategy, results = self.analyze_by_batch(size)
+            self.assertEqual(strategy.processed_volume_levels, expected_strategy.processed_volume_levels)
+            self.assertEqual(
+                [(index, list(map(order_to_tuple, orders))) for index, orders in results],
+                [(index, list(map(order_to_tuple, orders))) for index, orders in expected_results]
+            )
+            self.assertEqual(len(strategy.ticks), len(expected_strategy.ticks))
+            np.testing.assert_array_equal(strategy.ticks.times, expected_strategy.ticks.times)
+
+    def test_skip_premarket(self):
+        strategy = ProfileTouchStrategy("SBER")
+        premarket = self.times < pd.Timestamp("2022-05-06 07:00:00+00:00").value
+        self.assertTrue(premarket.any())
+
+        strategy.analyze_batch(self.prices, self.quantities, self.directions, self.times)
+        self.assertEqual(len(strategy.ticks), len(self.df) - premarket.sum())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+from tinkoff.invest import OrderDirection
+
+from domains.order import Order
+from domains.tick import TickBlock
+from services.backtest_service import BacktestService, find_close_index, run_backtest_job, run_backtests
+from services.order_service import OrderService
+from strategies.profile_touch_strategy import ProfileTouchStrategy
+from tests.test_analyze_batch import create_ticks, FIGI
+
+
+def order_to_tuple(order):
+    return order.open, order.stop, order.take, order.direction, order.time, order.status, order.close, order.result
+
+
+class TestBacktestService(unittest.TestCase):
+    def setUp(self):
+        df = create_ticks(20000, seed=2)
+        self.block = TickBlock(
+            figi=FIGI,
+            directions=df["direction"].to_numpy(dtype=np.int64),
+            prices=df["price"].to_numpy(dtype=np.float64),
+            quantities=df["quantity"].to_numpy(dtype=np.int64),
+            times=df["time"].values.view(np.int64)
+        )
+
+    # проверка позиций на каждой сделке, как в real-time
+    def run_by_tick(self):
+        strategy = ProfileTouchStrategy("SBER")
+        order_service = OrderService(file_path=None)
+        results = dict(strategy.analyze_batch(self.block.prices, self.block.quantities, self.block.directions,
+                                              self.block.times))
+        for index in range(self.block.size):
+            order_service.processed_orders("SBER", float(self.block.prices[index]),
+                                           pd.Timestamp(int(self.block.times[index]), tz="UTC"))
+            for order in results.get(index, []):
+                order_service.create_order(order)
+        return order_service.orders
+
+    def test_same_as_by_tick(self):
+        expected_orders = self.run_by_tick()
+        self.assertGreater(len(expected_orders), 0)
+
+        backtest_service = BacktestService("SBER")
+        orders = backtest_service.run(self.block)
+        self.assertEqual(list(map(order_to_tuple, orders)), list(map(order_to_tuple, expected_orders)))
+
+        report = backtest_service.get_report()
+        self.assertEqual(report["ticks"], self.block.size)
+        self.assertGreater(report["ticks_per_second"], 0)
+
+    def test_run_backtests(self):
+        with tempfile.TemporaryDirectory() as directory:
+            jobs = []
+            for seed in [3, 4, 5]:
+                file_path = os.path.join(directory, f"SBER-2022050{seed}.csv")
+                create_ticks(5000 * seed, seed=seed).to_csv(file_path, index=False)
+                jobs.append(("SBER", file_path))
+
+            expected_reports = [run_backtest_job(instrument_name, file_path) for instrument_name, file_path in jobs]
+            reports = list(run_backtests(jobs, processes=2))
+
+        # порядок результатов совпадает с порядком задач
+        self.assertEqual([report["file_path"] for report in reports], [file_path for _, file_path in jobs])
+        for report, expected_report in zip(reports, expected_reports):
+            self.assertEqual(report["ticks"], expected_report["ticks"])
+            self.assertEqual(list(map(order_to_tuple, report["orders"])),
+                             list(map(order_to_tuple, expected_report["orders"])))
+
+    def test_find_close_index(self):
+        order = Order(id="1", group_id="1", instrument="SBER", open=100, stop=99, take=103, quantity=1,
+                      direction=OrderDirection.ORDER_DIRECTION_BUY.value, time=None)
+        prices = np.array([100, 101, 103, 103.5, 98])
+        is_closed_time = np.array([False, False, False, False, False])
+
+        self.assertEqual(find_close_index(order, "SBER", prices, is_closed_time), 3)
+        self.assertEqual(find_close_index(order, "GAZP", prices, is_closed_time), 5)
+        self.assertEqual(find_close_index(order, "GAZP", prices, np.array([False, True, True, True, True])), 1)
+        self.assertEqual(find_close_index(order, "SBER", prices[:0], is_closed_time[:0]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+import unittest
+
+import numpy as np
+
+from benchmarks.run_benchmarks import compare_results, run_benchmarks
+from benchmarks.synthetic_ticks import create_synthetic_ticks
+
+
+class TestBenchmarks(unittest.TestCase):
+    def test_synthetic_ticks(self):
+        blocks = create_synthetic_ticks(1000, seed=1, instruments=2, ticks_per_second=10, volatility=0.05)
+        same_blocks = create_synthetic_ticks(1000, seed=1, instruments=2, ticks_per_second=10, volatility=0.05)
+
+        self.assertEqual(len(blocks), 2)
+        self.assertNotEqual(blocks[0].figi, blocks[1].figi)
+        self.assertTrue(np.array_equal(blocks[1].prices, same_blocks[1].prices))
+        self.assertTrue(np.array_equal(blocks[1].times, same_blocks[1].times))
+        self.assertTrue(np.all(np.diff(blocks[0].times) >= 0))
+        # 1000 сделок с частотой 10 в секунду занимают около 100 секунд
+        self.assertAlmostEqual((blocks[0].times[-1] - blocks[0].times[0]) / 10 ** 9, 100, delta=20)
+
+    def test_run_benchmarks(self):
+        results = run_benchmarks([2000], repeat=1, per_tick_limit=200,
+                                 names=["ticks_to_cluster_1h", "processed_orders"])
+
+        self.assertEqual(set(results["results"]), {"ticks_to_cluster_1h[2000]", "processed_orders[2000]"})
+        self.assertEqual(results["results"]["processed_orders[2000]"]["items"], 200)
+        self.assertGreater(results["results"]["ticks_to_cluster_1h[2000]"]["items_per_second"], 0)
+
+    def test_compare_results(self):
+        base = {"results": {
+            "a": {"items_per_second": 1000, "peak_memory_mb": 10},
+            "b": {"items_per_second": 1000, "peak_memory_mb": 10},
+            "c": {"items_per_second": 1000, "peak_memory_mb": 10},
+            "d": {"items_per_second": 1000, "peak_memory_mb": 0.01},
+        }}
+        current = {"results": {
+            "a": {"items_per_second": 950, "peak_memory_mb": 11},
+            "b": {"items_per_second": 800, "peak_memory_mb": 10},
+            "c": {"items_per_second": 1000, "peak_memory_mb": 13},
+            "d": {"items_per_second": 1000, "peak_memory_mb": 0.1},
+        }}
+
+        comparisons = {item["name"]: item for item in compare_results(base, current, 0.1, 0.2)}
+        self.assertFalse(comparisons["a"]["is_regression"])
+        self.assertTrue(comparisons["b"]["is_regression"])
+        self.assertTrue(comparisons["c"]["is_regression"])
+        self.assertFalse(comparisons["d"]["is_regression"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from domains.strategy_settings import StrategySettings
+from services.backtest_service import run_backtest_job
+from services.cache_service import CacheService, get_file_hash
+from tests.test_analyze_batch import create_ticks
+from tests.test_backtest_service import order_to_tuple
+
+
+class TestCacheService(unittest.TestCase):
+    def test_read_ticks(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "SBER-20220502.csv")
+            create_ticks(1000, seed=2).to_csv(file_path, index=False)
+            cache_service = CacheService(os.path.join(directory, "cache"))
+
+            block = cache_service.read_ticks(file_path)
+            self.assertEqual(cache_service.get_stats()["ticks"]["entries"], 1)
+            cached_block = cache_service.read_ticks(file_path)
+            self.assertTrue(np.array_equal(block.prices, cached_block.prices))
+            self.assertTrue(np.array_equal(block.times, cached_block.times))
+
+            # измененный файл получает новый ключ
+            create_ticks(500, seed=3).to_csv(file_path, index=False)
+            self.assertEqual(cache_service.read_ticks(file_path).size, 500)
+            self.assertEqual(cache_service.get_stats()["ticks"]["entries"], 2)
+
+            cache_service.invalidate("ticks")
+            self.assertEqual(cache_service.get_stats()["ticks"]["entries"], 0)
+
+    def test_get_clusters(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "SBER-20220502.csv")
+            create_ticks(1000, seed=2).to_csv(file_path, index=False)
+            cache_service = CacheService(os.path.join(directory, "cache"))
+
+            clusters = cache_service.get_clusters(file_path, "1h")
+            self.assertTrue(clusters.equals(cache_service.get_clusters(file_path, "1h")))
+            self.assertEqual(cache_service.get_stats()["clusters"]["entries"], 1)
+
+    def test_evict(self):
+        with tempfile.TemporaryDirectory() as directory:
+            cache_service = CacheService(directory)
+            for index in range(4):
+                key = cache_service.get_key("ticks", index)
+                cache_service.put("ticks", key, np.zeros(10000, dtype=np.int64))
+                os.utime(cache_service.get_path("ticks", key), ns=(index * 10 ** 9, index * 10 ** 9))
+
+            # первая запись использована последней, поэтому вытесняются вторая и третья
+            cache_service.get("ticks", cache_service.get_key("ticks", 0))
+            cache_service.max_size = 200 * 1024
+            cache_service.evict()
+            self.assertIsNotNone(cache_service.get("ticks", cache_service.get_key("ticks", 0)))
+            self.assertIsNone(cache_service.get("ticks", cache_service.get_key("ticks", 1)))
+            self.assertIsNone(cache_service.get("ticks", cache_service.get_key("ticks", 2)))
+            self.assertLessEqual(cache_service.get_stats()["ticks"]["size"], cache_service.max_size)
+
+    def test_put_evict(self):
+        # размер ведется при записи, вытеснение выполняется только при превышении
+        with tempfile.TemporaryDirectory() as directory:
+            cache_service = CacheService(directory, max_size_mb=0.2)
+            for index in range(4):
+                key = cache_service.get_key("ticks", index)
+                cache_service.put("ticks", key, np.zeros(10000, dtype=np.int64))
+                self.assertEqual(cache_service.total_size, cache_service.get_total_size())
+                self.assertLessEqual(cache_service.total_size, cache_service.max_size)
+
+            # перезапись существующей записи не увеличивает размер
+            total_size = cache_service.total_size
+            cache_service.put("ticks", cache_service.get_key("ticks", 3), np.zeros(10000, dtype=np.int64))
+            self.assertEqual(cache_service.total_size, total_size)
+
+            cache_service.invalidate()
+            self.assertIsNone(cache_service.total_size)
+
+    def test_run_backtest_job(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "SBER-20220502.csv")
+            create_ticks(20000, seed=2).to_csv(file_path, index=False)
+            cache_path = os.path.join(directory, "cache")
+
+            report = run_backtest_job("SBER", file_path, cache_path)
+            cached_report = run_backtest_job("SBER", file_path, cache_path)
+
+            self.assertNotIn("is_cached", report)
+            self.assertTrue(cached_report["is_cached"])
+            self.assertGreater(len(report["orders"]), 0)
+            self.assertEqual(list(map(order_to_tuple, cached_report["orders"])),
+                             list(map(order_to_tuple, report["orders"])))
+
+            # другие настройки стратегии дают другой ключ
+            cache_service = CacheService(cache_path)
+            self.assertNotEqual(
+                cache_service.get_orders_key("SBER", file_path, StrategySettings()),
+                cache_service.get_orders_key("SBER", file_path, StrategySettings(first_goal=5))
+            )
+            self.assertEqual(len(get_file_hash(file_path)), 64)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import time
+import unittest
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from utils.clock import EventClock, WallClock
+from utils.exchange_util import is_open_exchange
+from utils.instrument_util import get_coverage_file_path_by_instrument, get_file_path_by_instrument
+
+
+class TestClock(unittest.TestCase):
+    def test_wall_clock(self):
+        clock = WallClock()
+
+        self.assertLess(abs(clock.now().timestamp() - time.time()), 1)
+        self.assertLess(abs(clock.now_ns() - time.time_ns()), 10 ** 9)
+
+    def test_event_clock(self):
+        start_time = pd.Timestamp("2022-05-06 07:00:00.123456+00:00").value
+        clock = EventClock(start_time)
+        self.assertEqual(clock.now(), datetime(2022, 5, 6, 7, 0, 0, 123456, tzinfo=timezone.utc))
+
+        clock.advance(start_time + 10 ** 9)
+        self.assertEqual(clock.now_ns(), start_time + 10 ** 9)
+
+        # время не возвращается назад при сделках не по порядку
+        clock.advance(start_time)
+        self.assertEqual(clock.now_ns(), start_time + 10 ** 9)
+
+    def test_is_open_exchange(self):
+        clock = EventClock(pd.Timestamp("2022-05-06 15:59:59+00:00").value)
+        self.assertTrue(is_open_exchange(clock))
+
+        clock.advance(pd.Timestamp("2022-05-06 16:00:00+00:00").value)
+        self.assertFalse(is_open_exchange(clock))
+
+    def test_file_path(self):
+        clock = EventClock(pd.Timestamp("2022-05-06 12:00:00+00:00").value)
+        instrument = {"name": "SBER"}
+
+        self.assertEqual(get_file_path_by_instrument(instrument, clock), "./data/SBER-20220506.csv")
+        self.assertEqual(get_coverage_file_path_by_instrument(instrument, clock),
+                         "./data/SBER-20220506.coverage.json")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,86 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from domains.coverage_index import CoverageIndex
+
+
+def to_ns(time: str) -> int:
+    return pd.Timestamp(time).value
+
+
+class TestCoverageIndex(unittest.TestCase):
+    def test_missing_ranges(self):
+        coverage = CoverageIndex()
+        coverage.add("2022-05-06 07:00:00+00:00", "2022-05-06 09:00:00+00:00")
+        coverage.add("2022-05-06 10:00:00+00:00", "2022-05-06 11:00:00+00:00")
+
+        missing = coverage.get_missing("2022-05-06 00:00:00+00:00", "2022-05-06 12:00:00+00:00")
+        self.assertEqual(missing, [
+            (to_ns("2022-05-06 00:00:00+00:00"), to_ns("2022-05-06 07:00:00+00:00")),
+            (to_ns("2022-05-06 09:00:00+00:00"), to_ns("2022-05-06 10:00:00+00:00")),
+            (to_ns("2022-05-06 11:00:00+00:00"), to_ns("2022-05-06 12:00:00+00:00")),
+        ])
+
+        # пересекающиеся промежутки объединяются
+        coverage.add("2022-05-06 08:30:00+00:00", "2022-05-06 10:30:00+00:00")
+        self.assertEqual(coverage.ranges, [
+            [to_ns("2022-05-06 07:00:00+00:00"), to_ns("2022-05-06 11:00:00+00:00")]
+        ])
+        self.assertEqual(coverage.get_missing("2022-05-06 07:30:00+00:00", "2022-05-06 10:00:00+00:00"), [])
+
+    def test_extend(self):
+        coverage = CoverageIndex()
+        # до начала потока покрытие не продлевается
+        coverage.extend("2022-05-06 06:00:00+00:00")
+        self.assertEqual(coverage.ranges, [])
+
+        coverage.start_live("2022-05-06 07:00:00+00:00")
+        coverage.extend("2022-05-06 07:00:00+00:00")
+        coverage.extend("2022-05-06 07:05:00+00:00")
+        coverage.extend("2022-05-06 07:01:00+00:00")
+
+        self.assertEqual(coverage.ranges, [
+            [to_ns("2022-05-06 07:00:00+00:00"), to_ns("2022-05-06 07:05:00+00:00")]
+        ])
+
+    def test_extend_after_gap(self):
+        # окно истории перед началом потока не загружено: поток не перекрывает его
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "SBER-20220506.coverage.json")
+            coverage = CoverageIndex(file_path)
+            coverage.add("2022-05-06 00:00:00+00:00", "2022-05-06 09:00:00+00:00")
+            coverage.start_live("2022-05-06 10:00:00+00:00")
+            coverage.extend("2022-05-06 10:00:05+00:00")
+            coverage.save()
+
+            gap = [(to_ns("2022-05-06 09:00:00+00:00"), to_ns("2022-05-06 10:00:00+00:00"))]
+            self.assertEqual(coverage.get_missing("2022-05-06 00:00:00+00:00", "2022-05-06 10:00:05+00:00"), gap)
+
+            # после перезапуска сделки, записанные после сохранения, продлевают промежуток потока, а не истории
+            loaded = CoverageIndex(file_path).load()
+            loaded.extend("2022-05-06 10:30:00+00:00")
+            self.assertEqual(loaded.get_missing("2022-05-06 00:00:00+00:00", "2022-05-06 10:30:00+00:00"), gap)
+
+    def test_save_and_load(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_path = os.path.join(directory, "SBER-20220506.coverage.json")
+            coverage = CoverageIndex(file_path)
+            coverage.add("2022-05-06 07:00:00+00:00", "2022-05-06 09:00:00+00:00")
+
+            # сохранение не чаще заданного интервала
+            coverage.save_if_needed("2022-05-06 09:00:00+00:00")
+            coverage.extend("2022-05-06 09:00:01+00:00")
+            coverage.save_if_needed("2022-05-06 09:00:01+00:00")
+
+            loaded = CoverageIndex(file_path).load()
+            self.assertEqual(loaded.ranges, [
+                [to_ns("2022-05-06 07:00:00+00:00"), to_ns("2022-05-06 09:00:00+00:00")]
+            ])
+            self.assertEqual(CoverageIndex(os.path.join(directory, "none.json")).load().ranges, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
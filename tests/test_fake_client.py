@@ -0,0 +1,78 @@
+import asyncio
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.load_harness import run_in_directory
+from benchmarks.synthetic_ticks import create_synthetic_ticks
+from services.fake_client import FakeAsyncClient, create_fake_instruments, get_blocks_start_time
+from utils.clock import EventClock
+from utils.format_util import quotation_to_float
+from utils.instrument_util import request_iterator
+from utils.parse_util import datetime_to_ns
+
+
+async def read_stream(client: FakeAsyncClient, instruments):
+    return [marketdata async for marketdata in client.market_data_stream.market_data_stream(
+        request_iterator(instruments))]
+
+
+class TestFakeClient(unittest.TestCase):
+    def setUp(self):
+        self.blocks = create_synthetic_ticks(500, seed=1, instruments=3)
+        self.instruments = create_fake_instruments(3)
+
+    def test_market_data_stream(self):
+        client = FakeAsyncClient(self.blocks)
+        responses = asyncio.run(read_stream(client, self.instruments[:2]))
+
+        self.assertEqual(len(responses), 1000)
+        self.assertEqual(client.market_data_stream.sent_count, 1000)
+        self.assertEqual({response.trade.figi for response in responses}, {"SYNTHETIC0000", "SYNTHETIC0001"})
+        times = [datetime_to_ns(response.trade.time) for response in responses]
+        self.assertTrue(all(left <= right for left, right in zip(times, times[1:])))
+
+        trades = [response.trade for response in responses if response.trade.figi == "SYNTHETIC0001"]
+        self.assertEqual([quotation_to_float(trade.price) for trade in trades], self.blocks[1].prices.tolist())
+
+    def test_clock(self):
+        clock = EventClock(get_blocks_start_time(self.blocks))
+        self.assertEqual(clock.now_ns(), min(int(block.times[0]) for block in self.blocks))
+
+        asyncio.run(read_stream(FakeAsyncClient(self.blocks, clock=clock), self.instruments))
+        self.assertEqual(clock.now_ns(), max(int(block.times[-1]) for block in self.blocks))
+
+    def test_speed(self):
+        # 50 сделок за ~17 секунд при ускорении в 1000 раз воспроизводятся за ~17 мс
+        blocks = create_synthetic_ticks(50, seed=1, ticks_per_second=3)
+        client = FakeAsyncClient(blocks, speed=1000)
+        asyncio.run(read_stream(client, create_fake_instruments(1)))
+
+        stream = client.market_data_stream
+        expected_seconds = (blocks[0].times[-1] - blocks[0].times[0]) / 10 ** 9 / 1000
+        self.assertGreaterEqual(stream.finished_time - stream.started_time, expected_seconds * 0.9)
+
+    def test_get_last_trades(self):
+        client = FakeAsyncClient(self.blocks)
+        block = self.blocks[2]
+        response = asyncio.run(client.market_data.get_last_trades(
+            figi="SYNTHETIC0002",
+            from_=pd.Timestamp(int(block.times[100]), tz="UTC").to_pydatetime(warn=False),
+            to=pd.Timestamp(int(block.times[199]), tz="UTC").to_pydatetime(warn=False)
+        ))
+        self.assertGreaterEqual(len(response.trades), 99)
+        self.assertEqual(len(asyncio.run(client.market_data.get_last_trades("unknown", None, None)).trades), 0)
+
+    def test_load_test(self):
+        report = run_in_directory(self.instruments, self.blocks, speed=0)
+
+        self.assertEqual(report["ticks"], 1500)
+        self.assertGreater(report["ticks_per_second"], 0)
+        for stats in report["workers"].values():
+            self.assertEqual(stats["latency"]["total"]["count"], 500)
+            self.assertTrue(np.isfinite(stats["latency"]["total"]["p99_ms"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
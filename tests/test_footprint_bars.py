@@ -0,0 +1,64 @@
+import unittest
+
+import numpy as np
+
+from domains.footprint_bars import FootprintBars
+from domains.signal_candles import SignalCandles
+from domains.tick import TickBlock
+from domains.volume_profile import VolumeProfile
+from services.backtest_service import compare_bar_backtest, calculate_divergence
+from tests.test_sweep_service import create_block
+
+
+class TestFootprintBars(unittest.TestCase):
+    def test_from_ticks(self):
+        minute = 60 * 10 ** 9
+        block = TickBlock(
+            figi="figi",
+            directions=np.array([1, 2, 1, 1, 2], dtype=np.int64),
+            prices=np.array([10.0, 9.0, 11.0, 10.5, 12.0], dtype=np.float64),
+            quantities=np.array([1, 2, 3, 4, 5], dtype=np.int64),
+            times=np.array([0, 1, 2, minute + 1, minute + 2], dtype=np.int64)
+        )
+        bars = FootprintBars.from_ticks(block, "1min")
+
+        self.assertEqual(len(bars), 2)
+        first = bars.bars.iloc[0]
+        self.assertEqual((first["open"], first["high"], first["low"], first["close"]), (10.0, 11.0, 9.0, 11.0))
+        self.assertEqual((first["volume"], first["buy_volume"], first["sell_volume"]), (6, 4, 2))
+        self.assertEqual(len(bars.levels), 5)
+
+    def test_to_tick_block(self):
+        block = create_block(20000, seed=4)
+        bar_block = FootprintBars.from_ticks(block, "1min").to_tick_block()
+
+        self.assertLess(bar_block.size, block.size)
+        self.assertEqual(int(bar_block.quantities.sum()), int(block.quantities.sum()))
+        self.assertTrue(np.all(np.diff(bar_block.times) > 0))
+
+        # профиль и сигнальные свечи по барам совпадают с рассчитанными по сделкам
+        profile = VolumeProfile.from_ticks("1h", block.prices, block.quantities, block.times)
+        bar_profile = VolumeProfile.from_ticks("1h", bar_block.prices, bar_block.quantities, bar_block.times)
+        self.assertTrue(profile.to_df().equals(bar_profile.to_df()))
+
+        candles = SignalCandles.from_ticks("5min", block.prices, block.quantities, block.times)
+        bar_candles = SignalCandles.from_ticks("5min", bar_block.prices, bar_block.quantities, bar_block.times)
+        self.assertEqual(list(candles.closed_candles), list(bar_candles.closed_candles))
+
+    def test_compare_bar_backtest(self):
+        report = compare_bar_backtest("SBER", create_block(20000, seed=2))
+
+        self.assertEqual(report["ticks"], 20000)
+        self.assertLess(report["bar_ticks"], report["ticks"])
+        self.assertLessEqual(report["matched_orders"], min(report["exact_orders"], report["bar_orders"]))
+        self.assertAlmostEqual(report["points_divergence"],
+                               report["bar_total_points"] - report["exact_total_points"])
+
+    def test_divergence_without_orders(self):
+        report = calculate_divergence([], [])
+        self.assertEqual(report["matched_orders"], 0)
+        self.assertEqual(report["points_divergence"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
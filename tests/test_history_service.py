@@ -0,0 +1,155 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+from tinkoff.invest import Trade, Quotation, TradeDirection
+
+from domains.coverage_index import CoverageIndex
+from services.history_service import HistoryService
+
+CURRENT_DATE = datetime(2022, 5, 6, 12, 0, tzinfo=timezone.utc)
+
+
+class FakeLastTradesResponse:
+    def __init__(self, trades):
+        self.trades = trades
+
+
+# заглушка market_data из AsyncClient: сделки доступны за последние hours часов
+class FakeMarketData:
+    def __init__(self, trades_by_figi, hours):
+        self.trades_by_figi = trades_by_figi
+        self.min_time = CURRENT_DATE - timedelta(hours=hours)
+        self.calls = 0
+        self.active_calls = 0
+        self.max_active_calls = 0
+
+    async def get_last_trades(self, figi, from_, to):
+        self.calls += 1
+        self.active_calls += 1
+        self.max_active_calls = max(self.max_active_calls, self.active_calls)
+        await asyncio.sleep(0.01)
+        self.active_calls -= 1
+
+        trades = [
+            trade for trade in self.trades_by_figi[figi]
+            if from_ <= trade.time < to and trade.time >= self.min_time
+        ]
+        return FakeLastTradesResponse(trades)
+
+
+# ошибки api: окна с концом в failed_to не загружаются, каждое окно первые failures_per_window раз падает
+class FlakyMarketData(FakeMarketData):
+    def __init__(self, trades_by_figi, hours, failures_per_window=0, failed_to=()):
+        super().__init__(trades_by_figi, hours)
+        self.failures_per_window = failures_per_window
+        self.failed_to = set(failed_to)
+        self.failures = {}
+
+    async def get_last_trades(self, figi, from_, to):
+        key = (figi, to)
+        if to in self.failed_to or self.failures.get(key, 0) < self.failures_per_window:
+            self.failures[key] = self.failures.get(key, 0) + 1
+            raise ConnectionError("RESOURCE_EXHAUSTED")
+        return await super().get_last_trades(figi, from_, to)
+
+
+class FakeAsyncClient:
+    def __init__(self, market_data):
+        self.market_data = market_data
+
+
+def create_trades(figi, count):
+    return [
+        Trade(figi=figi, direction=TradeDirection.TRADE_DIRECTION_BUY, price=Quotation(units=100 + i, nano=0),
+              quantity=1, time=CURRENT_DATE - timedelta(minutes=7 * i + 1))
+        for i in range(count)
+    ]
+
+
+class TestHistoryService(unittest.TestCase):
+    def setUp(self):
+        self.instruments = [
+            {"name": "SBER", "figi": "BBG004730N88"},
+            {"name": "GAZP", "figi": "BBG004730RP0"},
+        ]
+        self.market_data = FakeMarketData({
+            "BBG004730N88": create_trades("BBG004730N88", 60),
+            "BBG004730RP0": create_trades("BBG004730RP0", 30),
+        }, hours=5)
+
+    def test_load(self):
+        service = HistoryService(FakeAsyncClient(self.market_data), concurrency=3, requests_per_second=0)
+        history = asyncio.run(service.load(self.instruments, CURRENT_DATE))
+
+        sber_df = history["BBG004730N88"]
+        # за 5 часов доступно 43 сделки из 60
+        self.assertEqual(len(sber_df), 43)
+        self.assertTrue(sber_df["time"].is_monotonic_increasing)
+        self.assertEqual(sber_df["price"].iloc[-1], 100)
+
+        self.assertEqual(len(history["BBG004730RP0"]), 30)
+        self.assertLessEqual(self.market_data.max_active_calls, 3)
+
+    def test_retry(self):
+        market_data = FlakyMarketData(self.market_data.trades_by_figi, hours=5, failures_per_window=2)
+        service = HistoryService(FakeAsyncClient(market_data), concurrency=3, requests_per_second=0,
+                                 retry_count=2, retry_delay_seconds=0)
+        history = asyncio.run(service.load(self.instruments, CURRENT_DATE))
+
+        self.assertEqual(len(history["BBG004730N88"]), 43)
+        self.assertEqual(len(history["BBG004730RP0"]), 30)
+
+    def test_failed_window(self):
+        # окно второго часа не загружается, более старые окна той же и следующих пачек сохраняются
+        failed_to = CURRENT_DATE - timedelta(hours=1)
+        market_data = FlakyMarketData(self.market_data.trades_by_figi, hours=5, failed_to=[failed_to])
+        service = HistoryService(FakeAsyncClient(market_data), concurrency=3, requests_per_second=0,
+                                 retry_count=1, retry_delay_seconds=0)
+        history_df = asyncio.run(service.get_history_trades(self.instruments[0], CURRENT_DATE))
+
+        self.assertEqual(len(history_df), 43 - 9)
+        self.assertEqual(history_df["price"].iloc[0], 100 + 42)
+        windows = service.loaded_windows["BBG004730N88"]
+        self.assertNotIn((failed_to - timedelta(hours=1), failed_to), windows)
+        self.assertIn((CURRENT_DATE - timedelta(hours=3), CURRENT_DATE - timedelta(hours=2)), windows)
+
+    def test_failed_newest_window(self):
+        # последнее окно не загружено, затем записаны сделки потока: при следующей синхронизации окно запрашивается
+        instrument = self.instruments[0]
+        day_start = CURRENT_DATE - timedelta(hours=3)
+        market_data = FlakyMarketData(self.market_data.trades_by_figi, hours=5, failed_to=[CURRENT_DATE])
+        service = HistoryService(FakeAsyncClient(market_data), concurrency=3, requests_per_second=0,
+                                 retry_count=1, retry_delay_seconds=0)
+        asyncio.run(service.load_ranges([instrument], {instrument["figi"]: [(day_start, CURRENT_DATE)]}))
+
+        coverage = CoverageIndex()
+        for interval_from, interval_to in service.loaded_windows[instrument["figi"]]:
+            coverage.add(interval_from, interval_to)
+        coverage.start_live(CURRENT_DATE - timedelta(minutes=5))
+        coverage.extend(CURRENT_DATE + timedelta(minutes=10))
+
+        missing = coverage.get_missing(day_start, CURRENT_DATE + timedelta(minutes=10))
+        self.assertEqual([(pd.Timestamp(start, tz="UTC"), pd.Timestamp(end, tz="UTC")) for start, end in missing],
+                         [(CURRENT_DATE - timedelta(hours=1), CURRENT_DATE - timedelta(minutes=5))])
+
+    def test_unavailable(self):
+        market_data = FlakyMarketData(self.market_data.trades_by_figi, hours=5, failures_per_window=10)
+        service = HistoryService(FakeAsyncClient(market_data), concurrency=2, requests_per_second=0,
+                                 retry_count=1, retry_delay_seconds=0)
+        history_df = asyncio.run(service.get_history_trades(self.instruments[0], CURRENT_DATE))
+
+        self.assertTrue(history_df.empty)
+        self.assertEqual(market_data.calls, 0)
+        self.assertEqual(len(market_data.failures), 2)
+
+    def test_empty_history(self):
+        service = HistoryService(FakeAsyncClient(FakeMarketData({"BBG004730N88": []}, hours=5)),
+                                 requests_per_second=0)
+        history_df = asyncio.run(service.get_history_trades(self.instruments[0], CURRENT_DATE))
+        self.assertTrue(history_df.empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,78 @@
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from domains.strategy_settings import StrategySettings
+from services.backtest_service import BacktestService
+from services.history_source import HistorySource
+from services.tick_storage import TickStorage, read_csv_ticks
+from strategies.profile_touch_strategy import ProfileTouchStrategy
+from tests.test_analyze_batch import create_ticks
+from tests.test_backtest_service import order_to_tuple
+
+
+def write_day(directory: str, date: str, count: int, seed: int) -> str:
+    df = create_ticks(count, seed=seed)
+    # сделки переносятся на указанный день с сохранением времени внутри дня
+    df["time"] = pd.Timestamp(date, tz="UTC") + (df["time"] - df["time"].dt.floor("1d"))
+    file_path = os.path.join(directory, f"SBER-{date}.csv")
+    df.to_csv(file_path, index=False)
+    return file_path
+
+
+class TestHistorySource(unittest.TestCase):
+    def test_get_dates(self):
+        with tempfile.TemporaryDirectory() as directory:
+            for date, seed in [("20220505", 2), ("20220506", 3), ("20220511", 4)]:
+                write_day(directory, date, 100, seed)
+            pd.DataFrame().to_csv(os.path.join(directory, "GAZP-20220506.csv"))
+
+            source = HistorySource("SBER", "2022-05-06", "20220511", root=directory)
+            self.assertEqual([date for date, _ in source.get_dates()], ["20220506", "20220511"])
+
+            storage = TickStorage(os.path.join(directory, "ticks"))
+            storage.convert_csv(os.path.join(directory, "SBER-20220505.csv"))
+            os.remove(os.path.join(directory, "SBER-20220505.csv"))
+            source = HistorySource("SBER", "20220501", "20220531", root=directory, storage=storage, block_size=30)
+            blocks = list(source)
+            self.assertEqual([date for date, _ in source.get_dates()], ["20220505", "20220506", "20220511"])
+            self.assertEqual(sum(block.size for block in blocks), 300)
+            self.assertTrue(all(block.size <= 30 for block in blocks))
+
+    def test_run_stream(self):
+        with tempfile.TemporaryDirectory() as directory:
+            first_file_path = write_day(directory, "20220505", 20000, 2)
+            write_day(directory, "20220506", 20000, 3)
+
+            # первый день потока анализируется так же, как отдельный файл
+            expected_orders = BacktestService("SBER").run(read_csv_ticks(first_file_path))
+            backtest_service = BacktestService("SBER")
+            orders = backtest_service.run_stream(HistorySource("SBER", "20220505", "20220506", root=directory,
+                                                               block_size=7000))
+            self.assertGreater(len(orders), len(expected_orders))
+            self.assertEqual(list(map(order_to_tuple, orders[:len(expected_orders)])),
+                             list(map(order_to_tuple, expected_orders)))
+
+            # сделки и кластера хранятся только в пределах глубины профиля
+            strategy = backtest_service.strategy
+            first_time = pd.Timestamp(int(strategy.ticks.times[0]), tz="UTC")
+            last_time = pd.Timestamp(int(strategy.ticks.times[-1]), tz="UTC")
+            self.assertLessEqual(last_time - first_time, pd.Timedelta("1d") + pd.Timedelta("1h"))
+            self.assertGreaterEqual(min(strategy.profile.clusters), strategy.ticks.times[0] - 3600 * 10 ** 9)
+
+            last_hour = pd.Timestamp(strategy.fix_date[strategy.settings.profile_period], tz="UTC")
+            self.assertGreaterEqual(first_time, last_hour - pd.Timedelta("1d"))
+            self.assertGreater(last_hour, pd.Timestamp("2022-05-06", tz="UTC"))
+
+            # без ограничения глубины сохраняются сделки обоих дней
+            settings = StrategySettings(profile_lookback=None)
+            backtest_service = BacktestService("SBER", ProfileTouchStrategy("SBER", settings))
+            backtest_service.run_stream(HistorySource("SBER", "20220505", "20220506", root=directory))
+            first_time = pd.Timestamp(int(backtest_service.strategy.ticks.times[0]), tz="UTC")
+            self.assertLess(first_time, pd.Timestamp("2022-05-06", tz="UTC"))
+
+
+if __name__ == "__main__":
+    unittest.main()
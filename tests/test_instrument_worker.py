@@ -0,0 +1,116 @@
+import asyncio
+import time
+import unittest
+
+from services.instrument_worker import InstrumentWorker, LatencyStats, OVERFLOW_POLICY_DROP_NEWEST, \
+    OVERFLOW_POLICY_DROP_OLDEST
+
+
+class TestInstrumentWorker(unittest.TestCase):
+    def test_process_in_order(self):
+        processed = []
+
+        def handler(items, stats):
+            processed.extend(items)
+
+        async def run():
+            worker = InstrumentWorker("SBER", handler, queue_size=2)
+            for item in range(10):
+                await worker.put(item)
+            await worker.stop()
+            return worker.get_stats()
+
+        stats = asyncio.run(run())
+        self.assertEqual(processed, list(range(10)))
+        self.assertEqual(stats["dropped"], 0)
+        self.assertLessEqual(stats["max_depth"], 2)
+        self.assertEqual(stats["latency"]["handler"]["count"], 10)
+
+    def test_batches(self):
+        batches = []
+
+        async def run():
+            worker = InstrumentWorker("SBER", lambda items, stats: batches.append(items), batch_size=4)
+            # накопившиеся в очереди сделки обрабатываются пачками не больше batch_size
+            for item in range(10):
+                await worker.put(item)
+            await worker.stop()
+
+        asyncio.run(run())
+        self.assertEqual(batches, [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]])
+
+    def test_batch_latency(self):
+        batches = []
+
+        async def run():
+            worker = InstrumentWorker("SBER", lambda items, stats: batches.append(items), batch_size=100,
+                                      batch_latency_ms=200)
+            await worker.put(0)
+            await asyncio.sleep(0.05)
+            # сделка поступила раньше истечения задержки и попадает в ту же пачку
+            await worker.put(1)
+            await asyncio.sleep(0.3)
+            await worker.put(2)
+            await worker.stop()
+
+        asyncio.run(run())
+        self.assertEqual(batches, [[0, 1], [2]])
+
+    def test_drop_policies(self):
+        for policy, expected in [(OVERFLOW_POLICY_DROP_NEWEST, [0, 1]), (OVERFLOW_POLICY_DROP_OLDEST, [3, 4])]:
+            processed = []
+
+            async def run():
+                worker = InstrumentWorker("SBER", lambda items, stats: processed.extend(items), queue_size=2,
+                                          overflow_policy=policy)
+                # сделки ставятся в очередь без передачи управления обработчику
+                for item in range(5):
+                    await worker.put(item)
+                await worker.stop()
+                return worker.dropped
+
+            self.assertEqual(asyncio.run(run()), 3)
+            self.assertEqual(processed, expected)
+
+    def test_slow_instrument_does_not_block_others(self):
+        finished = {}
+
+        def slow_handler(items, stats):
+            time.sleep(0.3)
+            finished["SBER"] = time.perf_counter()
+
+        def fast_handler(items, stats):
+            finished["GAZP"] = time.perf_counter()
+
+        async def run():
+            slow_worker = InstrumentWorker("SBER", slow_handler)
+            fast_worker = InstrumentWorker("GAZP", fast_handler)
+            await slow_worker.put(0)
+            await fast_worker.put(0)
+            await slow_worker.stop()
+            await fast_worker.stop()
+
+        asyncio.run(run())
+        self.assertLess(finished["GAZP"], finished["SBER"])
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            InstrumentWorker("SBER", lambda items, stats: None, overflow_policy="unknown")
+
+
+class TestLatencyStats(unittest.TestCase):
+    def test_get(self):
+        stats = LatencyStats(size=100)
+        for index in range(1, 101):
+            stats.add("strategy", index / 1000)
+
+        result = stats.get()["strategy"]
+        self.assertEqual(result["count"], 100)
+        self.assertAlmostEqual(result["mean_ms"], 50.5)
+        self.assertAlmostEqual(result["p50_ms"], 51)
+        self.assertAlmostEqual(result["p99_ms"], 100)
+        self.assertAlmostEqual(result["max_ms"], 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from tinkoff.invest import MarketDataResponse, Ping, SubscribeTradesResponse, SubscriptionStatus, TradeSubscription
+
+from benchmarks.load_harness import run_in_directory
+from benchmarks.synthetic_ticks import create_synthetic_ticks
+from services.fake_client import create_fake_instruments, create_trade
+from services.market_data_log import MarketDataRecorder, ReplayAsyncClient, RECORD_HEADER, TRADE_RECORD, \
+    get_market_data_log_instruments, read_market_data_log
+from utils.instrument_util import request_iterator
+
+
+async def read_stream(client: ReplayAsyncClient, instruments):
+    return [marketdata async for marketdata in client.market_data_stream.market_data_stream(
+        request_iterator(instruments))]
+
+
+class TestMarketDataLog(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "marketdata.bin")
+        self.start_time = 1651820400000000000
+
+        self.responses = [
+            MarketDataResponse(trade=create_trade("SYNTHETIC0000", 1, 100.5, 3, self.start_time)),
+            MarketDataResponse(ping=Ping()),
+            MarketDataResponse(trade=create_trade("SYNTHETIC0001", 2, 50.25, 1, self.start_time + 10 ** 6)),
+        ]
+        recorder = MarketDataRecorder(self.file_path)
+        for index, response in enumerate(self.responses):
+            recorder.write(response, self.start_time + index * 10 ** 7)
+        recorder.close()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_read(self):
+        records = list(read_market_data_log(self.file_path))
+
+        self.assertEqual([receive_time for receive_time, _ in records],
+                         [self.start_time, self.start_time + 10 ** 7, self.start_time + 2 * 10 ** 7])
+        self.assertEqual([marketdata for _, marketdata in records], self.responses)
+
+    def test_compact(self):
+        # сделка уже встречавшегося инструмента - только заголовок и запись фиксированного размера
+        size = os.path.getsize(self.file_path)
+        recorder = MarketDataRecorder(self.file_path)
+        recorder.write(self.responses[0], self.start_time)
+        recorder.close()
+
+        self.assertEqual(os.path.getsize(self.file_path) - size, RECORD_HEADER.size + TRADE_RECORD.size)
+
+    def test_other_message(self):
+        recorder = MarketDataRecorder(self.file_path)
+        # ответ на подписку воспроизводится полностью
+        response = MarketDataResponse(subscribe_trades_response=SubscribeTradesResponse(
+            tracking_id="tracking",
+            trade_subscriptions=[TradeSubscription(figi="SYNTHETIC0000",
+                                                   subscription_status=SubscriptionStatus.SUBSCRIPTION_STATUS_SUCCESS)]
+        ))
+        recorder.write(response, self.start_time)
+        recorder.close()
+
+        _, marketdata = list(read_market_data_log(self.file_path))[-1]
+        self.assertEqual(marketdata.subscribe_trades_response, response.subscribe_trades_response)
+
+    def test_append(self):
+        # номера figi продолжаются из существующего файла
+        recorder = MarketDataRecorder(self.file_path)
+        recorder.write(self.responses[2])
+        recorder.write(MarketDataResponse(trade=create_trade("SYNTHETIC0002", 1, 10.0, 5, self.start_time)))
+        recorder.close()
+
+        records = list(read_market_data_log(self.file_path))
+        self.assertEqual(len(records), 5)
+        self.assertEqual([marketdata.trade.figi for _, marketdata in records[3:]], ["SYNTHETIC0001", "SYNTHETIC0002"])
+
+    def test_truncated(self):
+        with open(self.file_path, "ab") as file:
+            file.write(RECORD_HEADER.pack(100, self.start_time))
+            file.write(b"\x80")
+
+        self.assertEqual(len(list(read_market_data_log(self.file_path))), 3)
+
+        # дозапись начинается после последней целой записи
+        recorder = MarketDataRecorder(self.file_path)
+        recorder.write(self.responses[0], self.start_time)
+        recorder.close()
+        self.assertEqual(len(list(read_market_data_log(self.file_path))), 4)
+
+    def test_not_log(self):
+        with open(self.file_path, "wb") as file:
+            file.write(b"time,price\n")
+
+        with self.assertRaises(ValueError):
+            list(read_market_data_log(self.file_path))
+
+    def test_replay(self):
+        client = ReplayAsyncClient(self.file_path, speed=0)
+        responses = asyncio.run(read_stream(client, create_fake_instruments(1)))
+
+        self.assertEqual(responses, self.responses)
+        self.assertEqual(client.market_data_stream.sent_count, 3)
+
+        trades = asyncio.run(client.market_data.get_last_trades("SYNTHETIC0001", self.responses[0].trade.time,
+                                                                self.responses[2].trade.time)).trades
+        self.assertEqual(trades, [self.responses[2].trade])
+
+    def test_replay_speed(self):
+        # 20 мс записи при ускорении в 2 раза воспроизводятся не быстрее 10 мс
+        client = ReplayAsyncClient(self.file_path, speed=2)
+        asyncio.run(read_stream(client, create_fake_instruments(1)))
+
+        stream = client.market_data_stream
+        self.assertGreaterEqual(stream.finished_time - stream.started_time, 0.009)
+
+    def test_instruments(self):
+        instruments = get_market_data_log_instruments(
+            self.file_path, [{"name": "SBER", "figi": "SYNTHETIC0001", "future": "FUTSBRF06220"}])
+
+        self.assertEqual([instrument["name"] for instrument in instruments], ["SYNTHETIC0000", "SBER"])
+
+    def test_record_and_replay_robot(self):
+        # сообщения, полученные роботом, воспроизводятся через робота с тем же результатом
+        blocks = create_synthetic_ticks(300, seed=2, instruments=2)
+        instruments = create_fake_instruments(2)
+        file_path = os.path.join(self.directory.name, "robot.bin")
+
+        report = run_in_directory(instruments, blocks, speed=0, record_path=file_path)
+        replay_report = run_in_directory(instruments, [], speed=0, replay_path=file_path)
+
+        self.assertEqual(len(list(read_market_data_log(file_path))), 600)
+        self.assertEqual(report["ticks"], replay_report["ticks"])
+        for name, stats in replay_report["workers"].items():
+            self.assertEqual(stats["latency"]["total"]["count"], 300)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import csv
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+from tinkoff.invest import OrderDirection
+
+from domains.order import Order
+from services.order_service import OrderService
+from services.order_storage import OrderStorage
+
+BUY = OrderDirection.ORDER_DIRECTION_BUY.value
+SELL = OrderDirection.ORDER_DIRECTION_SELL.value
+
+
+def create_order(index: int, instrument: str = "SBER", direction: int = BUY) -> Order:
+    stop, take = (99.0, 103.0) if direction == BUY else (101.0, 97.0)
+    return Order(id=str(index), group_id=str(index // 2), instrument=instrument, open=100.0, stop=stop, take=take,
+                 quantity=1, direction=direction,
+                 time=datetime(2022, 5, 6, 8, tzinfo=timezone.utc) + timedelta(minutes=index))
+
+
+class TestOrderStorage(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "orders.db")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_insert_and_close(self):
+        storage = OrderStorage(self.file_path)
+        orders = [create_order(index) for index in range(3)] + [create_order(3, "GAZP", SELL)]
+        for order in orders:
+            storage.insert(order)
+
+        orders[1].status = "close"
+        orders[1].close = 103.5
+        orders[1].result = 3.5
+        orders[1].is_win = True
+        storage.close_order(orders[1])
+        storage.close()
+
+        storage = OrderStorage(self.file_path)
+        active_orders = storage.load_active_orders()
+        self.assertEqual([order.id for order in active_orders], ["0", "2", "3"])
+        self.assertEqual(active_orders[0].time, pd.Timestamp("2022-05-06 08:00:00+00:00"))
+        self.assertEqual(active_orders[2].direction, SELL)
+
+        closed_order = storage.load_orders(status="close")[0]
+        self.assertEqual((closed_order.close, closed_order.result, closed_order.is_win), (103.5, 3.5, True))
+        self.assertEqual([order.id for order in storage.load_orders(instrument="GAZP")], ["3"])
+        storage.close()
+
+    def test_indexes(self):
+        storage = OrderStorage(self.file_path)
+        plan = storage.connection.execute(
+            "explain query plan select * from orders where status = 'active'").fetchall()
+        storage.close()
+
+        self.assertIn("orders_status", str(plan))
+
+    def test_csv_migration(self):
+        csv_file_path = os.path.join(self.directory.name, "orders.csv")
+        orders = [create_order(index) for index in range(2)]
+        orders[0].status = "close"
+        orders[0].is_win = False
+        with open(csv_file_path, "w", newline='') as file:
+            writer = csv.writer(file)
+            writer.writerow(dict(orders[0]).keys())
+            for order in orders:
+                writer.writerow(dict(order).values())
+
+        storage = OrderStorage(self.file_path, csv_file_path)
+        self.assertEqual(len(storage.load_orders()), 2)
+        self.assertEqual([order.id for order in storage.load_active_orders()], ["1"])
+        self.assertFalse(storage.load_orders(status="close")[0].is_win)
+        storage.close()
+
+        # перенос выполняется только при создании базы
+        storage = OrderStorage(self.file_path, csv_file_path)
+        self.assertEqual(len(storage.load_orders()), 2)
+        storage.close()
+
+    def test_checkpoint_thread(self):
+        storage = OrderStorage(self.file_path, checkpoint_interval_seconds=0.01)
+        storage.start()
+        for index in range(100):
+            storage.insert(create_order(index))
+        storage.close()
+
+        self.assertFalse(storage.is_alive())
+        self.assertEqual(os.path.getsize(self.file_path + "-wal") if os.path.exists(self.file_path + "-wal") else 0,
+                         0)
+
+    def test_order_service(self):
+        order_service = OrderService(file_path=self.file_path, can_reverse_order=True)
+        order_service.create_order(create_order(0))
+        order_service.create_order(create_order(1, direction=SELL))
+        order_service.processed_orders("SBER", 100.5, datetime(2022, 5, 6, 9, tzinfo=timezone.utc))
+        order_service.close_storage()
+
+        # buy закрыт переворотом, sell остается активным после перезапуска
+        order_service = OrderService(file_path=self.file_path)
+        self.assertEqual([order.id for order in order_service.orders], ["1"])
+        self.assertEqual([order.id for order in order_service.get_active_orders()], ["1"])
+        order_service.close_storage()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+from datetime import datetime, timezone
+
+import numpy as np
+from tinkoff.invest import OrderDirection
+
+from domains.order import Order
+from domains.order_trigger_book import MIN_REBUILD_ENTRIES, OrderTriggerBook
+from services.order_service import OrderService
+
+BUY = OrderDirection.ORDER_DIRECTION_BUY.value
+SELL = OrderDirection.ORDER_DIRECTION_SELL.value
+
+
+def create_order(index: int, instrument: str, direction: int, stop: float, take: float) -> Order:
+    return Order(id=str(index), group_id=str(index), instrument=instrument, open=(stop + take) / 2, stop=stop,
+                 take=take, quantity=1, direction=direction, time=datetime(2022, 5, 6, 8, tzinfo=timezone.utc))
+
+
+# условия закрытия из прежнего перебора всех сделок
+def is_triggered(order: Order, price: float) -> bool:
+    if order.direction == BUY:
+        return price < order.stop or price > order.take
+    return price > order.stop or price < order.take
+
+
+class TestOrderTriggerBook(unittest.TestCase):
+    def test_pop_triggered(self):
+        book = OrderTriggerBook()
+        long_order = create_order(0, "SBER", BUY, stop=99, take=103)
+        short_order = create_order(1, "SBER", SELL, stop=101, take=97)
+        other_order = create_order(2, "GAZP", BUY, stop=99, take=103)
+        for order in [long_order, short_order, other_order]:
+            book.add(order)
+
+        self.assertEqual(book.pop_triggered("SBER", 100), [])
+        self.assertEqual(book.pop_triggered("SBER", 101), [])
+        self.assertEqual(book.pop_triggered("SBER", 101.5), [short_order])
+        self.assertEqual(book.pop_triggered("SBER", 101.5), [])
+        self.assertEqual(book.pop_triggered("SBER", 98), [long_order])
+        self.assertEqual(book.get_active_orders(), [other_order])
+        self.assertEqual(book.get_active_orders("SBER"), [])
+
+    def test_same_as_scan(self):
+        rng = np.random.default_rng(0)
+        book = OrderTriggerBook()
+        active_orders = []
+        for index in range(3000):
+            if rng.random() < 0.3:
+                price = 100 + rng.normal(0, 2)
+                direction = BUY if rng.random() < 0.5 else SELL
+                distance = rng.uniform(0.1, 3)
+                if direction == BUY:
+                    order = create_order(index, "SBER", direction, price - distance, price + 3 * distance)
+                else:
+                    order = create_order(index, "SBER", direction, price + distance, price - 3 * distance)
+                book.add(order)
+                active_orders.append(order)
+            if rng.random() < 0.05 and len(active_orders) > 0:
+                # закрытие по другой причине, например переворот позиции
+                order = active_orders.pop(int(rng.integers(len(active_orders))))
+                book.remove(order)
+
+            price = 100 + rng.normal(0, 2)
+            expected = [order for order in active_orders if is_triggered(order, price)]
+            active_orders = [order for order in active_orders if not is_triggered(order, price)]
+            self.assertEqual(book.pop_triggered("SBER", price), expected)
+            self.assertEqual(book.get_active_orders("SBER"), active_orders)
+
+    def test_stale_entries(self):
+        # записи закрытых сделок не накапливаются
+        book = OrderTriggerBook()
+        for index in range(10000):
+            order = create_order(index, "SBER", BUY, stop=50, take=200)
+            book.add(order)
+            book.remove(order)
+
+        self.assertEqual(len(book), 0)
+        self.assertLessEqual(book.triggers["SBER"].entries_count, MIN_REBUILD_ENTRIES)
+
+    def test_order_service(self):
+        order_service = OrderService(file_path=None)
+        order_service.add_order(create_order(0, "SBER", BUY, stop=90, take=110))
+        closed_order = create_order(1, "SBER", BUY, stop=90, take=110)
+        closed_order.status = "close"
+        order_service.add_order(closed_order)
+
+        self.assertEqual(len(order_service.get_active_orders()), 1)
+        order_service.processed_orders("SBER", 111, datetime(2022, 5, 6, 8, tzinfo=timezone.utc))
+        self.assertEqual(order_service.get_active_orders(), [])
+        self.assertEqual(order_service.orders[0].status, "close")
+        self.assertEqual(order_service.orders[0].close, 111)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,15 +1,11 @@
-import csv
 import datetime
 import logging
 
 import pandas as pd
 
-from services.order_service import OrderService
-from strategies.profile_touch_strategy import ProfileTouchStrategy
+from services.backtest_service import BacktestService, run_backtests, write_backtest_statistics
 from utils.logger import init_logging
-from utils.parse_util import parse_date
 from utils.format_util import fixed_float
-from utils.strategy_util import apply_frame_type
 
 pd.options.display.max_columns = None
 pd.options.display.max_rows = None
@@ -24,52 +20,20 @@ class TestProfileTouchStrategy:
         self.instrument_name = instrument_name
         self.file_path = file_path
 
-        self.df = pd.DataFrame(columns=["figi", "direction", "price", "quantity", "time"])
-        self.df = apply_frame_type(self.df)
-
-        self.profile_touch_strategy = ProfileTouchStrategy(instrument_name)
-        self.profile_touch_strategy.start()
-
-        self.order_service = OrderService()
-        self.order_service.start()
+        self.backtest_service = BacktestService(instrument_name)
 
     def run(self):
         test_start_time = datetime.datetime.now()
-        logger.info("анализ истории: %s", self.file_path)
-
-        with open(self.file_path, newline='') as file:
-            reader = csv.DictReader(file, delimiter=",")
-            for row in reader:
-                figi = row["figi"]
-                price = float(row["price"])
-                time = parse_date(row["time"])
-
-                processed_trade_df = pd.DataFrame.from_records([
-                    {
-                        "figi": figi,
-                        "direction": row["direction"],
-                        "price": price,
-                        "quantity": row["quantity"],
-                        "time": pd.to_datetime(str(time), utc=True),
-                    }
-                ])
-                self.order_service.processed_orders(self.instrument_name, price, time)
-
-                processed_trade_df = apply_frame_type(processed_trade_df)
-                orders = self.profile_touch_strategy.analyze(processed_trade_df)
-                if orders is not None:
-                    for order in orders:
-                        self.order_service.create_order(order)
-
-        # после завершения анализа перестраиваю график, т.к. закрытие торгов не совпадает целому часу
-        # например 15:59:59.230333+00:00
-        self.profile_touch_strategy.calculate_clusters()
-        self.order_service.write_statistics()
+
+        # сделки дня загружаются одним чтением и анализируются одной пачкой
+        self.backtest_service.run_file(self.file_path)
+        self.backtest_service.finish()
 
         test_end_time = datetime.datetime.now()
-        total_test_time = (test_end_time - test_start_time).total_seconds() / 60
+        total_test_time = (test_end_time - test_start_time).total_seconds()
         logger.info("анализ завершен")
-        logger.info("время тестирования: %s мин.", fixed_float(total_test_time))
+        logger.info("время тестирования: %s сек.", fixed_float(total_test_time))
+        logger.info("скорость анализа: %s сделок/сек.", fixed_float(self.backtest_service.get_ticks_per_second()))
 
 
 if __name__ == "__main__":
@@ -97,7 +61,20 @@ if __name__ == "__main__":
                                "./../data/GAZP-20220518.csv", "./../data/GAZP-20220519.csv",
                                "./../data/GAZP-20220520.csv", ]}
 
-    for history in [usd_histories, sber_histories, gaz_histories]:
-        for file_path in history["files"]:
-            tester = TestProfileTouchStrategy(history["name"], file_path)
-            tester.run()
+    # файлы независимы, поэтому анализируются параллельно в отдельных процессах
+    # статистика выводится в порядке файлов, независимо от порядка завершения
+    # результаты неизмененных файлов при неизмененном коде и настройках берутся из кэша
+    jobs = [(history["name"], file_path)
+            for history in [usd_histories, sber_histories, gaz_histories]
+            for file_path in history["files"]]
+
+    test_start_time = datetime.datetime.now()
+    total_ticks = 0
+    for report in run_backtests(jobs, cache_path="./../data/cache"):
+        logger.info("анализ истории: %s", report["file_path"])
+        write_backtest_statistics(report)
+        total_ticks += report.get("ticks", 0)
+
+    total_test_time = (datetime.datetime.now() - test_start_time).total_seconds()
+    logger.info("время тестирования: %s сек.", fixed_float(total_test_time))
+    logger.info("скорость анализа: %s сделок/сек.", fixed_float(total_ticks / total_test_time))
@@ -0,0 +1,57 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from domains.signal_candles import SignalCandles
+from domains.tick_buffer import TickBuffer
+from utils.strategy_util import ticks_to_cluster, calculate_ratio
+
+
+class TestSignalCandles(unittest.TestCase):
+    def setUp(self):
+        random = np.random.default_rng(7)
+        count = 3000
+        start = pd.Timestamp("2022-05-06 07:00:00+00:00").value
+        end = pd.Timestamp("2022-05-06 09:00:00+00:00").value
+        times = np.sort(random.integers(start, end, count))
+        # пропуск 20 минут без сделок, чтобы проверить заполнение пустых свечей
+        times = times[(times < start + 1800 * 10 ** 9) | (times >= start + 3000 * 10 ** 9)]
+        count = len(times)
+        self.df = pd.DataFrame({
+            "figi": "BBG004730N88",
+            "direction": random.integers(1, 3, count),
+            "price": np.round(100 + np.cumsum(random.choice([-1, 0, 1], count)) * 0.01, 2),
+            "quantity": random.integers(1, 50, count),
+            "time": pd.to_datetime(times, utc=True)
+        })
+
+    def test_last_candles_match_calculate_ratio(self):
+        for size in [400, 1113, 1500, len(self.df)]:
+            df = self.df.iloc[:size]
+            ticks = TickBuffer.from_df(df)
+            signal_candles = SignalCandles.from_ticks("5min", ticks.prices, ticks.quantities, ticks.times)
+            prev_candle, current_candle = signal_candles.get_last_candles()
+
+            candles = calculate_ratio(ticks_to_cluster(df, period="5min"))
+            for actual, expected in [(prev_candle, candles.iloc[-3]), (current_candle, candles.iloc[-2])]:
+                self.assertEqual(actual["time"], expected["time"])
+                for column in ["open", "close", "high", "low", "max_volume_price", "long", "short"]:
+                    self.assertAlmostEqual(actual[column], expected[column])
+                self.assertEqual(actual["direction"], expected["direction"])
+                self.assertEqual(actual["win"] is True, expected["win"] is True)
+
+    def test_not_enough_candles(self):
+        signal_candles = SignalCandles("5min")
+        signal_candles.update(100.0, 1, "2022-05-06 07:00:00+00:00")
+        signal_candles.update(100.5, 1, "2022-05-06 07:06:00+00:00")
+        self.assertEqual(signal_candles.get_last_candles(), (None, None))
+
+        signal_candles.update(101.0, 1, "2022-05-06 07:11:00+00:00")
+        prev_candle, current_candle = signal_candles.get_last_candles()
+        self.assertEqual(prev_candle["close"], 100.0)
+        self.assertEqual(current_candle["close"], 100.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
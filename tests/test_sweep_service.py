@@ -0,0 +1,89 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from domains.day_artifacts import DayArtifacts, PrecomputedProfile, PrecomputedSignalCandles
+from domains.strategy_settings import StrategySettings
+from domains.tick import TickBlock
+from services.backtest_service import BacktestService
+from services.sweep_service import SweepService, create_grid, create_random_samples
+from strategies.profile_touch_strategy import ProfileTouchStrategy
+from tests.test_analyze_batch import create_ticks, FIGI
+from tests.test_backtest_service import order_to_tuple
+
+
+def create_block(count: int, seed: int) -> TickBlock:
+    df = create_ticks(count, seed=seed)
+    return TickBlock(
+        figi=FIGI,
+        directions=df["direction"].to_numpy(dtype=np.int64),
+        prices=df["price"].to_numpy(dtype=np.float64),
+        quantities=df["quantity"].to_numpy(dtype=np.int64),
+        times=df["time"].values.view(np.int64)
+    )
+
+
+class TestSweepService(unittest.TestCase):
+    def test_precomputed_artifacts(self):
+        block = create_block(20000, seed=2)
+        for settings in [StrategySettings(), StrategySettings(first_goal=2, percentage_volume_level_range=0.05)]:
+            expected_orders = BacktestService("SBER", ProfileTouchStrategy("SBER", settings)).run(block)
+            self.assertGreater(len(expected_orders), 0)
+
+            # общие для всех вариантов профиль и свечи дают тот же результат
+            artifacts = DayArtifacts(block, settings.profile_period, settings.signal_cluster_period)
+            strategy = ProfileTouchStrategy("SBER", settings, profile=PrecomputedProfile(artifacts),
+                                            signal_candles=PrecomputedSignalCandles(artifacts))
+            orders = BacktestService("SBER", strategy).run(block)
+            self.assertEqual(list(map(order_to_tuple, orders)), list(map(order_to_tuple, expected_orders)))
+
+    def test_run(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_paths = []
+            for seed in [2, 3]:
+                file_path = os.path.join(directory, f"SBER-2022050{seed}.csv")
+                create_ticks(10000, seed=seed).to_csv(file_path, index=False)
+                file_paths.append(file_path)
+
+            parameter_sets = create_grid({"FIRST_GOAL": [2, 3], "percentage_stop_loss": [0.03, 0.05]})
+            results_df = SweepService("SBER", file_paths, processes=2).run(parameter_sets)
+
+        self.assertEqual(len(results_df), 4)
+        self.assertTrue(results_df["total_points"].is_monotonic_decreasing)
+        self.assertTrue(set(results_df.columns).issuperset({"FIRST_GOAL", "percentage_stop_loss", "orders"}))
+
+    def test_confirm(self):
+        with tempfile.TemporaryDirectory() as directory:
+            file_paths = []
+            for seed in [2, 3]:
+                file_path = os.path.join(directory, f"SBER-2022050{seed}.csv")
+                create_ticks(10000, seed=seed).to_csv(file_path, index=False)
+                file_paths.append(file_path)
+
+            sweep_service = SweepService("SBER", file_paths, processes=1, bar_period="1min")
+            results_df = sweep_service.run(create_grid({"first_goal": [2, 3], "percentage_stop_loss": [0.03, 0.05]}))
+            confirmed_df = sweep_service.confirm(results_df, count=2)
+
+        self.assertEqual(len(confirmed_df), 2)
+        self.assertTrue(confirmed_df["exact_total_points"].is_monotonic_decreasing)
+        self.assertTrue(np.allclose(confirmed_df["points_divergence"],
+                                    confirmed_df["total_points"] - confirmed_df["exact_total_points"]))
+
+    def test_create_grid(self):
+        grid = create_grid({"first_goal": [2, 3], "goal_step": [0.5, 1, 1.5]})
+        self.assertEqual(len(grid), 6)
+        self.assertEqual(grid[0], {"first_goal": 2, "goal_step": 0.5})
+
+        samples = create_random_samples({"first_goal": [2, 3], "goal_step": [0.5, 1, 1.5]}, count=10)
+        self.assertEqual(len(samples), 6)
+        self.assertEqual(len({tuple(sample.items()) for sample in samples}), 6)
+
+    def test_unknown_parameter(self):
+        with self.assertRaises(ValueError):
+            StrategySettings().replace(unknown=1)
+
+
+if __name__ == "__main__":
+    unittest.main()
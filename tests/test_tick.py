@@ -0,0 +1,53 @@
+import unittest
+from datetime import datetime, timezone
+
+import pandas as pd
+from tinkoff.invest import Trade, Quotation, TradeDirection
+
+from domains.tick import TickBlock, ticks_to_df
+from utils.parse_util import processed_data
+
+
+class TestTick(unittest.TestCase):
+    def test_processed_data(self):
+        trade = Trade(
+            figi="BBG004730N88",
+            direction=TradeDirection.TRADE_DIRECTION_SELL,
+            price=Quotation(units=120, nano=150000000),
+            quantity=3,
+            time=datetime(2022, 5, 6, 7, 0, 1, 84909, tzinfo=timezone.utc)
+        )
+        tick = processed_data(trade)
+
+        self.assertEqual(tick.figi, "BBG004730N88")
+        self.assertEqual(tick.direction, 2)
+        self.assertEqual(tick.price, 120.15)
+        self.assertEqual(tick.quantity, 3)
+        self.assertEqual(tick.time, pd.Timestamp("2022-05-06 07:00:01.084909+00:00").value)
+        self.assertEqual(tick.datetime, pd.Timestamp("2022-05-06 07:00:01.084909+00:00"))
+        self.assertIsNone(processed_data(None))
+
+    def test_ticks_to_df(self):
+        trades = [
+            Trade(figi="BBG004730N88", direction=TradeDirection.TRADE_DIRECTION_BUY,
+                  price=Quotation(units=120, nano=0), quantity=1,
+                  time=datetime(2022, 5, 6, 7, 0, 1, tzinfo=timezone.utc)),
+            Trade(figi="BBG004730N88", direction=TradeDirection.TRADE_DIRECTION_SELL,
+                  price=Quotation(units=120, nano=10000000), quantity=5,
+                  time=datetime(2022, 5, 6, 7, 0, 2, tzinfo=timezone.utc)),
+        ]
+        df = ticks_to_df([processed_data(trade) for trade in trades])
+
+        self.assertEqual(list(df.columns), ["figi", "direction", "price", "quantity", "time"])
+        self.assertEqual(list(df["price"]), [120.0, 120.01])
+        self.assertEqual(list(df["quantity"]), [1, 5])
+        self.assertEqual(df["time"].iloc[1], pd.Timestamp("2022-05-06 07:00:02+00:00"))
+
+    def test_empty_block(self):
+        block = TickBlock.from_ticks([])
+        self.assertEqual(block.size, 0)
+        self.assertTrue(block.to_df().empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
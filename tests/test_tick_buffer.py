@@ -0,0 +1,68 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from domains.tick_buffer import TickBuffer
+
+
+class TestTickBuffer(unittest.TestCase):
+    def setUp(self):
+        source = [
+            {"figi": "BBG0013HGFT4", "direction": 1, "price": 67.06, "quantity": 15,
+             "time": "2022-05-06 06:59:44.000144+00:00"},
+            {"figi": "BBG0013HGFT4", "direction": 2, "price": 67.06, "quantity": 1,
+             "time": "2022-05-06 06:59:44.000144+00:00"},
+            {"figi": "BBG0013HGFT4", "direction": 1, "price": 67.07, "quantity": 18,
+             "time": "2022-05-06 07:00:00.084909+00:00"},
+        ]
+        self.source_df = pd.DataFrame(source, columns=["figi", "direction", "price", "quantity", "time"])
+        self.source_df["time"] = pd.to_datetime(self.source_df["time"], utc=True)
+
+    def test_from_df(self):
+        buffer = TickBuffer.from_df(self.source_df)
+
+        self.assertEqual(len(buffer), 3)
+        self.assertEqual(buffer.figi, "BBG0013HGFT4")
+        pd.testing.assert_frame_equal(buffer.to_df(), self.source_df)
+
+    def test_append_grows_capacity(self):
+        buffer = TickBuffer("BBG0013HGFT4", capacity=2)
+        time = pd.Timestamp("2022-05-06 07:00:00+00:00")
+        for i in range(100):
+            buffer.append(1, 67 + i, i, time + pd.Timedelta(seconds=i))
+
+        self.assertEqual(len(buffer), 100)
+        self.assertEqual(buffer.prices[-1], 166)
+        self.assertEqual(buffer.quantities[-1], 99)
+        self.assertEqual(buffer.to_df()["time"].iloc[-1], time + pd.Timedelta(seconds=99))
+
+    def test_to_df_is_view(self):
+        buffer = TickBuffer.from_df(self.source_df)
+        df = buffer.to_df()
+
+        self.assertTrue(np.shares_memory(df["price"].values, buffer.prices))
+        self.assertTrue(np.shares_memory(df["quantity"].values, buffer.quantities))
+
+    def test_clear_keeps_previous_views(self):
+        buffer = TickBuffer.from_df(self.source_df)
+        df = buffer.to_df()
+        buffer.clear()
+        buffer.append(2, 1.0, 1, "2022-05-06 08:00:00+00:00")
+
+        self.assertEqual(len(buffer), 1)
+        pd.testing.assert_frame_equal(df, self.source_df)
+
+    def test_trim(self):
+        buffer = TickBuffer.from_df(self.source_df)
+        df = buffer.to_df()
+
+        self.assertEqual(buffer.trim("2022-05-06 07:00:00+00:00"), 2)
+        self.assertEqual(len(buffer), 1)
+        self.assertEqual(buffer.prices.tolist(), [67.07])
+        self.assertEqual(buffer.trim("2022-05-06 06:00:00+00:00"), 0)
+        pd.testing.assert_frame_equal(df, self.source_df)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from services.tick_storage import TickStorage, read_csv_ticks
+
+
+class TestTickStorage(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.storage = TickStorage(os.path.join(self.directory.name, "ticks"))
+
+        ticks = [
+            {"figi": "BBG004730N88", "direction": 1, "price": 120.5, "quantity": 10,
+             "time": "2022-05-06 07:00:01.000144+00:00"},
+            {"figi": "BBG004730N88", "direction": 2, "price": 120.1, "quantity": 5,
+             "time": "2022-05-06 07:00:20+00:00"},
+            {"figi": "BBG004730N88", "direction": 1, "price": 120.3, "quantity": 1,
+             "time": "2022-05-06 08:00:00.500000+00:00"},
+            # догруженная при восстановлении сделка в конце файла
+            {"figi": "BBG004730N88", "direction": 2, "price": 120.2, "quantity": 2,
+             "time": "2022-05-06 07:30:00+00:00"},
+        ]
+        self.file_path = os.path.join(self.directory.name, "SBER-20220506.csv")
+        pd.DataFrame(ticks).to_csv(self.file_path, index=False)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_read_csv_ticks(self):
+        block = read_csv_ticks(self.file_path)
+
+        self.assertEqual(block.figi, "BBG004730N88")
+        self.assertEqual(list(block.prices), [120.5, 120.1, 120.2, 120.3])
+        self.assertEqual(block.times[0], pd.Timestamp("2022-05-06 07:00:01.000144+00:00").value)
+        self.assertTrue((np.diff(block.times) >= 0).all())
+
+    def test_convert_and_read(self):
+        partition = self.storage.convert_csv(self.file_path)
+        self.assertTrue(os.path.exists(os.path.join(partition, "time.npy")))
+        self.assertEqual(self.storage.get_dates("SBER"), ["20220506"])
+
+        block = self.storage.read("SBER")
+        self.assertIsInstance(block.prices, np.memmap)
+        self.assertEqual(list(block.quantities), [10, 5, 2, 1])
+
+        block = self.storage.read("SBER", start="2022-05-06 07:00:10+00:00", end="2022-05-06 07:59:59+00:00")
+        self.assertEqual(list(block.prices), [120.1, 120.2])
+
+        self.assertEqual(self.storage.read("SBER", start="2022-05-07 00:00:00+00:00").size, 0)
+        self.assertEqual(self.storage.read("GAZP").size, 0)
+
+    def test_skip_unknown_files(self):
+        self.assertIsNone(self.storage.convert_csv(os.path.join(self.directory.name, "orders.csv")))
+
+
+if __name__ == "__main__":
+    unittest.main()
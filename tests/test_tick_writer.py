@@ -0,0 +1,74 @@
+import os
+import tempfile
+import time
+import unittest
+
+import pandas as pd
+
+from domains.tick import Tick, TickBlock
+from services.tick_writer import TickWriter
+
+FIGI = "BBG004730N88"
+
+
+def create_tick(index: int) -> Tick:
+    tick_time = pd.Timestamp("2022-05-06 07:00:00.000144+00:00") + pd.Timedelta(seconds=index)
+    return Tick(FIGI, 1 + index % 2, 120.5 + index / 10, index + 1, tick_time.value)
+
+
+class TestTickWriter(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.directory.name, "SBER-20220506.csv")
+        self.flushed = []
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def create_writer(self, **kwargs) -> TickWriter:
+        writer = TickWriter(on_flush=lambda figi, tick_time: self.flushed.append((figi, tick_time)), **kwargs)
+        writer.open(FIGI, self.file_path)
+        writer.start()
+        return writer
+
+    def read_df(self) -> pd.DataFrame:
+        df = pd.read_csv(self.file_path, sep=",")
+        df["time"] = pd.to_datetime(df["time"], utc=True)
+        return df
+
+    def test_flush_by_size(self):
+        writer = self.create_writer(buffer_size=3, flush_interval_ms=60_000)
+        for index in range(3):
+            writer.write(create_tick(index))
+
+        # буфер заполнен - сброс выполняется без ожидания интервала
+        deadline = time.monotonic() + 5
+        while len(self.flushed) == 0 and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        df = self.read_df()
+        self.assertEqual(len(df), 3)
+        self.assertEqual(list(df["quantity"]), [1, 2, 3])
+        self.assertEqual(self.flushed[-1], (FIGI, create_tick(2).time))
+        writer.close()
+
+    def test_append_after_restart(self):
+        writer = self.create_writer(fsync_interval_ms=1)
+        writer.write(create_tick(0))
+        writer.close()
+
+        # повторное открытие не пишет заголовок и не перезаписывает файл
+        writer = self.create_writer()
+        ticks = [create_tick(index) for index in range(1, 5)]
+        writer.write_block(TickBlock.from_ticks(ticks))
+        writer.close()
+
+        df = self.read_df()
+        self.assertEqual(len(df), 5)
+        self.assertEqual(list(df["price"]), [create_tick(index).price for index in range(5)])
+        self.assertEqual(df["time"].iloc[0].value, create_tick(0).time)
+        self.assertEqual(list(df["direction"]), [1, 2, 1, 2, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,69 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+from tinkoff.invest import TradeDirection
+
+from utils.strategy_util import ticks_to_cluster
+
+
+class TestTicksToCluster(unittest.TestCase):
+    def setUp(self):
+        ticks = [
+            {"figi": "BBG004730N88", "direction": 1, "price": 120.5, "quantity": 10,
+             "time": "2022-05-06 07:00:01.000000+00:00"},
+            {"figi": "BBG004730N88", "direction": 2, "price": 120.1, "quantity": 5,
+             "time": "2022-05-06 07:00:20.000000+00:00"},
+            {"figi": "BBG004730N88", "direction": 1, "price": 120.1, "quantity": 5,
+             "time": "2022-05-06 07:00:40.000000+00:00"},
+            {"figi": "BBG004730N88", "direction": 1, "price": 120.3, "quantity": 1,
+             "time": "2022-05-06 07:00:59.000000+00:00"},
+
+            # минута без сделок
+
+            {"figi": "BBG004730N88", "direction": 1, "price": 120.4, "quantity": 3,
+             "time": "2022-05-06 07:02:10.000000+00:00"},
+            {"figi": "BBG004730N88", "direction": 1, "price": 120.6, "quantity": 7,
+             "time": "2022-05-06 07:02:30.000000+00:00"},
+        ]
+        self.df = pd.DataFrame(ticks, columns=["figi", "direction", "price", "quantity", "time"])
+        self.df["time"] = pd.to_datetime(self.df["time"], utc=True)
+
+    def test_ticks_to_cluster(self):
+        candles = ticks_to_cluster(self.df, period="1min")
+
+        self.assertEqual(list(candles.columns),
+                         ["time", "open", "close", "high", "low", "total_volume", "direction", "max_volume_price"])
+        self.assertEqual(len(candles), 3)
+
+        first_candle = candles.iloc[0]
+        self.assertEqual(first_candle["time"], pd.Timestamp("2022-05-06 07:00:00+00:00"))
+        self.assertEqual(first_candle["open"], 120.5)
+        self.assertEqual(first_candle["close"], 120.3)
+        self.assertEqual(first_candle["high"], 120.5)
+        self.assertEqual(first_candle["low"], 120.1)
+        self.assertEqual(first_candle["total_volume"], 21)
+        self.assertEqual(first_candle["direction"], TradeDirection.TRADE_DIRECTION_SELL)
+        # при равных объемах выбирается меньшая цена
+        self.assertEqual(first_candle["max_volume_price"], 120.1)
+
+        # пустая свеча заполняется значениями предыдущей
+        empty_candle = candles.iloc[1]
+        self.assertEqual(empty_candle["time"], pd.Timestamp("2022-05-06 07:01:00+00:00"))
+        np.testing.assert_array_equal(
+            empty_candle[["open", "close", "high", "low", "total_volume", "direction", "max_volume_price"]].values,
+            first_candle[["open", "close", "high", "low", "total_volume", "direction", "max_volume_price"]].values
+        )
+
+        last_candle = candles.iloc[2]
+        self.assertEqual(last_candle["total_volume"], 10)
+        self.assertEqual(last_candle["direction"], TradeDirection.TRADE_DIRECTION_BUY)
+        self.assertEqual(last_candle["max_volume_price"], 120.6)
+
+    def test_empty(self):
+        candles = ticks_to_cluster(self.df.iloc[:0], period="1min")
+        self.assertTrue(candles.empty)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from domains.volume_levels import VolumeLevels
+from utils.strategy_util import is_price_in_range_cluster
+
+
+class TestVolumeLevels(unittest.TestCase):
+    def setUp(self):
+        random = np.random.default_rng(3)
+        count = 300
+        self.clusters = pd.DataFrame({
+            "time": pd.date_range("2022-05-04 07:00:00+00:00", periods=count, freq="1h"),
+            "max_volume_price": np.round(random.uniform(95, 105, count), 2),
+        })
+        # повторяющиеся уровни должны сохраниться
+        self.clusters.loc[10, "max_volume_price"] = self.clusters.loc[5, "max_volume_price"]
+
+    def test_find_matches_full_scan(self):
+        volume_levels = VolumeLevels(self.clusters)
+        clusters = list(zip(self.clusters["time"], self.clusters["max_volume_price"]))
+        for current_price in np.round(np.linspace(94, 106, 1201), 2):
+            expected = [
+                (cluster_time, cluster_price)
+                for cluster_time, cluster_price in clusters
+                if is_price_in_range_cluster(current_price, cluster_price)
+            ]
+            self.assertEqual(volume_levels.find(current_price), expected)
+
+    def test_empty(self):
+        self.assertEqual(VolumeLevels().find(100), [])
+        self.assertEqual(VolumeLevels(self.clusters.iloc[:0]).find(100), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
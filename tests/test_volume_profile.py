@@ -0,0 +1,68 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from domains.tick_buffer import TickBuffer
+from domains.volume_profile import VolumeProfile
+from utils.strategy_util import ticks_to_cluster
+
+
+class TestVolumeProfile(unittest.TestCase):
+    def setUp(self):
+        random = np.random.default_rng(42)
+        count = 5000
+        start = pd.Timestamp("2022-05-06 07:00:00+00:00").value
+        end = pd.Timestamp("2022-05-06 15:59:59+00:00").value
+        times = np.sort(random.integers(start, end, count))
+        # пропуск часа без сделок, чтобы проверить заполнение пустых кластеров
+        times = times[(times < start + 3600 * 10 ** 9) | (times >= start + 2 * 3600 * 10 ** 9)]
+        count = len(times)
+        self.df = pd.DataFrame({
+            "figi": "BBG004730N88",
+            "direction": random.integers(1, 3, count),
+            "price": np.round(100 + np.cumsum(random.choice([-1, 0, 1], count)) * 0.01, 2),
+            "quantity": random.integers(1, 50, count),
+            "time": pd.to_datetime(times, utc=True)
+        })
+
+    def test_profile_matches_ticks_to_cluster(self):
+        ticks = TickBuffer.from_df(self.df)
+        profile = VolumeProfile.from_ticks("1h", ticks.prices, ticks.quantities, ticks.times)
+
+        expected = ticks_to_cluster(self.df, period="1h")
+        actual = profile.to_df()
+
+        self.assertEqual(len(actual), len(expected))
+        for column in ["open", "close", "high", "low", "total_volume", "max_volume_price"]:
+            np.testing.assert_allclose(actual[column].astype(float), expected[column].astype(float))
+        self.assertTrue((actual["time"].values == expected["time"].values).all())
+        self.assertTrue((actual["direction"].astype(int).values == expected["direction"].astype(int).values).all())
+
+    def test_max_volume_price(self):
+        profile = VolumeProfile("1h")
+        profile.update(100.0, 5, "2022-05-06 07:10:00+00:00")
+        profile.update(101.0, 7, "2022-05-06 07:20:00+00:00")
+        profile.update(100.0, 2, "2022-05-06 07:30:00+00:00")
+        self.assertEqual(profile.get_max_volume_price("2022-05-06 07:59:00+00:00"), 100.0)
+
+        # при равных объемах приоритет у меньшей цены
+        profile.update(101.0, 0, "2022-05-06 07:40:00+00:00")
+        self.assertEqual(profile.get_max_volume_price("2022-05-06 07:00:00+00:00"), 100.0)
+
+        profile.update(102.0, 3, "2022-05-06 08:00:00+00:00")
+        self.assertEqual(profile.get_max_volume_price("2022-05-06 08:00:00+00:00"), 102.0)
+        self.assertIsNone(profile.get_max_volume_price("2022-05-06 09:00:00+00:00"))
+
+    def test_trim(self):
+        ticks = TickBuffer.from_df(self.df)
+        profile = VolumeProfile.from_ticks("1h", ticks.prices, ticks.quantities, ticks.times)
+        count = len(profile)
+
+        self.assertEqual(profile.trim("2022-05-06 10:00:00+00:00"), 2)
+        self.assertEqual(len(profile), count - 2)
+        self.assertEqual(profile.to_df()["time"].iloc[0], pd.Timestamp("2022-05-06 10:00:00+00:00"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,23 +1,32 @@
 import asyncio
 import logging
-from datetime import timedelta
+import time
+from functools import partial
+from typing import Dict, List, Optional
 
 import pandas as pd
 from tinkoff.invest import (
     AsyncClient
 )
-from tinkoff.invest.utils import now
 
-from constants import ONE_HOUR_TO_MINUTES
+from domains.coverage_index import CoverageIndex
+from domains.tick import TickBlock
+from domains.tick_buffer import TickBuffer
+from services.history_service import HistoryService
+from services.instrument_worker import InstrumentWorker, LatencyStats
+from services.market_data_log import MarketDataRecorder
 from services.order_service import OrderService
+from services.tick_writer import TickWriter
 from services.user_service import UserService
-from settings import INSTRUMENTS, CAN_OPEN_ORDERS, TOKEN
+from settings import INSTRUMENTS, CAN_OPEN_ORDERS, TOKEN, WORKER_STATS_INTERVAL_SECONDS, IS_MARKET_DATA_RECORD
 from strategies.profile_touch_strategy import ProfileTouchStrategy
+from utils.clock import Clock, WALL_CLOCK
 from utils.exchange_util import is_open_exchange
-from utils.instrument_util import request_iterator, get_file_path_by_instrument
+from utils.instrument_util import request_iterator, get_file_path_by_instrument, \
+    get_coverage_file_path_by_instrument, get_market_data_record_file_path
 from utils.logger import init_logging
 from utils.parse_util import processed_data
-from utils.strategy_util import merge_two_frames, create_empty_df
+from utils.strategy_util import merge_two_frames
 
 pd.options.display.max_columns = None
 pd.options.display.max_rows = None
@@ -27,157 +36,281 @@ init_logging()
 logger = logging.getLogger(__name__)
 
 
+# instruments и order_service задаются при проверке пропускной способности на локальных данных
+# recorder - запись сообщений потока для воспроизведения, по умолчанию включается настройкой IS_MARKET_DATA_RECORD
+# clock - источник текущего времени: системное или время воспроизводимых сделок (EventClock)
 class TradingRobot:
-    def __init__(self):
-        self.order_service = OrderService(is_notification=True, can_open_orders=CAN_OPEN_ORDERS)
+    def __init__(self, instruments: Optional[List[Dict]] = None, order_service: Optional[OrderService] = None,
+                 recorder: Optional[MarketDataRecorder] = None, clock: Clock = WALL_CLOCK):
+        self.instruments = instruments if instruments is not None else INSTRUMENTS
+        self.clock = clock
+        self.order_service = order_service if order_service is not None \
+            else OrderService(is_notification=True, can_open_orders=CAN_OPEN_ORDERS, clock=clock)
         self.order_service.start()
 
+        if recorder is None and IS_MARKET_DATA_RECORD:
+            recorder = MarketDataRecorder(get_market_data_record_file_path(clock))
+        self.recorder = recorder
+        # дата торгового дня, за который уже сохранена статистика
+        self.statistics_date = None
+
         self.is_history_processed = True
 
-        self.df_by_instrument = {}
+        # запись сделок на диск в отдельном потоке, покрытие продлевается после сброса буфера
+        self.tick_writer = TickWriter(on_flush=self.on_ticks_flushed)
+
+        self.instrument_by_figi = {}
+        self.workers = {}
+        self.ticks_by_instrument = {}
+        self.temp_ticks = {}
+        self.coverage_by_instrument = {}
         self.strategy = {}
-        for instrument in INSTRUMENTS:
+        for instrument in self.instruments:
             figi = instrument["figi"]
-            df_by_instrument = create_empty_df()
-            self.df_by_instrument[figi] = df_by_instrument
+            self.instrument_by_figi[figi] = instrument
+            # у каждого инструмента своя очередь и свой поток обработки
+            self.workers[figi] = InstrumentWorker(instrument["name"], partial(self.processed_trades, instrument))
+            self.ticks_by_instrument[figi] = TickBuffer(figi)
+            self.temp_ticks[figi] = TickBuffer(figi)
+            self.coverage_by_instrument[figi] = CoverageIndex(get_coverage_file_path_by_instrument(instrument, clock))
 
-            file_path = get_file_path_by_instrument(instrument)
-            instrument_file = open(file_path, "a", newline='')
-            df_by_instrument.to_csv(instrument_file, mode="a", header=instrument_file.tell() == 0, index=False)
+            self.tick_writer.open(figi, get_file_path_by_instrument(instrument, clock))
 
             profile_touch_strategy = ProfileTouchStrategy(instrument["name"])
             profile_touch_strategy.start()
             self.strategy[figi] = profile_touch_strategy
 
+        self.tick_writer.start()
+
+    # сделки записаны на диск - продлеваю покрытие потока
+    def on_ticks_flushed(self, figi: str, time: int):
+        coverage = self.coverage_by_instrument[figi]
+        coverage.extend(time)
+        coverage.save_if_needed(time)
+
     # актуализация DataFrame из полученных ранее данных
+    # по индексу покрытия запрашиваются только промежутки, сделок за которые нет на диске
     async def sync_df(self, client):
         self.is_history_processed = True
-        for instrument in INSTRUMENTS:
+        current_date = self.clock.now()
+        day_start = current_date.replace(hour=0, minute=0, second=0, microsecond=0)
+
+        instrument_df_by_figi = {}
+        ranges_by_figi = {}
+        for instrument in self.instruments:
             try:
                 figi = instrument["figi"]
 
-                file_path = get_file_path_by_instrument(instrument)
-                self.df_by_instrument[figi] = pd.read_csv(file_path, sep=",")
-                self.df_by_instrument[figi]["time"] = pd.to_datetime(self.df_by_instrument[figi]["time"], utc=True)
-
-                history_df = await self.get_history_trades(client, instrument)
-                self.df_by_instrument[figi] = merge_two_frames(self.df_by_instrument[figi], history_df)
+                file_path = get_file_path_by_instrument(instrument, self.clock)
+                instrument_df = pd.read_csv(file_path, sep=",")
+                instrument_df["time"] = pd.to_datetime(instrument_df["time"], utc=True)
+                # догруженные промежутки дописываются в конец файла, поэтому порядок восстанавливаю при чтении
+                instrument_df = instrument_df.sort_values("time", kind="mergesort").reset_index(drop=True)
+                instrument_df_by_figi[figi] = instrument_df
+
+                coverage = self.coverage_by_instrument[figi].load()
+                if len(instrument_df) > 0:
+                    # сделки после последнего сохранения индекса записаны потоком прошлого запуска от его начала
+                    coverage.extend(instrument_df["time"].max())
+                # поток этого запуска начинается с первой записанной после синхронизации сделки
+                coverage.live_start = None
+                ranges_by_figi[figi] = [
+                    (pd.Timestamp(start, tz="UTC").to_pydatetime(), pd.Timestamp(end, tz="UTC").to_pydatetime())
+                    for start, end in coverage.get_missing(day_start, current_date)
+                ]
+                logger.info("instrument: %s, missing ranges: %s", instrument["name"], ranges_by_figi[figi])
             except Exception as ex:
                 logger.error(ex)
-        self.is_history_processed = False
 
-    # загрузка последних доступных обезличенных сделок
-    async def get_history_trades(self, client, instrument):
-        history_df = create_empty_df()
-        figi = instrument["figi"]
-        current_date = now()
-        time = 0
+        # недостающая история по всем инструментам загружается одновременно
+        history_service = HistoryService(client)
+        history = await history_service.load_ranges(self.instruments, ranges_by_figi)
 
-        while True:
+        for instrument in self.instruments:
             try:
-                interval_from = current_date - timedelta(minutes=time + ONE_HOUR_TO_MINUTES)
-                interval_to = current_date - timedelta(minutes=time)
-
-                logger.info("instrument: %s, from: %s", instrument, interval_from)
-                logger.info("instrument: %s, to: %s", instrument, interval_to)
-
-                response = await client.market_data.get_last_trades(
-                    figi=figi,
-                    from_=interval_from,
-                    to=interval_to,
-                )
-                logger.info("instrument: %s, size: %s", instrument, len(response.trades))
-                if response is None or len(response.trades) == 0:
-                    break
-
-                for trade in response.trades:
-                    processed_trade_df = processed_data(trade)
-                    if processed_trade_df is not None:
-                        history_df = pd.concat([history_df, processed_trade_df])
-                history_df = history_df.sort_values("time")
-                time += ONE_HOUR_TO_MINUTES
+                figi = instrument["figi"]
+                instrument_df = instrument_df_by_figi[figi]
+                history_df = history[figi]
+
+                # сделки каждого промежутка подмерживаю отдельно, чтобы не затронуть сохраненные между ними
+                is_rewrite_needed = False
+                if len(history_df) > 0:
+                    for interval_from, interval_to in ranges_by_figi[figi]:
+                        range_condition = (history_df["time"] >= interval_from) & (history_df["time"] <= interval_to)
+                        range_df = history_df[range_condition]
+                        size = len(instrument_df) + len(range_df)
+                        instrument_df = merge_two_frames(instrument_df, range_df)
+                        # если сделки промежутка заменили сохраненные, то файл придется перезаписать
+                        is_rewrite_needed = is_rewrite_needed or len(instrument_df) != size
+
+                file_path = get_file_path_by_instrument(instrument, self.clock)
+                if is_rewrite_needed:
+                    instrument_df.to_csv(file_path, mode="w", header=True, index=False)
+                elif len(history_df) > 0:
+                    history_df.to_csv(file_path, mode="a", header=False, index=False)
+
+                coverage = self.coverage_by_instrument[figi]
+                for interval_from, interval_to in history_service.loaded_windows.get(figi, []):
+                    coverage.add(interval_from, interval_to)
+                coverage.save(current_date)
+
+                self.ticks_by_instrument[figi] = TickBuffer.from_df(instrument_df, figi)
             except Exception as ex:
                 logger.error(ex)
-                break
+        self.is_history_processed = False
 
-        return history_df
+    # обработка пачки сделок инструмента, выполняется в потоке обработчика этого инструмента
+    # результат совпадает с обработкой тех же сделок по одной
+    def processed_trades(self, instrument: Dict, trades: List, stats: LatencyStats):
+        figi = instrument["figi"]
 
-    # основной метод для обработки входящих данных
+        started = time.perf_counter()
+        ticks = [tick for tick in map(processed_data, trades) if tick is not None]
+        stats.add_since("parse", started)
+        if len(ticks) == 0:
+            return
+        block = TickBlock.from_ticks(ticks)
+
+        if self.is_history_processed is True:
+            for tick in ticks:
+                # проверка позиций на закрытие по тейку/стопу
+                started = time.perf_counter()
+                self.order_service.processed_orders(instrument["name"], tick.price, tick.datetime)
+                stats.add_since("orders", started)
+
+            # пока происходит обработка истории - новые данные складываю во временную переменную
+            self.temp_ticks[figi].extend_block(block)
+            return
+
+        index = 0
+        # есть проблема, когда исторические данные загрузились, но в real-time они не приходят
+        # тогда исторические данные не окажутся в файле
+        if len(self.temp_ticks[figi]) > 0:
+            tick = ticks[0]
+            started = time.perf_counter()
+            self.order_service.processed_orders(instrument["name"], tick.price, tick.datetime)
+            stats.add_since("orders", started)
+
+            # если после обработки истории успели накопить real-time данные,
+            # то подмерживаю их, дописываю в файл и очищаю временную переменную
+            started = time.perf_counter()
+            self.ticks_by_instrument[figi].extend_buffer(self.temp_ticks[figi])
+            self.ticks_by_instrument[figi].append_tick(tick)
+            self.write_block(figi, self.temp_ticks[figi].block())
+            self.temp_ticks[figi].clear()
+
+            # отправляю обезличенные сделки на анализ
+            instrument_df = self.ticks_by_instrument[figi].to_df()
+            self.strategy[figi].set_df(instrument_df)
+            stats.add_since("strategy", started)
+            index = 1
+
+        # отправляю обезличенные сделки на анализ одной пачкой
+        # (алгоритм анализа можно заменить на любой)
+        # если ТВ подтвердится, то возвращается структура сделки и индекс сделки, на которой она найдена
+        started = time.perf_counter()
+        results = self.strategy[figi].analyze_batch(block.prices[index:], block.quantities[index:],
+                                                    block.directions[index:], block.times[index:])
+        stats.add_since("strategy", started)
+
+        # позиции проверяются на каждой сделке до открытия новых, как при обработке по одной
+        started = time.perf_counter()
+        position = index
+        for result_index, orders in results:
+            tick_index = index + result_index
+            for tick in ticks[position:tick_index + 1]:
+                self.order_service.processed_orders(instrument["name"], tick.price, tick.datetime)
+            position = tick_index + 1
+
+            for order in orders:
+                self.order_service.create_order(order)
+        for tick in ticks[position:]:
+            self.order_service.processed_orders(instrument["name"], tick.price, tick.datetime)
+        stats.add_since("orders", started)
+
+        self.ticks_by_instrument[figi].extend(block.directions[index:], block.prices[index:],
+                                              block.quantities[index:], block.times[index:])
+
+        # сделки пачки уходят на запись одним блоком
+        started = time.perf_counter()
+        self.write_block(figi, block)
+        stats.add_since("storage", started)
+
+    # первая записанная сделка - начало потока, от которого продлевается покрытие
+    def write_block(self, figi: str, block: TickBlock):
+        if block.size > 0:
+            self.coverage_by_instrument[figi].start_live(block.times[0])
+        self.tick_writer.write_block(block)
+
+    def log_workers_stats(self):
+        for figi, worker in self.workers.items():
+            logger.info("instrument: %s, worker: %s", self.instrument_by_figi[figi]["name"], worker.get_stats())
+
+    # основной метод для обработки входящих данных:
+    # поток только распределяет сделки по очередям инструментов, обработка выполняется их обработчиками
     async def trades_stream(self, client):
-        temp_df = {}
-        for instrument in INSTRUMENTS:
-            temp_df[instrument["figi"]] = create_empty_df()
-
+        stats_time = time.monotonic()
         try:
             async for marketdata in client.market_data_stream.market_data_stream(
-                    request_iterator(INSTRUMENTS)
+                    request_iterator(self.instruments)
             ):
-                if not is_open_exchange():
-                    logger.info("торговый день завершен, сохранение статистики")
-                    self.order_service.write_statistics()
+                # сообщение записывается до любой обработки, вместе с временем получения
+                if self.recorder is not None:
+                    self.recorder.write(marketdata, self.clock.now_ns())
+
+                if not is_open_exchange(self.clock):
+                    # статистика сохраняется один раз за торговый день, а не на каждом сообщении после закрытия
+                    current_date = self.clock.now().date()
+                    if self.statistics_date != current_date:
+                        self.statistics_date = current_date
+                        logger.info("торговый день завершен, сохранение статистики")
+                        self.order_service.write_statistics()
+                        self.tick_writer.flush()
                     # todo добавить выход из приложения
 
                 logger.info(marketdata)
+                if time.monotonic() - stats_time >= WORKER_STATS_INTERVAL_SECONDS:
+                    stats_time = time.monotonic()
+                    self.log_workers_stats()
+                    if self.recorder is not None:
+                        self.recorder.flush()
+
                 if marketdata is None:
                     continue
                 trade = marketdata.trade
                 if trade is None:
                     continue
 
-                figi = trade.figi
-                instrument = next(item for item in INSTRUMENTS if item["figi"] == figi)
-
-                processed_trade_df = processed_data(trade)
-                if processed_trade_df is not None:
-                    # проверка позиций на закрытие по тейку/стопу
-                    processed_trade = processed_trade_df.iloc[0]
-                    price = processed_trade["price"]
-                    time = processed_trade["time"]
-                    self.order_service.processed_orders(instrument["name"], price, time)
-
-                    if self.is_history_processed is True:
-                        # пока происходит обработка истории - новые данные складываю во временную переменную
-                        next_df = [temp_df[figi], processed_trade_df]
-                        temp_df[figi] = pd.concat(next_df, ignore_index=True)
-                    else:
-                        # есть проблема, когда исторические данные загрузились, но в real-time они не приходят
-                        # тогда исторические данные не окажутся в файле
-                        if len(temp_df[figi]) > 0:
-                            # если после обработки истории успели накопить real-time данные,
-                            # то подмерживаю их и очищаю временную переменную
-                            next_df = [self.df_by_instrument[figi], temp_df[figi], processed_trade_df]
-                            self.df_by_instrument[figi] = pd.concat(next_df, ignore_index=True)
-                            temp_df[figi].drop(temp_df[figi].index, inplace=True)
-
-                            # отправляю обезличенные сделки на анализ
-                            self.strategy[figi].set_df(self.df_by_instrument[figi])
-
-                            file_path = get_file_path_by_instrument(instrument)
-                            self.df_by_instrument[figi].to_csv(file_path, mode="w", header=True, index=False)
-                        else:
-                            # отправляю обезличенную сделку на анализ
-                            # (алгоритм анализа можно заменить на любой)
-                            # если ТВ подтвердится, то возвращается структура сделки
-                            orders = self.strategy[figi].analyze(processed_trade_df)
-                            if orders is not None:
-                                for order in orders:
-                                    self.order_service.create_order(order)
-
-                            next_df = [self.df_by_instrument[figi], processed_trade_df]
-                            self.df_by_instrument[figi] = pd.concat(next_df, ignore_index=True)
-
-                        file_path = get_file_path_by_instrument(instrument)
-                        processed_trade_df.to_csv(file_path, mode="a", header=False, index=False)
+                worker = self.workers.get(trade.figi)
+                if worker is None:
+                    continue
+                await worker.put(trade)
         except Exception as ex:
             logger.error(ex)
+        finally:
+            # дожидаюсь обработки уже поступивших сделок
+            for worker in self.workers.values():
+                await worker.stop()
+            self.log_workers_stats()
+
+    # клиент может быть заменен локальной реализацией с тем же интерфейсом (FakeAsyncClient, ReplayAsyncClient)
+    async def run(self, client):
+        tasks = [asyncio.ensure_future(self.trades_stream(client)),
+                 asyncio.ensure_future(self.sync_df(client))]
+        try:
+            await asyncio.wait(tasks)
+        finally:
+            # дописываю накопленные в буфере сделки при завершении сессии
+            self.tick_writer.close()
+            if self.recorder is not None:
+                self.recorder.close()
+            self.order_service.close_storage()
 
     async def main(self):
         UserService().show_settings()
 
         async with AsyncClient(TOKEN) as client:
-            tasks = [asyncio.ensure_future(self.trades_stream(client)),
-                     asyncio.ensure_future(self.sync_df(client))]
-            await asyncio.wait(tasks)
+            await self.run(client)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,51 @@
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from tinkoff.invest.utils import now
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+# источник текущего времени робота: время биржи, имена файлов за день, дата статистики
+class Clock(ABC):
+    # текущее время UTC
+    @abstractmethod
+    def now(self) -> datetime:
+        pass
+
+    # текущее время в наносекундах UTC
+    @abstractmethod
+    def now_ns(self) -> int:
+        pass
+
+
+# системное время, для работы на реальном потоке
+class WallClock(Clock):
+    def now(self) -> datetime:
+        return now()
+
+    def now_ns(self) -> int:
+        return time.time_ns()
+
+
+# время событий: задается потоком при воспроизведении (время сделки или время получения записанного сообщения),
+# поэтому полный путь робота можно прогнать по прошедшим датам без пауз
+# время только увеличивается, до первого события равно start_time
+class EventClock(Clock):
+    def __init__(self, start_time: Optional[int] = None):
+        self.time = start_time or 0
+
+    def advance(self, time: int):
+        if time > self.time:
+            self.time = time
+
+    def now(self) -> datetime:
+        return EPOCH + timedelta(microseconds=self.time // 1000)
+
+    def now_ns(self) -> int:
+        return self.time
+
+
+WALL_CLOCK = WallClock()
@@ -1,22 +1,43 @@
 from datetime import datetime
 
-from tinkoff.invest.utils import now
+from constants import ONE_DAY_TO_NANOSECONDS, ONE_HOUR_TO_NANOSECONDS
+from utils.clock import Clock, WALL_CLOCK
 
+# час UTC закрытия биржи (условно 18мск)
+EXCHANGE_CLOSE_HOUR = 16
 
-def is_open_exchange():
+# час UTC, до которого доступно открытие позиций
+OPEN_ORDERS_END_HOUR = 15
+
+# час UTC, до которого длится премаркет
+PREMARKET_END_HOUR = 7
+
+
+def is_open_exchange(clock: Clock = WALL_CLOCK) -> bool:
     # условно биржа работает до 18мск
     # todo получать из api
-    close_time = now().replace(hour=16, minute=0, second=0, microsecond=0)
-    return now() < close_time
+    current_time = clock.now()
+    close_time = current_time.replace(hour=EXCHANGE_CLOSE_HOUR, minute=0, second=0, microsecond=0)
+    return current_time < close_time
 
 
 def is_open_orders(time: datetime) -> bool:
     # доступно открытие позиций до 18мск
-    available_time = time.replace(hour=15, minute=0, second=0, microsecond=0)
+    available_time = time.replace(hour=OPEN_ORDERS_END_HOUR, minute=0, second=0, microsecond=0)
     return time < available_time
 
 
+# то же для времени в наносекундах UTC
+def is_open_orders_ns(time: int) -> bool:
+    return time % ONE_DAY_TO_NANOSECONDS < OPEN_ORDERS_END_HOUR * ONE_HOUR_TO_NANOSECONDS
+
+
 def is_premarket_time(time: datetime) -> bool:
     # пропускаю анализ премаркета
-    available_time = time.replace(hour=7, minute=0, second=0, microsecond=0)
+    available_time = time.replace(hour=PREMARKET_END_HOUR, minute=0, second=0, microsecond=0)
     return time < available_time
+
+
+# то же для времени в наносекундах UTC
+def is_premarket_time_ns(time: int) -> bool:
+    return time % ONE_DAY_TO_NANOSECONDS < PREMARKET_END_HOUR * ONE_HOUR_TO_NANOSECONDS
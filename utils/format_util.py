@@ -1,9 +1,18 @@
 from tinkoff.invest import Quotation
-from tinkoff.invest.utils import quotation_to_decimal
 
+NANO_IN_UNIT = 1_000_000_000
 
-def quotation_to_float(quotation: Quotation):
-    return float(quotation_to_decimal(quotation))
+
+# целочисленное деление в python округляется корректно, поэтому результат совпадает с float(Decimal)
+# без создания Decimal на каждую сделку
+def quotation_to_float(quotation: Quotation) -> float:
+    return (quotation.units * NANO_IN_UNIT + quotation.nano) / NANO_IN_UNIT
+
+
+# обратное преобразование для сделок, которые формируются локально (FakeAsyncClient, замеры)
+def float_to_quotation(price: float) -> Quotation:
+    units = int(price)
+    return Quotation(units=units, nano=int(round((price - units) * NANO_IN_UNIT)))
 
 
 def fixed_float(number: float) -> str:
@@ -1,9 +1,9 @@
 import asyncio
-from datetime import datetime
 
 from tinkoff.invest import TradeInstrument, MarketDataRequest, SubscribeTradesRequest, SubscriptionAction
 
 from settings import INSTRUMENTS
+from utils.clock import Clock, WALL_CLOCK
 
 
 async def request_iterator(instruments):
@@ -18,8 +18,23 @@ async def request_iterator(instruments):
         await asyncio.sleep(1)
 
 
-def get_file_path_by_instrument(instrument):
-    return f"./data/{instrument['name']}-{datetime.now().strftime('%Y%m%d')}.csv"
+# дата файлов за текущий день, по локальному времени
+def get_file_date(clock: Clock = WALL_CLOCK) -> str:
+    return clock.now().astimezone().strftime('%Y%m%d')
+
+
+def get_file_path_by_instrument(instrument, clock: Clock = WALL_CLOCK):
+    return f"./data/{instrument['name']}-{get_file_date(clock)}.csv"
+
+
+# индекс покрытия сохраненных сделок для файла инструмента за текущий день
+def get_coverage_file_path_by_instrument(instrument, clock: Clock = WALL_CLOCK):
+    return f"./data/{instrument['name']}-{get_file_date(clock)}.coverage.json"
+
+
+# запись сообщений потока за текущий день
+def get_market_data_record_file_path(clock: Clock = WALL_CLOCK):
+    return f"./data/marketdata-{get_file_date(clock)}.bin"
 
 
 def get_instrument_by_name(name: str):
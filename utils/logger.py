@@ -5,8 +5,9 @@ from datetime import datetime
 
 def init_logging():
     date = datetime.now().strftime("%Y-%m-%d")
-    # todo упростить, проверить на unix-системах
-    log_file_path = os.path.join(os.path.dirname(__file__) + "\\..\\logs", f"log-{date}.log")
+    log_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "logs")
+    os.makedirs(log_path, exist_ok=True)
+    log_file_path = os.path.join(log_path, f"log-{date}.log")
     format = "%(asctime)s %(levelname)s --- (%(filename)s).%(funcName)s(%(lineno)d):\t %(message)s"
     logging.basicConfig(
         format=format,
@@ -1,5 +1,5 @@
 from datetime import datetime
-from typing import List
+from typing import Dict, List
 from uuid import uuid4
 
 from tinkoff.invest import OrderDirection
@@ -69,3 +69,19 @@ def get_reverse_order(orders: List[Order], order: Order) -> List[Order]:
         orders)
     )
     return active_order
+
+
+# итоги по сделкам в тех же показателях, что и статистика OrderService.write_statistics
+def calculate_statistics(orders: List[Order]) -> Dict:
+    take_orders = list(filter(lambda x: x.is_win, orders))
+    loss_orders = list(filter(lambda x: not x.is_win, orders))
+    earned_points = sum(order.result for order in take_orders)
+    lost_points = sum(order.result for order in loss_orders)
+    return {
+        "orders": len(orders),
+        "take_orders": len(take_orders),
+        "loss_orders": len(loss_orders),
+        "earned_points": earned_points,
+        "lost_points": lost_points,
+        "total_points": earned_points + lost_points,
+    }
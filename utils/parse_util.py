@@ -1,30 +1,34 @@
-from datetime import datetime
-from typing import Dict
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Optional
 
+import numpy as np
 import pandas as pd
 
+from domains.tick import Tick
 from utils.format_util import quotation_to_float
 
+logger = logging.getLogger(__name__)
 
-def processed_data(trade):
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+ONE_MICROSECOND = timedelta(microseconds=1)
+
+
+# преобразование сделки из api в легковесную запись без создания DataFrame
+def processed_data(trade) -> Optional[Tick]:
     try:
         if trade is None:
             return
 
-        price = quotation_to_float(trade.price)
-        data = pd.DataFrame.from_records([
-            {
-                "figi": trade.figi,
-                "direction": trade.direction,
-                "price": price,
-                "quantity": trade.quantity,
-                "time": pd.to_datetime(str(trade.time), utc=True)
-            }
-        ])
-
-        return data
+        return Tick(
+            figi=trade.figi,
+            direction=int(trade.direction),
+            price=quotation_to_float(trade.price),
+            quantity=trade.quantity,
+            time=datetime_to_ns(trade.time)
+        )
     except Exception as ex:
-        return ex
+        logger.error(ex)
 
 
 def parse_date(str_date: str):
@@ -41,6 +45,25 @@ def parse_date(str_date: str):
     return None
 
 
+# перевод даты в наносекунды UTC для колоночного хранения сделок
+def datetime_to_ns(time) -> int:
+    if isinstance(time, (int, np.integer)):
+        return int(time)
+    if isinstance(time, pd.Timestamp):
+        return time.value
+    if isinstance(time, datetime):
+        # datetime из api приходит с часовым поясом, считаю без pandas
+        if time.tzinfo is None:
+            time = time.replace(tzinfo=timezone.utc)
+        return (time - EPOCH) // ONE_MICROSECOND * 1000
+    return pd.Timestamp(time).value
+
+
+# обратное преобразование, с точностью до микросекунд как у datetime из api
+def ns_to_datetime(time: int) -> datetime:
+    return EPOCH + timedelta(microseconds=time // 1000)
+
+
 def get_float_from_dict(dictionary: Dict, key: str) -> float:
     if key in dictionary:
         return float(dictionary.get(key))
@@ -1,3 +1,5 @@
+from typing import Dict
+
 import numpy as np
 import pandas as pd
 from tinkoff.invest import TradeDirection
@@ -5,14 +7,24 @@ from tinkoff.invest import TradeDirection
 from settings import PERCENTAGE_VOLUME_LEVEL_RANGE
 
 
+# границы процентного диапазона объемного уровня, поддерживает как число, так и массив цен
+def calculate_level_range(
+        cluster_price,
+        percentage: float = PERCENTAGE_VOLUME_LEVEL_RANGE
+):
+    level_range = cluster_price * percentage / 100
+    increased_level = cluster_price + level_range
+    reduced_level = cluster_price - level_range
+    return reduced_level, increased_level
+
+
 # находится ли цена в процентном диапазоне
 def is_price_in_range_cluster(
         current_price: float,
-        cluster_price
+        cluster_price,
+        percentage: float = PERCENTAGE_VOLUME_LEVEL_RANGE
 ) -> bool:
-    level_range = cluster_price * PERCENTAGE_VOLUME_LEVEL_RANGE / 100
-    increased_level = cluster_price + level_range
-    reduced_level = cluster_price - level_range
+    reduced_level, increased_level = calculate_level_range(cluster_price, percentage)
     return reduced_level <= current_price <= increased_level
 
 
@@ -62,27 +74,59 @@ def calculate_ratio(candles: pd.DataFrame) -> pd.DataFrame:
     return candles
 
 
-# агрегация данных для получения свечи
-def agg_ohlc(df: pd.DataFrame) -> pd.Series:
-    if df.empty:
-        return pd.Series({
-            "low": np.nan,
-            "high": np.nan,
-            "open": np.nan,
-            "close": np.nan,
-            "total_volume": np.nan,
-            "max_volume_price": np.nan
-        })
-    price = df["price"].values
-    quantity = df["quantity"].values
-    return pd.Series({
-        "low": min(price),
-        "high": max(price),
-        "open": price[0],
-        "close": price[-1],
-        "total_volume": sum(quantity),
-        "max_volume_price": df.groupby(["price"])[["quantity"]].sum().idxmax()[0]
-    })
+# деление, которое повторяет поведение pandas при нулевом знаменателе
+def safe_divide(numerator: float, denominator: float) -> float:
+    if denominator == 0:
+        if numerator == 0:
+            return np.nan
+        return np.inf if numerator > 0 else -np.inf
+    return numerator / denominator
+
+
+# расчет соотношения лонгистов/шортистов для одной свечи, аналог calculate_ratio
+def calculate_candle_ratio(candle: Dict) -> Dict:
+    difference = candle["high"] - candle["low"]
+    candle["long"] = safe_divide(candle["close"] - candle["low"], difference) * 100
+    candle["short"] = safe_divide(candle["high"] - candle["close"], difference) * 100
+
+    # расчет расположения макс. объема относительно открытия свечи
+    from_high = abs(candle["high"] - candle["max_volume_price"])
+    from_low = abs(candle["max_volume_price"] - candle["low"])
+    total = from_high + from_low
+
+    # определение победителя по тем же правилам, что и в calculate_ratio
+    if candle["direction"] == TradeDirection.TRADE_DIRECTION_BUY:
+        candle["percent"] = safe_divide(from_low, total) * 100
+        candle["win"] = bool(candle["long"] > 50 and candle["percent"] <= 40)
+    elif candle["direction"] == TradeDirection.TRADE_DIRECTION_SELL:
+        candle["percent"] = safe_divide(from_high, total) * 100
+        candle["win"] = bool(candle["short"] > 50 and candle["percent"] <= 40)
+    else:
+        candle["percent"] = np.nan
+        candle["win"] = None
+
+    return candle
+
+
+# агрегация данных для получения свечей: OHLC, общий объем и цена с максимальным объемом
+# все периоды считаются за несколько векторных проходов вместо вызова функции на каждый период
+def agg_ohlc(
+        df: pd.DataFrame,
+        period: str
+) -> pd.DataFrame:
+    ticks = df.set_index(["time"])
+    candles = ticks["price"].resample(period).agg(["min", "max", "first", "last"])
+    candles.columns = ["low", "high", "open", "close"]
+    # для периодов без сделок объем не определен, как и остальные значения свечи
+    candles["total_volume"] = ticks["quantity"].resample(period).sum(min_count=1)
+
+    # объем по каждой цене внутри периода, цены внутри периода отсортированы по возрастанию,
+    # поэтому при равных объемах выбирается меньшая цена
+    volumes = df.groupby([pd.Grouper(key="time", freq=period), "price"])["quantity"].sum().reset_index()
+    max_volumes = volumes.loc[volumes.groupby("time")["quantity"].idxmax()]
+    candles["max_volume_price"] = max_volumes.set_index("time")["price"]
+
+    return candles.astype("float64")
 
 
 # преобразование тиковых данных в свечи с максимальным объемом
@@ -90,8 +134,11 @@ def ticks_to_cluster(
         df: pd.DataFrame,
         period: str = "1min"
 ) -> pd.DataFrame:
-    candles = df.set_index(["time"])
-    candles = candles.resample(period).apply(agg_ohlc)
+    columns = ["time", "open", "close", "high", "low", "total_volume", "direction", "max_volume_price"]
+    if df.empty:
+        return pd.DataFrame(columns=columns)
+
+    candles = agg_ohlc(df, period)
     candles = candles.ffill()
 
     candles["time"] = candles.index
@@ -102,7 +149,7 @@ def ticks_to_cluster(
     # медвежья свеча
     candles.loc[candles["open"] > candles["close"], "direction"] = TradeDirection.TRADE_DIRECTION_SELL
 
-    candles = candles[["time", "open", "close", "high", "low", "total_volume", "direction", "max_volume_price"]]
+    candles = candles[columns]
     return candles.reset_index(drop=True)
 
 